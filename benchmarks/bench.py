@@ -0,0 +1,259 @@
+"""Benchmark suite for warframe_metrics over synthetic catalogues.
+
+Run the suite and write machine-readable results::
+
+    $ python benchmarks/bench.py run --items 100 1000 --days 90 --output new.json
+
+Compare two result files, for example from two releases::
+
+    $ python benchmarks/bench.py compare old.json new.json
+"""
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+
+from warframe_metrics.market.prime import best_prime_complex
+from warframe_metrics.market.prime import generate_names
+from warframe_metrics.utils.collect_data import to_class
+from warframe_metrics.utils.collect_data import to_stats
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.schema import LiveStats
+from warframe_metrics.utils.schema import Stats
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+BENCHMARKS = [
+    "to_class",
+    "to_stats",
+    "merge",
+    "diff",
+    "to_json",
+    "from_json",
+    "generate_names",
+    "best_prime_complex",
+]
+
+
+def package_version() -> str:
+    """The installed version of warframe_metrics."""
+    try:
+        from importlib.metadata import version
+    except ImportError:  # Python 3.7
+        from importlib_metadata import version
+    try:
+        return version("warframe-metrics")
+    except Exception:
+        return "unknown"
+
+
+def timeit(setup: Callable[[], Any], func: Callable[[Any], Any], repeat: int) -> List:
+    """Time `func` on fresh `setup` output `repeat` times."""
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        func(args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def build_case(num_items: int, num_days: int, seed: int) -> Dict:
+    """Generate all payloads and objects the benchmarks of one case need."""
+    today = SyntheticCatalogue(num_items, num_days, seed=seed)
+    yesterday = SyntheticCatalogue(
+        num_items,
+        num_days,
+        seed=seed + 1,
+        end=today.end - datetime.timedelta(days=1),
+    )
+    case = {"catalogue": today, "closed": [], "live": [], "stats": [], "old": []}
+    items = today.short_items()
+    for index, item in enumerate(items):
+        payload = today.stats_payload(item.url_name)["payload"]
+        closed = payload["statistics_closed"]["90days"]
+        live = payload["statistics_live"]["48hours"]
+        case["closed"].append(closed)
+        case["live"].append(live)
+        stat = to_stats(
+            today.closed_stats(index), today.live_stats(index), item.item_name
+        )
+        case["stats"].append(stat)
+        old = to_stats(
+            yesterday.closed_stats(index), yesterday.live_stats(index), item.item_name
+        )
+        case["old"].append(old)
+    case["item_stats"] = ItemStats(items, case["stats"])
+    case["old_item_stats"] = ItemStats(items, case["old"])
+    case["json"] = to_json(case["item_stats"])
+    return case
+
+
+def run_case(case: Dict, repeat: int, vault_csv: str, selected: set) -> Dict:
+    """Run the selected benchmarks of a case and return (times, operations)."""
+    catalogue = case["catalogue"]
+    rows = sum(len(c) + len(v) for c, v in zip(case["closed"], case["live"]))
+    objects = [
+        (catalogue.closed_stats(i), catalogue.live_stats(i), s.item_name)
+        for i, s in enumerate(case["stats"])
+    ]
+    benchmarks = {
+        "to_class": (
+            lambda: case,
+            lambda c: [
+                (to_class(Stats, closed), to_class(LiveStats, live))
+                for closed, live in zip(c["closed"], c["live"])
+            ],
+            rows,
+        ),
+        "to_stats": (lambda: objects, lambda o: [to_stats(*a) for a in o], rows),
+        "merge": (
+            lambda: copy.deepcopy(case["old"]),
+            lambda old: [o.merge(n) for o, n in zip(old, case["stats"])],
+            len(case["old"]),
+        ),
+        "diff": (
+            lambda: case["old_item_stats"],
+            lambda old: old.diff(case["item_stats"]),
+            len(case["old"]),
+        ),
+        "to_json": (lambda: case["item_stats"], to_json, len(case["json"])),
+        "from_json": (
+            lambda: case["json"],
+            lambda s: from_json(ItemStats, s),
+            len(case["json"]),
+        ),
+        "generate_names": (
+            lambda: case["item_stats"],
+            lambda s: generate_names(s, vault_csv),
+            catalogue.num_items,
+        ),
+        "best_prime_complex": (
+            lambda: case["item_stats"],
+            lambda s: best_prime_complex(vault_csv, s),
+            catalogue.num_items,
+        ),
+    }
+    results = {}
+    for name, (setup, func, ops) in benchmarks.items():
+        if name in selected:
+            results[name] = (timeit(setup, func, repeat), ops)
+    return results
+
+
+def run(args: argparse.Namespace) -> None:
+    """Run the benchmark grid and write the results as json."""
+    output = {
+        "meta": {
+            "version": package_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": [],
+    }
+    selected = set(args.benchmarks or BENCHMARKS)
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_items in args.items:
+            for num_days in args.days:
+                case = build_case(num_items, num_days, args.seed)
+                vault_csv = case["catalogue"].vault_csv(os.path.join(tmp, "vault.csv"))
+                results = run_case(case, args.repeat, vault_csv, selected)
+                for name, (times, ops) in results.items():
+                    result = {
+                        "name": name,
+                        "items": num_items,
+                        "days": num_days,
+                        "min": min(times),
+                        "median": statistics.median(times),
+                        "operations": ops,
+                        "operations_per_second": ops / min(times),
+                    }
+                    output["results"].append(result)
+                    print(
+                        "%-20s items=%-7d days=%-5d min=%.4fs median=%.4fs"
+                        % (name, num_items, num_days, result["min"], result["median"]),
+                        file=sys.stderr,
+                    )
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def compare(args: argparse.Namespace) -> None:
+    """Print the relative change of every benchmark between two result files."""
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    old_results = {(r["name"], r["items"], r["days"]): r for r in old["results"]}
+    print(
+        "%-20s %8s %6s %10s %10s %8s"
+        % ("benchmark", "items", "days", "old (s)", "new (s)", "ratio")
+    )
+    for r in new["results"]:
+        key = (r["name"], r["items"], r["days"])
+        if key not in old_results:
+            continue
+        ratio = r["min"] / old_results[key]["min"]
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = " slower"
+        elif ratio < 1 - args.threshold:
+            flag = " faster"
+        print(
+            "%-20s %8d %6d %10.4f %10.4f %7.2fx%s"
+            % (
+                r["name"],
+                r["items"],
+                r["days"],
+                old_results[key]["min"],
+                r["min"],
+                ratio,
+                flag,
+            )
+        )
+
+
+def main() -> None:
+    """Parse the command line and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command")
+    run_parser = sub.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--items", type=int, nargs="+", default=[100])
+    run_parser.add_argument("--days", type=int, nargs="+", default=[90])
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS)
+    run_parser.add_argument("--output", help="json file to write results to")
+    compare_parser = sub.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args)
+    else:
+        if args.command is None:
+            args = run_parser.parse_args([])
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
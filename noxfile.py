@@ -148,6 +148,14 @@ def typeguard(session: Session) -> None:
     session.run("pytest", f"--typeguard-packages={package}", *session.posargs)
 
 
+@session(python="3.9")
+def benchmarks(session: Session) -> None:
+    """Run the benchmark suite over synthetic catalogues."""
+    args = session.posargs or ["run", "--output", "benchmarks.json"]
+    session.install(".")
+    session.run("python", "benchmarks/bench.py", *args)
+
+
 @session(python=python_versions)
 def xdoctest(session: Session) -> None:
     """Run examples with xdoctest."""
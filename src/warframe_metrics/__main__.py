@@ -0,0 +1,6 @@
+"""Run the command-line interface with ``python -m warframe_metrics``."""
+import sys
+
+from .main import main
+
+sys.exit(main())
@@ -0,0 +1,376 @@
+"""Module for technical indicators computed over collected statistics."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+
+from ..utils.datetime_utils import DAY_MS
+from ..utils.schema import ItemStats
+
+
+@dataclass
+class StatMatrix:
+    """Closed statistics of many items aligned on a shared day axis.
+
+    Each array in `values` has shape ``(len(ids), len(days))``. The `days`
+    run without gaps from the first to the last day of any item, so the
+    windows of the indicators span calendar days. Days on which an item has
+    no statistics are NaN.
+    """
+
+    ids: List[str]
+    days: np.ndarray
+    values: Dict[str, np.ndarray]
+
+
+def stat_matrix(
+    item_stats: ItemStats,
+    columns: Sequence[str] = ("wa_prices", "volumes"),
+    mod_rank: int = 0,
+) -> StatMatrix:
+    """Align the closed statistics of every item into day-indexed arrays.
+
+    Args:
+        item_stats: The `ItemStats` object to read statistics from.
+        columns: The `Stat` attributes to collect, such as "wa_prices".
+        mod_rank: For ranked items (mods, arcanes) only the rows of this
+            rank are used so that every item has one row per day.
+
+    Returns:
+        A `StatMatrix` holding one row per item and one column per day from
+        the first to the last day of any item.
+    """
+    ids = []
+    item_days = []
+    item_rows = []
+    for id, stat in item_stats:
+        days = np.array(stat.timestamps, dtype=np.int64) // DAY_MS
+        rows = np.arange(len(days))
+        if len(stat.mod_ranks) > 0:
+            ranks = np.array([r or 0 for r in stat.mod_ranks])
+            rows = rows[ranks == mod_rank]
+        ids.append(id)
+        item_days.append(days[rows])
+        item_rows.append(rows)
+    present = np.concatenate(item_days) if item_days else np.array([], np.int64)
+    if len(present) > 0:
+        all_days = np.arange(present.min(), present.max() + 1, dtype=np.int64)
+    else:
+        all_days = present
+    values = {}
+    for col in columns:
+        arr = np.full((len(ids), len(all_days)), np.nan)
+        for i, (id, days, rows) in enumerate(zip(ids, item_days, item_rows)):
+            col_values = np.array(getattr(item_stats.get_stats(id), col), dtype=float)
+            arr[i, days - all_days[0]] = col_values[rows]
+        values[col] = arr
+    return StatMatrix(ids, all_days, values)
+
+
+def ema(
+    values: np.ndarray, span: int, state: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exponential moving average along the last axis.
+
+    Missing values (NaN) carry the previous average forward.
+
+    Args:
+        values: An array of shape ``(items, days)``.
+        span: The span of the average, alpha is ``2 / (span + 1)``.
+        state: The last average of each item from a previous call.
+
+    Returns:
+        The averages with the same shape as `values` and the new state.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(values, dtype=float)
+    if state is None:
+        state = np.full(values.shape[0], np.nan)
+    s = state.copy()
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        s = np.where(
+            np.isnan(s), x, np.where(np.isnan(x), s, alpha * x + (1 - alpha) * s)
+        )
+        out[:, t] = s
+    return out, s
+
+
+def rsi(
+    values: np.ndarray, period: int = 14, state: Optional[Dict] = None
+) -> Tuple[np.ndarray, Dict]:
+    """Relative strength index along the last axis using Wilder smoothing.
+
+    Args:
+        values: An array of prices with shape ``(items, days)``.
+        period: The smoothing period. Values are NaN until `period` price
+            changes have been seen for an item.
+        state: The state returned by a previous call.
+
+    Returns:
+        The RSI values between 0 and 100 and the new state.
+    """
+    n = values.shape[0]
+    if state is None:
+        state = {
+            "last": np.full(n, np.nan),
+            "gain": np.full(n, np.nan),
+            "loss": np.full(n, np.nan),
+            "count": np.zeros(n, dtype=np.int64),
+        }
+    last = state["last"].copy()
+    gain = state["gain"].copy()
+    loss = state["loss"].copy()
+    count = state["count"].copy()
+    alpha = 1.0 / period
+    out = np.full(values.shape, np.nan)
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        change = x - last
+        valid = ~np.isnan(change)
+        up = np.where(valid, np.maximum(change, 0.0), 0.0)
+        down = np.where(valid, np.maximum(-change, 0.0), 0.0)
+        first = valid & np.isnan(gain)
+        gain = np.where(first, up, gain)
+        loss = np.where(first, down, loss)
+        update = valid & ~first
+        gain = np.where(update, alpha * up + (1 - alpha) * gain, gain)
+        loss = np.where(update, alpha * down + (1 - alpha) * loss, loss)
+        count = count + valid
+        last = np.where(np.isnan(x), last, x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+        out[:, t] = np.where(count >= period, value, np.nan)
+    return out, {"last": last, "gain": gain, "loss": loss, "count": count}
+
+
+def _rolling_sums(
+    values: np.ndarray, window: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rolling sum, sum of squares and count of non-NaN values."""
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    pad = np.zeros((values.shape[0], 1))
+    csum = np.concatenate([pad, np.cumsum(filled, axis=1)], axis=1)
+    csq = np.concatenate([pad, np.cumsum(filled * filled, axis=1)], axis=1)
+    ccount = np.concatenate([pad, np.cumsum(valid, axis=1)], axis=1)
+    start = np.maximum(np.arange(1, values.shape[1] + 1) - window, 0)
+    end = np.arange(1, values.shape[1] + 1)
+    return (
+        csum[:, end] - csum[:, start],
+        csq[:, end] - csq[:, start],
+        ccount[:, end] - ccount[:, start],
+    )
+
+
+def bollinger_bands(
+    values: np.ndarray, window: int = 20, num_std: float = 2.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger bands along the last axis.
+
+    The bands use the population standard deviation and are NaN unless all
+    `window` days of the window are present.
+
+    Args:
+        values: An array of prices with shape ``(items, days)``.
+        window: The number of days in the moving window.
+        num_std: The number of standard deviations between middle and bands.
+
+    Returns:
+        The middle, upper and lower bands.
+    """
+    total, total_sq, count = _rolling_sums(values, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mid = total / count
+        std = np.sqrt(np.maximum(total_sq / count - mid * mid, 0.0))
+    full = count == window
+    mid = np.where(full, mid, np.nan)
+    std = np.where(full, std, np.nan)
+    return mid, mid + num_std * std, mid - num_std * std
+
+
+def vwap(prices: np.ndarray, volumes: np.ndarray, window: int = 7) -> np.ndarray:
+    """Volume weighted average price over a moving window along the last axis.
+
+    Args:
+        prices: An array of prices (usually "wa_prices") of shape ``(items, days)``.
+        volumes: An array of volumes with the same shape as `prices`.
+        window: The number of days in the moving window.
+
+    Returns:
+        The VWAP values, NaN where no volume was traded within the window.
+    """
+    valid = ~(np.isnan(prices) | np.isnan(volumes))
+    pv = np.where(valid, prices * volumes, np.nan)
+    vol = np.where(valid, volumes, np.nan)
+    pv_sum = _rolling_sums(pv, window)[0]
+    vol_sum = _rolling_sums(vol, window)[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(vol_sum > 0, pv_sum / vol_sum, np.nan)
+
+
+class IndicatorEngine(object):
+    """Computes indicators for a whole catalogue and updates them incrementally.
+
+    The engine keeps the state of the recursive indicators (EMA, RSI) and the
+    tail of the windowed ones (Bollinger bands, VWAP), so appending new days
+    only costs work proportional to the new days.
+    """
+
+    def __init__(
+        self,
+        ema_spans: Sequence[int] = (7, 30),
+        bollinger_window: int = 20,
+        bollinger_std: float = 2.0,
+        rsi_period: int = 14,
+        vwap_window: int = 7,
+    ) -> None:
+        """Create an IndicatorEngine object."""
+        self.ema_spans = tuple(ema_spans)
+        self.bollinger_window = bollinger_window
+        self.bollinger_std = bollinger_std
+        self.rsi_period = rsi_period
+        self.vwap_window = vwap_window
+        self.ids = []
+        self.last_day = None
+        self._ema_state = {}
+        self._rsi_state = None
+        self._tail_prices = None
+        self._tail_volumes = None
+
+    def compute(
+        self, prices: np.ndarray, volumes: np.ndarray, ids: Optional[List[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Compute every indicator over the full history, resetting the state.
+
+        Args:
+            prices: An array of prices of shape ``(items, days)``.
+            volumes: An array of volumes with the same shape as `prices`.
+            ids: The item ids of the rows, used by `update_item_stats`.
+
+        Returns:
+            A dictionary of indicator name to array with the shape of `prices`.
+        """
+        n = prices.shape[0]
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(n)]
+        self._ema_state = {span: None for span in self.ema_spans}
+        self._rsi_state = None
+        self._tail_prices = np.empty((n, 0))
+        self._tail_volumes = np.empty((n, 0))
+        return self.update(prices, volumes)
+
+    def update(self, prices: np.ndarray, volumes: np.ndarray) -> Dict[str, np.ndarray]:
+        """Compute the indicators for newly appended days only.
+
+        Args:
+            prices: An array of prices of shape ``(items, new_days)`` whose rows
+                follow the same item order as the previous call.
+            volumes: An array of volumes with the same shape as `prices`.
+
+        Returns:
+            A dictionary of indicator name to array with the shape of `prices`.
+        """
+        new_days = prices.shape[1]
+        result = {}
+        for span in self.ema_spans:
+            result["ema_%d" % span], self._ema_state[span] = ema(
+                prices, span, self._ema_state[span]
+            )
+        result["rsi"], self._rsi_state = rsi(prices, self.rsi_period, self._rsi_state)
+        ext_prices = np.concatenate([self._tail_prices, prices], axis=1)
+        ext_volumes = np.concatenate([self._tail_volumes, volumes], axis=1)
+        mid, upper, lower = bollinger_bands(
+            ext_prices, self.bollinger_window, self.bollinger_std
+        )
+        result["bollinger_mid"] = mid[:, ext_prices.shape[1] - new_days :]
+        result["bollinger_upper"] = upper[:, ext_prices.shape[1] - new_days :]
+        result["bollinger_lower"] = lower[:, ext_prices.shape[1] - new_days :]
+        result["vwap"] = vwap(ext_prices, ext_volumes, self.vwap_window)[
+            :, ext_prices.shape[1] - new_days :
+        ]
+        keep = max(self.bollinger_window, self.vwap_window) - 1
+        self._tail_prices = ext_prices[:, ext_prices.shape[1] - keep :]
+        self._tail_volumes = ext_volumes[:, ext_volumes.shape[1] - keep :]
+        return result
+
+    def _add_items(self, ids: List[str]) -> None:
+        """Add rows with empty state for items not seen before."""
+        extra = len(ids)
+        self.ids.extend(ids)
+        for span in self.ema_spans:
+            if self._ema_state[span] is not None:
+                self._ema_state[span] = np.concatenate(
+                    [self._ema_state[span], np.full(extra, np.nan)]
+                )
+        if self._rsi_state is not None:
+            for key, value in self._rsi_state.items():
+                fill = np.zeros(extra, dtype=value.dtype)
+                if key != "count":
+                    fill = np.full(extra, np.nan)
+                self._rsi_state[key] = np.concatenate([value, fill])
+        tail = np.full((extra, self._tail_prices.shape[1]), np.nan)
+        self._tail_prices = np.concatenate([self._tail_prices, tail])
+        self._tail_volumes = np.concatenate([self._tail_volumes, tail])
+
+    def compute_item_stats(
+        self, item_stats: ItemStats, price_column: str = "wa_prices"
+    ) -> Tuple[StatMatrix, Dict[str, np.ndarray]]:
+        """Compute every indicator for all items of an `ItemStats` object.
+
+        Args:
+            item_stats: The `ItemStats` object with (possibly merged) history.
+            price_column: The `Stat` attribute used as the price series.
+
+        Returns:
+            The aligned `StatMatrix` and the dictionary of indicators.
+        """
+        matrix = stat_matrix(item_stats, [price_column, "volumes"])
+        result = self.compute(
+            matrix.values[price_column], matrix.values["volumes"], matrix.ids
+        )
+        if len(matrix.days) > 0:
+            self.last_day = int(matrix.days[-1])
+        return matrix, result
+
+    def update_item_stats(
+        self, item_stats: ItemStats, price_column: str = "wa_prices"
+    ) -> Tuple[StatMatrix, Dict[str, np.ndarray]]:
+        """Update the indicators with the days newer than the last seen day.
+
+        The last seen day is shared by the whole catalogue, so rows added for
+        older days of a lagging item are not picked up. Items that were not
+        part of the previous computation start with an empty state.
+
+        Args:
+            item_stats: The `ItemStats` object with the appended history.
+            price_column: The `Stat` attribute used as the price series.
+
+        Returns:
+            A `StatMatrix` of the new days only, in the engine's item order,
+            and the dictionary of indicators for those days.
+        """
+        if self.last_day is None:
+            return self.compute_item_stats(item_stats, price_column)
+        matrix = stat_matrix(item_stats, [price_column, "volumes"])
+        known = set(self.ids)
+        self._add_items([id for id in matrix.ids if id not in known])
+        new_cols = matrix.days > self.last_day
+        positions = {id: i for i, id in enumerate(matrix.ids)}
+        values = {}
+        for col in (price_column, "volumes"):
+            arr = np.full((len(self.ids), int(new_cols.sum())), np.nan)
+            for i, id in enumerate(self.ids):
+                if id in positions:
+                    arr[i] = matrix.values[col][positions[id], new_cols]
+            values[col] = arr
+        result = self.update(values[price_column], values["volumes"])
+        days = matrix.days[new_cols]
+        if len(days) > 0:
+            self.last_day = int(days[-1])
+        return StatMatrix(list(self.ids), days, values), result
@@ -1 +1,549 @@
-"""Module for command-line interface."""
+"""Module for command-line interface.
+
+Every subcommand imports what it needs when it runs, so that short
+invocations such as ``warframe-metrics rank --quick`` do not pay for
+importing requests, desert or the collectors.
+"""
+import argparse
+import sys
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+FILTER_PATTERN = r"^(\w+)(=|~)(.*)$"
+
+
+def _parse_filter(value: str) -> str:
+    """Check a ``key=value`` or ``key~regex`` filter argument."""
+    import re
+
+    match = re.match(FILTER_PATTERN, value)
+    if match is None:
+        raise argparse.ArgumentTypeError(
+            "filters must look like key=value or key~regex: " + value
+        )
+    if match.group(2) == "~":
+        try:
+            re.compile(match.group(3))
+        except re.error as e:
+            raise argparse.ArgumentTypeError(
+                "invalid regular expression in %s: %s" % (value, e)
+            ) from None
+    return value
+
+
+def _parse_filters(filters: Optional[List[str]], prime: bool = False) -> Dict[str, Any]:
+    """Parse ``key=value`` and ``key~regex`` pairs into a filters dictionary.
+
+    Repeating a key with ``=`` matches any of its values, and `prime` adds
+    the `PRIME_FILTERS` preset on top of any item name condition. The pairs
+    are checked by `_parse_filter`, the ``type`` of the ``--filter``
+    arguments, so invalid pairs are usage errors.
+
+    Args:
+        filters: The ``key=value`` and ``key~regex`` pairs, if any.
+        prime: Whether to add the `PRIME_FILTERS` preset.
+
+    Returns:
+        The filters dictionary, see `compile_filters`.
+    """
+    import re
+
+    from .utils.filters import PRIME_FILTERS
+
+    parsed = {}
+    for f in filters or []:
+        key, op, value = re.match(FILTER_PATTERN, _parse_filter(f)).groups()
+        if op == "~":
+            parsed[key] = re.compile(value)
+        elif isinstance(parsed.get(key), set):
+            parsed[key].add(value)
+        else:
+            parsed[key] = {value}
+    if prime:
+        pattern = PRIME_FILTERS["item_name"]
+        condition = parsed.get("item_name")
+        if condition is None:
+            parsed["item_name"] = pattern
+        elif isinstance(condition, set):
+            parsed["item_name"] = {v for v in condition if pattern.search(v)}
+        else:
+            parsed["item_name"] = lambda v: bool(
+                pattern.search(v) and condition.search(v)
+            )
+    return parsed
+
+
+def _parse_shard(value: str) -> Any:
+    """Parse an ``index/num_shards`` shard argument."""
+    from .utils.shard import parse_shard
+
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def _catalogue_cache(args: argparse.Namespace) -> Any:
+    """The `CatalogueCache` selected by the catalogue arguments, if any."""
+    if args.catalogue_cache is None:
+        return None
+    from .utils.catalogue import CatalogueCache
+
+    return CatalogueCache(args.catalogue_cache, ttl=args.catalogue_ttl)
+
+
+def _parse_cache(args: argparse.Namespace) -> Any:
+    """The `ParseCache` selected by the parse cache arguments, if any."""
+    if args.parse_cache is None:
+        return None
+    from .utils.parse_cache import ParseCache
+
+    return ParseCache(args.parse_cache, max_bytes=args.parse_cache_size * 2**20)
+
+
+def _read_snapshot(path: str) -> Any:
+    """Load an `ItemStats` json snapshot, or open an indexed one lazily."""
+    from .utils.snapshot import open_snapshot
+
+    return open_snapshot(path)
+
+
+def _write_snapshot(item_stats: Any, path: str) -> None:
+    """Write an `ItemStats` json snapshot."""
+    from .utils.schema import to_json
+
+    # serialized first, as lazy statistics may be read from the same path
+    data = to_json(item_stats)
+    with open(path, "w") as f:
+        f.write(data)
+
+
+def _collect(args: argparse.Namespace, store: Optional[str] = None) -> Any:
+    """Collect statistics as selected by the collection arguments.
+
+    With `store`, the statistics are written to that indexed snapshot as they
+    are collected, see `market_data`.
+
+    Args:
+        args: The parsed command-line arguments.
+        store: The indexed snapshot to write the statistics to, if any.
+
+    Returns:
+        The collected statistics, read lazily from `store` when given.
+    """
+    from .utils.collect_data import market_data
+
+    return market_data(
+        filters=_parse_filters(args.filter, args.prime),
+        progress_bar=args.progress,
+        timeout=args.timeout,
+        api_url=args.api_url,
+        shard=args.shard,
+        platform=args.platform[0] if args.platform else None,
+        catalogue=_catalogue_cache(args),
+        store=store,
+        parse_cache=_parse_cache(args),
+    )
+
+
+def collect(args: argparse.Namespace) -> int:
+    """Collect statistics and write them to a snapshot.
+
+    With several platforms, each is written to its own snapshot named after
+    the output with the platform before the extension. With ``--indexed``,
+    the snapshots are indexed snapshots written item by item.
+
+    Args:
+        args: The parsed command-line arguments.
+
+    Returns:
+        The exit status.
+    """
+    if not args.platform or len(args.platform) == 1:
+        if args.indexed:
+            _collect(args, store=args.output)
+        else:
+            _write_snapshot(_collect(args), args.output)
+        return 0
+    import os
+
+    from .utils.collect_data import collect_platforms
+
+    root, ext = os.path.splitext(args.output)
+    paths = {p: "%s.%s%s" % (root, p, ext) for p in args.platform}
+    results = collect_platforms(
+        args.platform,
+        filters=_parse_filters(args.filter, args.prime),
+        api_url=args.api_url,
+        shard=args.shard,
+        catalogue=_catalogue_cache(args),
+        parse_cache=_parse_cache(args),
+        stores=paths if args.indexed else None,
+    )
+    if not args.indexed:
+        for platform, item_stats in results.items():
+            _write_snapshot(item_stats, paths[platform])
+    return 0
+
+
+def refresh(args: argparse.Namespace) -> int:
+    """Collect statistics and merge them into an existing snapshot."""
+    if args.platform and len(args.platform) > 1:
+        print("refresh collects a single platform", file=sys.stderr)
+        return 2
+    item_stats = _read_snapshot(args.snapshot)
+    item_stats.merge(_collect(args), newer=True)
+    _write_snapshot(item_stats, args.output or args.snapshot)
+    return 0
+
+
+def merge(args: argparse.Namespace) -> int:
+    """Merge an older and a newer snapshot."""
+    item_stats = _read_snapshot(args.older)
+    item_stats.merge(_read_snapshot(args.newer), newer=True)
+    _write_snapshot(item_stats, args.output)
+    return 0
+
+
+def combine(args: argparse.Namespace) -> int:
+    """Combine partial snapshots, such as those of shards, into one."""
+    from .utils.shard import combine_snapshots
+
+    _write_snapshot(combine_snapshots(args.partials), args.output)
+    return 0
+
+
+def archive(args: argparse.Namespace) -> int:
+    """Add a snapshot to a deduplicated archive."""
+    import os
+
+    from .utils.archive import SnapshotArchive
+
+    name = args.name or os.path.splitext(os.path.basename(args.snapshot))[0]
+    SnapshotArchive(args.archive).add(name, _read_snapshot(args.snapshot))
+    return 0
+
+
+def restore(args: argparse.Namespace) -> int:
+    """Restore a snapshot from a deduplicated archive."""
+    from .utils.archive import SnapshotArchive
+
+    _write_snapshot(SnapshotArchive(args.archive).load(args.name), args.output)
+    return 0
+
+
+def index(args: argparse.Namespace) -> int:
+    """Write a snapshot as an indexed snapshot, opened lazily when read."""
+    from .utils.snapshot import write_indexed_snapshot
+
+    write_indexed_snapshot(_read_snapshot(args.snapshot), args.output)
+    return 0
+
+
+def rank(args: argparse.Namespace) -> int:
+    """Print the ranked prime items of a category, best first."""
+    from .market.prime import prime_ranking
+
+    prime_data = None
+    if not args.quick:
+        if args.data is None:
+            print("rank needs --data unless --quick is used", file=sys.stderr)
+            return 2
+        prime_data = _read_snapshot(args.data)
+    names = prime_ranking(
+        args.vault_csv, args.category, prime_data, buy=args.buy, quick=args.quick
+    )
+    for name in names:
+        print(name)
+    return 0
+
+
+def orders(args: argparse.Namespace) -> int:
+    """Print the best bid, best ask and spread of each selected item."""
+    from .utils.orders import collect_order_books
+
+    books = collect_order_books(
+        filters=_parse_filters(args.filter),
+        statuses=set(args.status) if args.status else None,
+        progress_bar=args.progress,
+        api_url=args.api_url,
+        catalogue=_catalogue_cache(args),
+    )
+    print("item_name\tbest_bid\tbest_ask\tspread")
+    for book in books.values():
+        values = [book.best_bid(), book.best_ask(), book.spread()]
+        print(
+            "\t".join([book.item_name] + ["" if v is None else str(v) for v in values])
+        )
+    return 0
+
+
+def export(args: argparse.Namespace) -> int:
+    """Export the closed statistics of a snapshot as a long csv file."""
+    import csv
+
+    item_stats = _read_snapshot(args.snapshot)
+    columns = args.columns
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "item_name", "date", "mod_rank"] + columns)
+        for id, stat in item_stats:
+            ranks = stat.mod_ranks or [None] * len(stat.timestamps)
+            values = [getattr(stat, c) for c in columns]
+            for i, date in enumerate(stat.dates):
+                row = [id, stat.item_name, date.isoformat(), ranks[i]]
+                writer.writerow(row + [v[i] for v in values])
+    return 0
+
+
+def daemon(args: argparse.Namespace) -> int:
+    """Keep a snapshot fresh, refreshing active items more often."""
+    from .utils.daemon import CollectorDaemon
+    from .utils.daemon import RefreshScheduler
+
+    filters = _parse_filters(args.filter, args.prime)
+    collector = CollectorDaemon(
+        args.snapshot,
+        filters=filters,
+        requests_per_second=args.rate,
+        scheduler=RefreshScheduler(args.min_interval, args.max_interval),
+        compact_every=args.compact_every,
+        api_url=args.api_url,
+        live_capacity=args.live_hours,
+        live_history=args.live_history,
+        catalogue=_catalogue_cache(args),
+        parse_cache=_parse_cache(args),
+    )
+    try:
+        collector.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    """Serve queries on a snapshot, publishing it again whenever it changes."""
+    import os
+    import time
+
+    from .market.server import QueryServer
+
+    mtime = os.path.getmtime(args.snapshot)
+    server = QueryServer(
+        _read_snapshot(args.snapshot),
+        vault_csv=args.vault_csv,
+        buy=args.buy,
+        host=args.host,
+        port=args.port,
+    )
+    print("Serving %s at %s" % (args.snapshot, server.url))
+    server.start()
+    try:
+        while True:
+            time.sleep(args.reload)
+            if os.path.getmtime(args.snapshot) != mtime:
+                mtime = os.path.getmtime(args.snapshot)
+                server.publish(_read_snapshot(args.snapshot))
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+def _add_catalogue_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments of the catalogue cache."""
+    parser.add_argument(
+        "--catalogue-cache",
+        metavar="DIR",
+        help="cache the item catalogue in DIR, used offline when stale",
+    )
+    parser.add_argument(
+        "--catalogue-ttl",
+        type=float,
+        default=24 * 3600,
+        metavar="SECONDS",
+        help="seconds before the cached catalogue is requested again",
+    )
+
+
+def _add_parse_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments of the parse cache."""
+    parser.add_argument(
+        "--parse-cache",
+        metavar="DIR",
+        help="cache the statistics parsed from each response in DIR",
+    )
+    parser.add_argument(
+        "--parse-cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="megabytes of parsed statistics kept in the parse cache",
+    )
+
+
+def _add_collect_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments selecting what to collect."""
+    from .utils.constants import API_URL
+    from .utils.constants import PLATFORMS
+
+    parser.add_argument("--prime", action="store_true", help="collect prime items")
+    parser.add_argument(
+        "--filter",
+        action="append",
+        type=_parse_filter,
+        metavar="KEY=VALUE",
+        help="only collect items whose attribute KEY equals VALUE (or one of "
+        "the VALUEs if repeated), or matches a regular expression with KEY~REGEX",
+    )
+    parser.add_argument("--progress", action="store_true", help="show progress")
+    parser.add_argument(
+        "--timeout", type=float, default=1.0, help="seconds to wait every ten items"
+    )
+    parser.add_argument("--api-url", default=API_URL, help="warframe.market api url")
+    parser.add_argument(
+        "--shard",
+        type=_parse_shard,
+        metavar="INDEX/COUNT",
+        help="only collect the items of one of COUNT shards",
+    )
+    parser.add_argument(
+        "--platform",
+        action="append",
+        choices=PLATFORMS,
+        help="platform to collect, repeat to collect several concurrently",
+    )
+    _add_catalogue_arguments(parser)
+    _add_parse_cache_arguments(parser)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser."""
+    from .utils.constants import API_URL
+
+    parser = argparse.ArgumentParser(
+        prog="warframe-metrics", description="Warframe market metrics."
+    )
+    sub = parser.add_subparsers(dest="command", metavar="command")
+    sub.required = True
+
+    p = sub.add_parser("collect", help="collect statistics into a snapshot")
+    _add_collect_arguments(p)
+    p.add_argument("--output", "-o", required=True, help="snapshot to write")
+    p.add_argument(
+        "--indexed",
+        action="store_true",
+        help="write an indexed snapshot, item by item as they are collected",
+    )
+    p.set_defaults(func=collect)
+
+    p = sub.add_parser("refresh", help="collect and merge into a snapshot")
+    p.add_argument("snapshot", help="snapshot to refresh")
+    _add_collect_arguments(p)
+    p.add_argument("--output", "-o", help="snapshot to write, defaults to input")
+    p.set_defaults(func=refresh)
+
+    p = sub.add_parser("merge", help="merge an older and a newer snapshot")
+    p.add_argument("older")
+    p.add_argument("newer")
+    p.add_argument("--output", "-o", required=True, help="snapshot to write")
+    p.set_defaults(func=merge)
+
+    p = sub.add_parser("combine", help="combine partial snapshots into one")
+    p.add_argument("partials", nargs="+", help="partial snapshots to combine")
+    p.add_argument("--output", "-o", required=True, help="snapshot to write")
+    p.set_defaults(func=combine)
+
+    p = sub.add_parser("archive", help="add a snapshot to an archive")
+    p.add_argument("archive", help="archive directory")
+    p.add_argument("snapshot", help="snapshot to add")
+    p.add_argument("--name", help="name in the archive, defaults to file name")
+    p.set_defaults(func=archive)
+
+    p = sub.add_parser("restore", help="restore a snapshot from an archive")
+    p.add_argument("archive", help="archive directory")
+    p.add_argument("name", help="name of the snapshot in the archive")
+    p.add_argument("--output", "-o", required=True, help="snapshot to write")
+    p.set_defaults(func=restore)
+
+    p = sub.add_parser("index", help="write a snapshot as an indexed snapshot")
+    p.add_argument("snapshot", help="snapshot to index")
+    p.add_argument("--output", "-o", required=True, help="indexed snapshot to write")
+    p.set_defaults(func=index)
+
+    p = sub.add_parser("rank", help="rank prime items of a category")
+    p.add_argument("vault_csv", help="csv (or url) of prime vault dates")
+    p.add_argument("category", help="item type such as Warframe or Primary")
+    p.add_argument("--data", help="prime snapshot, not needed with --quick")
+    p.add_argument("--buy", action="store_true", help="rank for buying")
+    p.add_argument("--quick", action="store_true", help="rank by vault dates only")
+    p.set_defaults(func=rank)
+
+    p = sub.add_parser("daemon", help="keep a snapshot fresh until interrupted")
+    p.add_argument("snapshot", help="snapshot to load and persist to")
+    p.add_argument("--prime", action="store_true", help="collect prime items")
+    p.add_argument("--filter", action="append", type=_parse_filter, metavar="KEY=VALUE")
+    p.add_argument("--api-url", default=API_URL, help="warframe.market api url")
+    p.add_argument("--rate", type=float, default=1.0, help="requests per second")
+    p.add_argument("--min-interval", type=float, default=15 * 60)
+    p.add_argument("--max-interval", type=float, default=24 * 3600)
+    p.add_argument("--compact-every", type=int, default=100)
+    p.add_argument(
+        "--live-hours", type=int, help="hourly live rows to keep across refreshes"
+    )
+    p.add_argument(
+        "--live-history", action="store_true", help="keep live rows beyond that"
+    )
+    _add_catalogue_arguments(p)
+    _add_parse_cache_arguments(p)
+    p.set_defaults(func=daemon)
+
+    p = sub.add_parser("serve", help="serve queries on a snapshot over http")
+    p.add_argument("snapshot", help="snapshot to serve, reloaded when it changes")
+    p.add_argument("--vault-csv", help="csv (or url) of vault dates for rankings")
+    p.add_argument("--buy", action="store_true", help="rank for buying")
+    p.add_argument("--host", default="127.0.0.1", help="host to bind to")
+    p.add_argument("--port", type=int, default=8080, help="port to bind to")
+    p.add_argument(
+        "--reload",
+        type=float,
+        default=60.0,
+        metavar="SECONDS",
+        help="seconds between checks of the snapshot for new data",
+    )
+    p.set_defaults(func=serve)
+
+    p = sub.add_parser("orders", help="print the top of the order books")
+    p.add_argument("--filter", action="append", type=_parse_filter, metavar="KEY=VALUE")
+    p.add_argument(
+        "--status",
+        action="append",
+        help="only count orders of users with this status, such as ingame",
+    )
+    p.add_argument("--progress", action="store_true", help="show progress")
+    p.add_argument("--api-url", default=API_URL, help="warframe.market api url")
+    _add_catalogue_arguments(p)
+    p.set_defaults(func=orders)
+
+    p = sub.add_parser("export", help="export a snapshot as csv")
+    p.add_argument("snapshot")
+    p.add_argument("--output", "-o", required=True, help="csv file to write")
+    p.add_argument(
+        "--columns",
+        nargs="+",
+        default=["volumes", "min_prices", "max_prices", "avg_prices", "wa_prices"],
+        help="Stat attributes to export",
+    )
+    p.set_defaults(func=export)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command-line interface."""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
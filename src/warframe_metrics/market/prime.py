@@ -1,26 +1,31 @@
 """A module for analyzing prime parts."""
+from __future__ import annotations
+
+import bisect
 import datetime
-import time
-from contextlib import nullcontext
 from datetime import timezone
+from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
 from typing import Union
 
-import pandas as pd
-from alive_progress import alive_bar
-
-from ..utils.collect_data import collect_data
-from ..utils.collect_data import from_url
-from ..utils.collect_data import to_class
-from ..utils.collect_data import to_stats
-from ..utils.constants import ITEMS_URL
-from ..utils.constants import STATS_URL
+from ..utils import metrics
+from ..utils.collect_data import market_data
+from ..utils.constants import API_URL
+from ..utils.datetime_utils import DAY_MS
+from ..utils.datetime_utils import to_timestamp
+from ..utils.fetch import Fetcher
+from ..utils.filters import PRIME_FILTERS
 from ..utils.schema import ItemStats
-from ..utils.schema import LiveStats
-from ..utils.schema import ShortItem
 from ..utils.schema import Stat
-from ..utils.schema import Stats
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+RANK_FEATURES = ["Volume Ratio", "Price Diff", "Percent Price Diff", "Date Diff"]
 
 
 def best_primes_simple(vault_df: pd.DataFrame, buy: bool = False) -> pd.DataFrame:
@@ -36,6 +41,8 @@ def best_primes_simple(vault_df: pd.DataFrame, buy: bool = False) -> pd.DataFram
         A pandas dataframe sorted in order of prefence. The first ones are either
         the best ranked to buy or sell (based on the parameter `buy`).
     """
+    import pandas as pd
+
     df = vault_df.copy()
     df["Last Unvaulting"] = pd.to_datetime(df["Last Unvaulting"]).dt.tz_localize(
         timezone.utc
@@ -69,6 +76,8 @@ def get_change(current: float, previous: float) -> float:
 
 def generate_names(prime_items: ItemStats, vault_csv: str) -> pd.DataFrame:
     """Generate names for prime parts within the csv."""
+    import pandas as pd
+
     vault_csv = pd.read_csv(vault_csv)
     names_to_items = dict((k.lower(), v) for k, v in prime_items.name_items.items())
     new_rows = []
@@ -83,38 +92,39 @@ def generate_names(prime_items: ItemStats, vault_csv: str) -> pd.DataFrame:
     return pd.DataFrame(new_rows)
 
 
-def collect_prime_data(progress_bar: bool = False, timeout: float = 1.0) -> ItemStats:
-    """Collects primes from warframe market. Waits 1 second per 10 items collected."""
-    json_data = from_url(ITEMS_URL)
-    json_data = collect_data(json_data, ["payload", "items"])
-    items = to_class(ShortItem, json_data)
-    prime_items = []
-    prime_stats = []
-    if progress_bar:
-        cm = alive_bar(len(items))
-    else:
-        cm = nullcontext()
-    with cm as bar:
-        for j, i in enumerate(items):
-            if "prime" in i.item_name.lower():
-                json_data = from_url(STATS_URL % (i.url_name))
-                stat_closed = collect_data(
-                    json_data, ["payload", "statistics_closed", "90days"]
-                )
-                stat_live = collect_data(
-                    json_data, ["payload", "statistics_live", "48hours"]
-                )
-                stat_closed = to_class(Stats, stat_closed)
-                stat_live = to_class(LiveStats, stat_live)
-                stat = to_stats(stat_closed, stat_live, i.item_name)
-                prime_stats.append(stat)
-                prime_items.append(i)
-                if j % 10 == 0:
-                    time.sleep(timeout)
-            if type(cm) is not nullcontext:
-                bar()
-
-    return ItemStats(prime_items, prime_stats)
+def collect_prime_data(
+    progress_bar: bool = False,
+    timeout: float = 1.0,
+    api_url: str = API_URL,
+    fetcher: Optional[Fetcher] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    platform: Optional[str] = None,
+) -> ItemStats:
+    """Collects primes from warframe market. Waits 1 second per 10 items collected.
+
+    This is `market_data` with the `PRIME_FILTERS` preset.
+
+    Args:
+        progress_bar: Whether to use a progress bar or not.
+        timeout: The number of seconds to wait every ten items.
+        api_url: The base url of the API.
+        fetcher: The `Fetcher` throttling and retrying the requests, defaults
+            to the shared `default_fetcher`.
+        shard: Only collect the items of this ``(index, num_shards)`` shard.
+        platform: The platform to collect, one of `PLATFORMS`.
+
+    Returns:
+        The statistics of the prime items.
+    """
+    return market_data(
+        filters=PRIME_FILTERS,
+        progress_bar=progress_bar,
+        timeout=timeout,
+        api_url=api_url,
+        fetcher=fetcher,
+        shard=shard,
+        platform=platform,
+    )
 
 
 def find_index(
@@ -124,20 +134,16 @@ def find_index(
     num_days: Optional[int] = None,
 ) -> int:
     """Finds the index within the given timeframe from `Stat` object."""
-    if len(stat.dates) == 0:
+    timestamps = stat.timestamps
+    if len(timestamps) == 0:
         return 0, 0
-    dates = stat.dates
     min_date = min(unvault_date, datetime.datetime.now(tz=timezone.utc) - time_delta)
-    i = j = 0
-    while dates[i] < min_date and i < len(dates):
-        i += 1
-    if num_days is None:
-        j = len(dates)
+    i = bisect.bisect_left(timestamps, to_timestamp(min_date))
+    if num_days is None or i == len(timestamps):
+        j = len(timestamps)
     else:
-        j = i + 1
-        max_date = dates[i] + datetime.timedelta(days=num_days)
-        while dates[j] < max_date and j < len(dates):
-            j += 1
+        max_timestamp = timestamps[i] + num_days * DAY_MS
+        j = bisect.bisect_left(timestamps, max_timestamp, i + 1)
     return i, j
 
 
@@ -166,6 +172,69 @@ def get_stat_within_date(
     return stat_list[i:j]
 
 
+def prime_metrics(
+    stat: Stat, unvaulted_date: Optional[datetime.datetime]
+) -> Dict[str, float]:
+    """The raw ranking metrics of one prime part, see `best_prime_complex`.
+
+    Args:
+        stat: The `Stat` object of the prime part.
+        unvaulted_date: The last unvaulting date of the part, None assumes it
+            was unvaulted 90 days ago.
+
+    Returns:
+        A dictionary of the "Volume Ratio", "Price Diff", "Percent Price Diff"
+        and "Date Diff" metrics, before normalization.
+    """
+    percent_thresh = 30
+    days_to_consider = 10
+    time_delta = datetime.timedelta(days=120)
+    if unvaulted_date is None:
+        unvaulted_date = datetime.datetime.now(tz=timezone.utc) - datetime.timedelta(
+            days=90
+        )
+    date_diff = datetime.datetime.now(tz=timezone.utc) - unvaulted_date
+    max_buys = get_stat_within_date(
+        stat, "max_prices", unvaulted_date, time_delta, buy=True
+    )
+    min_sells = get_stat_within_date(
+        stat, "min_prices", unvaulted_date, time_delta, buy=False
+    )
+    # max_buys = stat.get_live_stats('max_prices', buy=True)
+    # min_sells = stat.get_live_stats('min_prices', buy=False)
+    min_sell = sum(min_sells) / len(min_sells)
+    max_buy = sum(max_buys) / len(max_buys)
+
+    if get_change(max_buy, min_sell) > percent_thresh:
+        selling_price = min_sell
+    else:
+        selling_price = (max_buy + min_sell) / 2.0
+    prev_lows = get_stat_within_date(
+        stat,
+        "avg_prices",
+        unvaulted_date,
+        time_delta,
+        buy=None,
+        num_days=days_to_consider,
+    )
+    prev_low = sum(prev_lows) / len(prev_lows)
+    volumes_buy = get_stat_within_date(
+        stat, "volumes", unvaulted_date, time_delta, buy=True
+    )
+    volume_buy = sum(volumes_buy)
+    volumes_sell = get_stat_within_date(
+        stat, "volumes", unvaulted_date, time_delta, buy=False
+    )
+    volume_sell = sum(volumes_sell)
+    return {
+        "Volume Ratio": volume_buy / volume_sell,
+        "Price Diff": selling_price - prev_low,
+        "Percent Price Diff": get_change(selling_price, prev_low),
+        "Date Diff": date_diff.total_seconds(),
+    }
+
+
+@metrics.timed("rank_seconds")
 def best_prime_complex(
     vault_csv: str, prime_data: ItemStats, buy: bool = False
 ) -> pd.DataFrame:
@@ -192,71 +261,21 @@ def best_prime_complex(
     Returns:
         A dataframe sorted in the desired order based on the parameter `buy`.
     """
+    import pandas as pd
+
     vault_df = generate_names(prime_data, vault_csv)
     best_primes = best_primes_simple(vault_df, buy=buy)
-    percent_thresh = 30
-    days_to_consider = 10
-    time_delta = datetime.timedelta(days=120)
     rows_list = []
     for _, p in best_primes.iterrows():
         item = prime_data.get_item(p["Item Name"])
         stat = prime_data.get_stats(item.id)
-
-        unvaulted_date = p["Last Unvaulting"]
-        if unvaulted_date is None:
-            unvaulted_date = datetime.datetime.now(
-                tz=timezone.utc
-            ) - datetime.timedelta(days=90)
-        date_diff = datetime.datetime.now(tz=timezone.utc) - unvaulted_date
-        max_buys = get_stat_within_date(
-            stat, "max_prices", unvaulted_date, time_delta, buy=True
-        )
-        min_sells = get_stat_within_date(
-            stat, "min_prices", unvaulted_date, time_delta, buy=False
-        )
-        # max_buys = stat.get_live_stats('max_prices', buy=True)
-        # min_sells = stat.get_live_stats('min_prices', buy=False)
-        min_sell = sum(min_sells) / len(min_sells)
-        max_buy = sum(max_buys) / len(max_buys)
-
-        if get_change(max_buy, min_sell) > percent_thresh:
-            selling_price = min_sell
-        else:
-            selling_price = (max_buy + min_sell) / 2.0
-        prev_lows = get_stat_within_date(
-            stat,
-            "avg_prices",
-            unvaulted_date,
-            time_delta,
-            buy=None,
-            num_days=days_to_consider,
-        )
-        prev_low = sum(prev_lows) / len(prev_lows)
-        volumes_buy = get_stat_within_date(
-            stat, "volumes", unvaulted_date, time_delta, buy=True
-        )
-        volume_buy = sum(volumes_buy)
-        volumes_sell = get_stat_within_date(
-            stat, "volumes", unvaulted_date, time_delta, buy=False
-        )
-        volume_sell = sum(volumes_sell)
-        diff = selling_price - prev_low
-        percent_diff = get_change(selling_price, prev_low)
-        volume_ratio = volume_buy / volume_sell
-        row = {
-            "Item Name": p["Item Name"],
-            "Volume Ratio": volume_ratio,
-            "Price Diff": diff,
-            "Percent Price Diff": percent_diff,
-            "Date Diff": date_diff.total_seconds(),
-            "Currently Vaulted": p["Currently Vaulted"],
-            "Item Type": p["Item Type"],
-        }
+        row = {"Item Name": p["Item Name"]}
+        row.update(prime_metrics(stat, p["Last Unvaulting"]))
+        row["Currently Vaulted"] = p["Currently Vaulted"]
+        row["Item Type"] = p["Item Type"]
         rows_list.append(row)
     df = pd.DataFrame(rows_list)
-    df = normalize(
-        df, ["Volume Ratio", "Price Diff", "Percent Price Diff", "Date Diff"]
-    )
+    df = normalize(df, RANK_FEATURES)
     df["Metric"] = (
         df["Volume Ratio"]
         + df["Price Diff"]
@@ -280,6 +299,120 @@ def normalize(df: pd.DataFrame, features: List[str]) -> pd.DataFrame:
     return result
 
 
+class PrimeRanking(object):
+    """The `best_prime_complex` ranking, maintained as items change.
+
+    The raw metrics of every prime part are stored, and `update` only
+    recomputes those of the items that changed. The minimum and maximum of
+    every metric are maintained in sorted lists, so `ranking` normalizes and
+    sorts the stored metrics without recomputing any of them. The "Date Diff"
+    metric is stored as the negated unvaulting time, which normalizes to the
+    same values while not depending on when each item was last updated.
+
+    Args:
+        vault_csv: A string (can be a download url) of the location of the csv
+            file for vault dates, as in `best_prime_complex`. It is read once.
+        buy: A boolean representing whether we are buying or selling warframe
+            parts.
+    """
+
+    def __init__(self, vault_csv: str, buy: bool = False) -> None:
+        """Create a PrimeRanking object."""
+        import pandas as pd
+
+        self.buy = buy
+        vault_df = best_primes_simple(pd.read_csv(vault_csv), buy=buy)
+        self._vault = [(p["Item Name"].lower(), p) for _, p in vault_df.iterrows()]
+        self.rows = {}
+        self._sorted = {f: [] for f in RANK_FEATURES}
+
+    def __len__(self) -> int:
+        """The number of ranked prime parts."""
+        return len(self.rows)
+
+    def _discard(self, key: Tuple[int, str]) -> None:
+        """Remove the row of `key` and its metrics from the sorted lists."""
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        for f in RANK_FEATURES:
+            values = self._sorted[f]
+            del values[bisect.bisect_left(values, row[f])]
+
+    def update(
+        self, prime_data: ItemStats, names: Optional[Iterable[str]] = None
+    ) -> int:
+        """Recompute the metrics of the items `names` from `prime_data`.
+
+        Args:
+            prime_data: The `ItemStats` object for prime data.
+            names: The names of the items that changed, None updates every
+                item of `prime_data` and removes the rows of any other item.
+                Names no longer in `prime_data` are removed from the ranking.
+
+        Returns:
+            The number of ranked rows recomputed.
+        """
+        if names is None:
+            names = list(prime_data.name_items)
+            current = {name.lower() for name in names}
+            for key in [key for key in self.rows if key[1] not in current]:
+                self._discard(key)
+        updated = 0
+        for name in names:
+            prime_name = name.lower()
+            for position, (vault_name, p) in enumerate(self._vault):
+                if vault_name not in prime_name:
+                    continue
+                key = (position, prime_name)
+                self._discard(key)
+                if name not in prime_data.name_items:
+                    continue
+                stat = prime_data.get_stats(prime_data.get_item(name).id)
+                unvaulted_date = p["Last Unvaulting"]
+                row = prime_metrics(stat, unvaulted_date)
+                row["Date Diff"] = -unvaulted_date.timestamp()
+                for f in RANK_FEATURES:
+                    bisect.insort(self._sorted[f], row[f])
+                row["Item Name"] = prime_name.title()
+                row["Last Unvaulting"] = unvaulted_date
+                row["Item Type"] = p["Item Type"]
+                self.rows[key] = row
+                updated += 1
+        return updated
+
+    def min(self, feature: str) -> float:
+        """The minimum raw value of `feature` over the ranked items."""
+        return self._sorted[feature][0]
+
+    def max(self, feature: str) -> float:
+        """The maximum raw value of `feature` over the ranked items."""
+        return self._sorted[feature][-1]
+
+    def ranking(self) -> pd.DataFrame:
+        """The current ranking, as returned by `best_prime_complex`."""
+        import pandas as pd
+
+        columns = ["Item Name"] + RANK_FEATURES + ["Currently Vaulted", "Item Type"]
+        if not self.rows:
+            return pd.DataFrame(columns=columns + ["Metric"])
+        df = pd.DataFrame([self.rows[key] for key in sorted(self.rows)])
+        for f in RANK_FEATURES:
+            df[f] = (df[f] - self.min(f)) / (self.max(f) - self.min(f))
+        vaulted_before = datetime.datetime.now(tz=timezone.utc) - datetime.timedelta(
+            days=120
+        )
+        df["Currently Vaulted"] = df["Last Unvaulting"] < vaulted_before
+        df["Metric"] = (
+            df["Volume Ratio"]
+            + df["Price Diff"]
+            + df["Percent Price Diff"]
+            + df["Date Diff"]
+        ) / 4.0
+        df = df[columns + ["Metric"]]
+        return df.sort_values("Metric", ascending=self.buy, kind="mergesort")
+
+
 def prime_ranking(
     vault_csv: str,
     category: str,
@@ -316,12 +449,14 @@ def prime_ranking(
     Returns:
         A dataframe sorted in the desired order based on the parameter `buy`.
     """
+    import pandas as pd
+
     if quick:
         vault_df = pd.read_csv(vault_csv)
-        best_primes = best_primes_simple(vault_df, category, buy=buy)
+        best_primes = best_primes_simple(vault_df, buy=buy)
     else:
         best_primes = best_prime_complex(
-            vault_csv=vault_csv, category=category, prime_data=prime_data, buy=buy
+            vault_csv=vault_csv, prime_data=prime_data, buy=buy
         )
     best_primes = best_primes[best_primes["Item Type"].str.lower() == category.lower()]
     return best_primes["Item Name"].to_list()
@@ -0,0 +1,229 @@
+"""Holds a local http server answering queries on the latest snapshot.
+
+`QueryServer` keeps the latest published `ItemStats` snapshot in memory and
+precomputes the body of every response when data is published, so answering
+a request is a dictionary lookup. The endpoints are
+
+* ``/items``, the catalogue items of the snapshot,
+* ``/items/<url_name>``, the item and its statistics series, and
+* ``/rankings/<category>``, the `PrimeRanking` of a category such as
+  ``warframe``, when a vault csv is given.
+
+Every response carries an ``ETag`` of its content, and requests whose
+``If-None-Match`` header holds it are answered with 304 Not Modified, so
+dashboards polling the server revalidate instead of downloading again.
+"""
+import hashlib
+import math
+import threading
+from dataclasses import asdict
+from json import dumps
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Mapping
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from urllib.parse import unquote
+
+from ..utils import metrics
+from ..utils.http_server import BackgroundServer
+from ..utils.schema import ItemStats
+from ..utils.schema import json_serial
+from .prime import PrimeRanking
+
+Response = Tuple[bytes, str]
+
+
+def _response(payload: Any) -> Response:
+    """The encoded body of `payload` and its ETag."""
+    body = dumps(payload, default=json_serial, separators=(",", ":")).encode()
+    return body, '"%s"' % hashlib.blake2b(body, digest_size=10).hexdigest()
+
+
+def _finite(value: float) -> Optional[float]:
+    """`value`, or None if it is not finite and so not valid json."""
+    return value if math.isfinite(value) else None
+
+
+class QueryServer(BackgroundServer):
+    """A local http server serving precomputed responses on a snapshot.
+
+    The server runs in a background thread and can be used as a context
+    manager, see `BackgroundServer`. Data is published with `publish`,
+    which recomputes the responses of the items that changed and swaps them
+    in at once, so requests are never answered from half-published data.
+
+    Args:
+        item_stats: The statistics to publish first, None publishes nothing.
+        vault_csv: A string (can be a download url) of the location of the
+            csv file for vault dates, see `PrimeRanking`. None serves no
+            rankings.
+        buy: Whether rankings are for buying rather than selling.
+        host: The host to bind to.
+        port: The port to bind to, 0 picks a free port.
+    """
+
+    def __init__(
+        self,
+        item_stats: Optional[ItemStats] = None,
+        vault_csv: Optional[str] = None,
+        buy: bool = False,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """Create a QueryServer object."""
+        self.ranking = PrimeRanking(vault_csv, buy=buy) if vault_csv else None
+        self.counts = {"requests": 0, "ok": 0, "not_modified": 0, "not_found": 0}
+        self.snapshot = None
+        self._responses = {}
+        self._publish_lock = threading.Lock()
+        self._lock = threading.Lock()
+        super().__init__(host, port)
+        if item_stats is not None:
+            self.publish(item_stats)
+
+    def _candidates(self, snapshot: ItemStats) -> Set[str]:
+        """The ids of the items that may have changed since the last publish.
+
+        Statistics are updated copy-on-write, see `ItemStats.snapshot`, so
+        an item whose `Stat` object is the same one is unchanged. Items read
+        again from disk are new objects even when their content is not, and
+        `publish` compares their responses instead.
+
+        Args:
+            snapshot: The snapshot about to be published.
+
+        Returns:
+            The ids of the items added, removed or holding another `Stat`.
+        """
+        if self.snapshot is None:
+            return set(snapshot.items)
+        old = self.snapshot
+        changed = {id for id in old.items if id not in snapshot.items}
+        for id in snapshot.items:
+            if id not in old.items or snapshot._peek(id) is not old._peek(id):
+                changed.add(id)
+        return changed
+
+    @metrics.timed("query_publish_seconds")
+    def publish(
+        self, item_stats: ItemStats, ids: Optional[Iterable[str]] = None
+    ) -> int:
+        """Publish new statistics, recomputing the responses that changed.
+
+        Args:
+            item_stats: The statistics to serve. A snapshot of them is taken,
+                so they may keep being updated afterwards.
+            ids: The ids of the items that may have changed since the last
+                publish, None finds them by comparing the snapshots. Items
+                whose response content did not change keep their ETag and
+                leave the rankings as they are either way.
+
+        Returns:
+            The number of items whose responses changed.
+        """
+        with self._publish_lock:
+            snapshot = item_stats.snapshot()
+            candidates = self._candidates(snapshot) if ids is None else set(ids)
+            old = self.snapshot.items if self.snapshot is not None else {}
+            responses = dict(self._responses)
+            responses["/items"] = _response(
+                [asdict(item) for item in snapshot.items.values()]
+            )
+            changed = set()
+            names = set()
+            for id in candidates:
+                response = None
+                if id in snapshot.items:
+                    item = snapshot.items[id]
+                    response = _response(
+                        {
+                            "item": asdict(item),
+                            "statistics": snapshot.get_stats(id).to_json(),
+                        }
+                    )
+                    previous = responses.get("/items/" + item.url_name)
+                    unchanged = previous is not None and previous[1] == response[1]
+                    if unchanged and old.get(id) == item:
+                        continue
+                changed.add(id)
+                for items in (old, snapshot.items):
+                    if id in items:
+                        names.add(items[id].item_name)
+                        responses.pop("/items/" + items[id].url_name, None)
+                if response is not None:
+                    responses["/items/" + snapshot.items[id].url_name] = response
+            if self.ranking is not None and names:
+                self.ranking.update(snapshot, names)
+                for path in [p for p in responses if p.startswith("/rankings/")]:
+                    del responses[path]
+                responses.update(self._rankings())
+            self.snapshot = snapshot
+            self._responses = responses
+        metrics.increment("query_responses_computed_total", len(candidates))
+        return len(changed)
+
+    def _rankings(self) -> Dict[str, Response]:
+        """The responses of the rankings of every category."""
+        df = self.ranking.ranking()
+        rankings = {}
+        for _, row in df.iterrows():
+            category = str(row["Item Type"]).lower()
+            rankings.setdefault(category, []).append(
+                {
+                    "item_name": row["Item Name"],
+                    "metric": _finite(float(row["Metric"])),
+                    "currently_vaulted": bool(row["Currently Vaulted"]),
+                }
+            )
+        buy = self.ranking.buy
+        responses = {}
+        for category, items in rankings.items():
+            payload = {"category": category, "buy": buy, "items": items}
+            responses["/rankings/" + category] = _response(payload)
+        return responses
+
+    def respond(
+        self, path: str, etag: Optional[str] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """The status, headers and body answering a GET request of `path`.
+
+        Args:
+            path: The path requested, without its query string.
+            etag: The value of the ``If-None-Match`` header, if any.
+
+        Returns:
+            The http status, the headers and the body of the response.
+        """
+        path = unquote(path).lower().rstrip("/")
+        response = self._responses.get(path)
+        if response is None:
+            with self._lock:
+                self.counts["requests"] += 1
+                self.counts["not_found"] += 1
+            return 404, {}, b'{"error": "Not Found"}'
+        body, tag = response
+        headers = {"ETag": tag, "Cache-Control": "no-cache"}
+        not_modified = etag is not None and tag in [t.strip() for t in etag.split(",")]
+        with self._lock:
+            self.counts["requests"] += 1
+            self.counts["not_modified" if not_modified else "ok"] += 1
+        if not_modified:
+            return 304, headers, b""
+        return 200, headers, body
+
+    def answer(
+        self, path: str, headers: Mapping[str, str]
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """Answer a GET request, revalidating its ``If-None-Match`` header.
+
+        Args:
+            path: The path requested, without its query string.
+            headers: The headers of the request.
+
+        Returns:
+            The http status, the headers and the body of the response.
+        """
+        return self.respond(path, headers.get("If-None-Match"))
@@ -0,0 +1,34 @@
+"""Holds the measure of how actively an item is traded.
+
+`item_activity` is shared by the `CollectorDaemon`, which refreshes active
+items more often, and the `MemoryBudget`, which spills the least active
+items first.
+"""
+import math
+from typing import Tuple
+
+from .schema import Stat
+
+
+def item_activity(stat: Stat, days: int = 7) -> Tuple[float, float]:
+    """The recent volume and price volatility of an item.
+
+    Args:
+        stat: The `Stat` object of the item.
+        days: The number of most recent closed statistics rows to consider.
+
+    Returns:
+        The traded volume over the recent rows (plus the live volume) and the
+        standard deviation of the relative day to day changes of the average
+        price over those rows.
+    """
+    volumes = stat.volumes[-days:]
+    volume = float(sum(volumes))
+    volume += sum(stat.live_stat_buy.volumes) + sum(stat.live_stat_sell.volumes)
+    prices = [p for p in stat.avg_prices[-(days + 1) :] if p]
+    changes = [(b - a) / a for a, b in zip(prices, prices[1:])]
+    if len(changes) < 2:
+        return volume, 0.0
+    mean = sum(changes) / len(changes)
+    variance = sum((c - mean) ** 2 for c in changes) / len(changes)
+    return volume, math.sqrt(variance)
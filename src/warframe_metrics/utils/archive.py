@@ -0,0 +1,214 @@
+"""Holds a compressed, content-addressed archive of `ItemStats` snapshots.
+
+Consecutive daily snapshots repeat almost all of their closed statistics, so
+the archive splits the closed statistics of every item into chunks of rows
+aligned to calendar periods of `chunk_days` days. Each chunk is stored once
+under the hash of its content, and a snapshot is a small manifest listing
+the chunks of every item. A new daily snapshot then only adds the chunks of
+the periods that changed, usually the first and the last one.
+
+The layout of an archive directory is::
+
+    objects/<hash[:2]>/<hash>    compressed chunks
+    snapshots/<name>.json        manifests
+
+Chunks are compressed with zstandard when it is installed and with zlib
+otherwise. Each chunk records its codec, so archives written with either can
+be read as long as the codec is available.
+"""
+import hashlib
+import json
+import os
+import zlib
+from dataclasses import asdict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from .datetime_utils import DAY_MS
+from .schema import ItemStats
+from .schema import json_serial
+from .schema import ShortItem
+from .schema import Stat
+
+ROW_COLUMNS = (
+    "dates",
+    "volumes",
+    "avg_prices",
+    "medians",
+    "mod_ranks",
+    "min_prices",
+    "max_prices",
+    "open_prices",
+    "closed_prices",
+    "wa_prices",
+    "moving_avgs",
+    "donch_tops",
+    "donch_bots",
+)
+
+
+def _compress(data: bytes, level: Optional[int] = None) -> bytes:
+    """Compress `data`, prefixed with a byte naming the codec."""
+    try:
+        import zstandard
+    except ImportError:
+        return b"z" + zlib.compress(data, 6 if level is None else level)
+    compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+    return b"Z" + compressor.compress(data)
+
+
+def _decompress(blob: bytes) -> bytes:
+    """Decompress a blob written by `_compress`."""
+    codec, data = blob[:1], blob[1:]
+    if codec == b"z":
+        return zlib.decompress(data)
+    if codec == b"Z":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError("unknown codec %r" % codec)
+
+
+def _encode(obj: Any) -> bytes:
+    """Encode `obj` as canonical json, so equal content hashes equally."""
+    return json.dumps(
+        obj, default=json_serial, sort_keys=True, separators=(",", ":")
+    ).encode()
+
+
+class SnapshotArchive(object):
+    """A directory of deduplicated, compressed `ItemStats` snapshots.
+
+    Args:
+        directory: The directory of the archive, created when missing.
+        chunk_days: The number of days of closed statistics per chunk.
+            Chunks are aligned to multiples of `chunk_days` days since the
+            unix epoch, so the same days land in the same chunk in every
+            snapshot.
+        level: The compression level, None uses the codec default.
+    """
+
+    def __init__(
+        self, directory: str, chunk_days: int = 7, level: Optional[int] = None
+    ) -> None:
+        """Create a SnapshotArchive object."""
+        self.directory = directory
+        self.chunk_days = chunk_days
+        self.level = level
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "snapshots"), exist_ok=True)
+
+    def _object_path(self, key: str) -> str:
+        """The path of the object with hash `key`."""
+        return os.path.join(self.directory, "objects", key[:2], key)
+
+    def _snapshot_path(self, name: str) -> str:
+        """The path of the manifest of snapshot `name`."""
+        return os.path.join(self.directory, "snapshots", name + ".json")
+
+    def put(self, data: bytes) -> str:
+        """Store `data` unless already present, returning its hash."""
+        key = hashlib.sha256(data).hexdigest()
+        path = self._object_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_compress(data, self.level))
+            os.replace(tmp_path, path)
+        return key
+
+    def get(self, key: str) -> bytes:
+        """The data stored under hash `key`."""
+        with open(self._object_path(key), "rb") as f:
+            return _decompress(f.read())
+
+    def _chunks(self, json_data: Dict[str, Any]) -> List[Dict[str, List]]:
+        """Split the closed statistics rows of a `Stat` json into aligned chunks."""
+        dates = json_data["dates"]
+        columns = [c for c in ROW_COLUMNS if len(json_data[c]) == len(dates)]
+        chunks = []
+        last_period = None
+        for i, date in enumerate(dates):
+            period = date // (self.chunk_days * DAY_MS)
+            if period != last_period:
+                chunks.append({c: [] for c in columns})
+                last_period = period
+            for c in columns:
+                chunks[-1][c].append(json_data[c][i])
+        return chunks
+
+    def _put_stat(self, stat: Stat) -> Dict[str, Any]:
+        """Store the chunks and header of `stat`, returning its manifest entry."""
+        json_data = stat.to_json()
+        chunks = self._chunks(json_data)
+        header = {
+            k: v for k, v in json_data.items() if not chunks or k not in chunks[0]
+        }
+        return {
+            "header": self.put(_encode(header)),
+            "chunks": [self.put(_encode(chunk)) for chunk in chunks],
+        }
+
+    def _get_stat(self, entry: Dict[str, Any]) -> Stat:
+        """Reconstruct a `Stat` object from its manifest entry."""
+        json_data = json.loads(self.get(entry["header"]))
+        for key in entry["chunks"]:
+            for column, values in json.loads(self.get(key)).items():
+                json_data.setdefault(column, []).extend(values)
+        return Stat.from_json(json_data)
+
+    def add(self, name: str, item_stats: ItemStats) -> None:
+        """Store `item_stats` as snapshot `name`, replacing any previous one.
+
+        Args:
+            name: The name of the snapshot, such as its date.
+            item_stats: The `ItemStats` object to store.
+        """
+        manifest = {"items": [], "stats": []}
+        for id, stat in item_stats:
+            manifest["items"].append(asdict(item_stats.get_item_by_id(id)))
+            manifest["stats"].append(self._put_stat(stat))
+        path = self._snapshot_path(name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def load(self, name: str) -> ItemStats:
+        """Reconstruct snapshot `name` as an `ItemStats` object."""
+        with open(self._snapshot_path(name)) as f:
+            manifest = json.load(f)
+        items = [ShortItem(**i) for i in manifest["items"]]
+        stats = [self._get_stat(entry) for entry in manifest["stats"]]
+        return ItemStats(items, stats)
+
+    def names(self) -> List[str]:
+        """The names of the stored snapshots, sorted."""
+        return sorted(
+            n[: -len(".json")]
+            for n in os.listdir(os.path.join(self.directory, "snapshots"))
+            if n.endswith(".json")
+        )
+
+    def remove(self, name: str) -> None:
+        """Remove snapshot `name`, its chunks are freed by `collect_garbage`."""
+        os.remove(self._snapshot_path(name))
+
+    def collect_garbage(self) -> int:
+        """Delete the objects no snapshot refers to, returning their number."""
+        live = set()
+        for name in self.names():
+            with open(self._snapshot_path(name)) as f:
+                for entry in json.load(f)["stats"]:
+                    live.add(entry["header"])
+                    live.update(entry["chunks"])
+        removed = 0
+        objects = os.path.join(self.directory, "objects")
+        for prefix in os.listdir(objects):
+            for key in os.listdir(os.path.join(objects, prefix)):
+                if key not in live:
+                    os.remove(os.path.join(objects, prefix, key))
+                    removed += 1
+        return removed
@@ -0,0 +1,160 @@
+"""Holds the persisted cache of the item catalogue of the items endpoint.
+
+The catalogue of some 3,000 items changes about once a patch, yet every
+collection starts by requesting and deserializing it. `CatalogueCache`
+keeps one json file per api url and platform under its directory::
+
+    {"fetched_at": ..., "hash": ..., "items": [[thumb, id, item_name,
+    url_name], ...]}
+
+A catalogue younger than `ttl` is loaded straight into `ShortItem` objects
+without any request. An older one is requested again, and its content hash
+decides whether the cached items and their lookup index are still valid.
+When the request fails, a cached catalogue of any age is used instead, so
+collections can start offline.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .collect_data import fetch_catalogue
+from .constants import API_URL
+from .fetch import Fetcher
+from .fetch import MarketAPIError
+from .filters import index_items
+from .schema import ShortItem
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("thumb", "id", "item_name", "url_name")
+
+Index = Dict[str, Dict[Any, List[int]]]
+
+
+def _digest(rows: List[List[str]]) -> str:
+    """The content hash of the catalogue rows."""
+    data = json.dumps(rows, separators=(",", ":")).encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+class CatalogueCache(object):
+    """A directory of cached catalogues, one per api url and platform.
+
+    Args:
+        directory: The directory of the cache, created when missing.
+        ttl: The number of seconds a cached catalogue is used without
+            requesting it again.
+        clock: A function returning the current time in seconds.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: float = 24 * 3600,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Create a CatalogueCache object."""
+        self.directory = directory
+        self.ttl = ttl
+        self.clock = clock
+        self._loaded = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, api_url: str = API_URL, platform: Optional[str] = None) -> str:
+        """The file caching the catalogue of `api_url` and `platform`."""
+        key = "%s|%s" % (api_url, platform)
+        digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+        return os.path.join(self.directory, digest + ".json")
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        """The cached catalogue file at `path`, None when missing or invalid."""
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cached, dict):
+            return None
+        if not {"fetched_at", "hash", "items"} <= cached.keys():
+            return None
+        return cached
+
+    def _write(self, path: str, cached: Dict[str, Any]) -> None:
+        """Write a catalogue file atomically."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cached, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _items(self, path: str, cached: Dict[str, Any]) -> Tuple[List, Index]:
+        """The items and index of `cached`, reused while its hash is unchanged."""
+        loaded = self._loaded.get(path)
+        if loaded is None or loaded[0] != cached["hash"]:
+            items = [ShortItem(*row) for row in cached["items"]]
+            loaded = (cached["hash"], items, index_items(items))
+            self._loaded[path] = loaded
+        return loaded[1], loaded[2]
+
+    def get(
+        self,
+        api_url: str = API_URL,
+        fetcher: Optional[Fetcher] = None,
+        platform: Optional[str] = None,
+        refresh: bool = False,
+    ) -> Tuple[List[ShortItem], Index]:
+        """The catalogue items of `api_url` and `platform`, with their index.
+
+        Args:
+            api_url: The base url of the API.
+            fetcher: The `Fetcher` requesting the catalogue when needed.
+            platform: The platform of the catalogue, one of `PLATFORMS`.
+            refresh: Whether to request the catalogue even if it is fresh.
+
+        Returns:
+            The `ShortItem` objects of the catalogue and their `index_items`
+            index. Both are shared by every call until the catalogue changes,
+            so they must not be modified.
+
+        Raises:
+            MarketAPIError: If the catalogue could not be requested and is not
+                cached.
+        """
+        path = self.path(api_url, platform)
+        with self._lock:
+            cached = self._read(path)
+            now = self.clock()
+            if not refresh and cached and now - cached["fetched_at"] < self.ttl:
+                return self._items(path, cached)
+            try:
+                items = fetch_catalogue(api_url, fetcher, platform)
+            except MarketAPIError:
+                if cached is None:
+                    raise
+                logger.warning("using the cached catalogue of %s", api_url)
+                return self._items(path, cached)
+            rows = [[getattr(i, f) for f in FIELDS] for i in items]
+            digest = _digest(rows)
+            if cached is None or cached["hash"] != digest:
+                cached = {"hash": digest, "items": rows}
+                self._loaded[path] = (digest, items, index_items(items))
+            cached["fetched_at"] = now
+            self._write(path, cached)
+            return self._items(path, cached)
+
+    def clear(self) -> None:
+        """Remove every cached catalogue."""
+        with self._lock:
+            self._loaded.clear()
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
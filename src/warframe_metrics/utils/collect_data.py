@@ -1,30 +1,56 @@
 """Holds the utils required for processing Warframe market data."""
+import functools
+import itertools
+import json
 import time
+from collections import deque
+from contextlib import ExitStack
 from contextlib import nullcontext
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import TYPE_CHECKING
 from typing import Union
 
-import desert
-import requests
-from alive_progress import alive_bar
-from marshmallow.utils import EXCLUDE
-
-from .constants import ITEMS_URL
-from .constants import STATS_URL
+from . import metrics
+from .constants import API_URL
+from .constants import ITEMS_PATH
+from .constants import PLATFORMS
+from .constants import STATS_PATH
+from .fetch import default_fetcher
+from .fetch import Fetcher
+from .fetch import MarketAPIError
+from .filters import compile_filters
+from .filters import Filters
 from .schema import ItemStats
 from .schema import LiveStats
 from .schema import ShortItem
 from .schema import Stat
 from .schema import Stats
+from .snapshot import LazyItemStats
+from .snapshot import SnapshotWriter
+
+if TYPE_CHECKING:
+    from .catalogue import CatalogueCache
+    from .memory import MemoryBudget
+    from .parse_cache import ParseCache
 
 
 def market_data(
-    filters: Optional[Dict[str, Any]] = None,
+    filters: Optional[Filters] = None,
     progress_bar: bool = False,
     timeout: float = 1.0,
+    api_url: str = API_URL,
+    fetcher: Optional[Fetcher] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    platform: Optional[str] = None,
+    catalogue: Optional["CatalogueCache"] = None,
+    memory_budget: Optional["MemoryBudget"] = None,
+    store: Optional[str] = None,
+    parse_cache: Optional["ParseCache"] = None,
 ) -> ItemStats:
     """Collect data from warframe market API.
 
@@ -32,56 +58,278 @@ def market_data(
     10 items collected. This is to ensure we do not exceed limits.
 
     Args:
-        filters: A dictionary of `ShortItem` attributes to values that will
-            be used to filter the items for which statistics will be collected. If
-            no dictionary is provided, then the default dict of None filters nothing.
+        filters: The filters selecting the items for which statistics will be
+            collected, such as a dictionary of `ShortItem` attributes to
+            values, sets, regular expressions or callables, see
+            `compile_filters`. They are applied to the catalogue before any
+            statistics are requested. If no filters are provided, then the
+            default of None filters nothing.
         progress_bar: Whether to use a progress bar or not.
         timeout: The number of seconds to wait every ten items in order to reduce
             the load on warframe.market API.
+        api_url: The base url of the API, such as the url of a
+            `LocalMarketServer` for offline testing.
+        fetcher: The `Fetcher` throttling and retrying the requests, defaults
+            to the shared `default_fetcher`.
+        shard: Only collect the items of this ``(index, num_shards)`` shard,
+            see `shard_of`.
+        platform: The platform to collect, one of `PLATFORMS`, defaults to
+            the platform the API defaults to.
+        catalogue: The `CatalogueCache` to load the catalogue from, None
+            requests it.
+        memory_budget: The `MemoryBudget` spilling the coldest items to disk
+            when the collected statistics exceed it, not used with a `store`.
+        store: The indexed snapshot to write the statistics of each item to
+            as soon as it is collected, see `SnapshotWriter`, so memory does
+            not grow with the number of items. None holds them in memory.
+        parse_cache: The `ParseCache` of the statistics parsed from
+            previous responses, None parses every response.
 
     Returns:
-        An object of `ItemStats` that contains all the collected data.
+        An object of `ItemStats` that contains all the collected data, a
+        `LazyItemStats` object reading `store` when it is given.
+
+    Raises:
+        ValueError: If both a `memory_budget` and a `store` are given.
     """
-    if filters is None:
-        filters = {}
-    json_data = from_url(ITEMS_URL)
-    json_data = collect_data(json_data, ["payload", "items"])
-    items = to_class(ShortItem, json_data)
-    prime_items = []
-    prime_stats = []
+    from alive_progress import alive_bar
+
+    if memory_budget is not None and store is not None:
+        raise ValueError("a memory budget cannot be used with a store")
+
+    items, index = load_catalogue(api_url, fetcher, platform, catalogue)
+    items = compile_filters(filters).select(items, index, shard=shard)
+    item_stats = ItemStats([], [])
+    writer = SnapshotWriter(store) if store is not None else nullcontext()
     if progress_bar:
         cm = alive_bar(len(items))
     else:
         cm = nullcontext()
-    with cm as bar:
+    with writer, cm as bar:
         for j, i in enumerate(items):
-            matched = all([getattr(i, f) == val for f, val in filters.items()])
-            if matched is True:
-                json_data = from_url(STATS_URL % (i.url_name))
-                stat_closed = collect_data(
-                    json_data, ["payload", "statistics_closed", "90days"]
-                )
-                stat_live = collect_data(
-                    json_data, ["payload", "statistics_live", "48hours"]
-                )
-                stat_closed = to_class(Stats, stat_closed)
-                stat_live = to_class(LiveStats, stat_live)
-                stat = to_stats(stat_closed, stat_live, i.item_name)
-                prime_stats.append(stat)
-                prime_items.append(i)
-                if j % 10 == 0:
-                    time.sleep(timeout)
+            stat = fetch_stat(i, api_url, fetcher, platform, parse_cache)
+            if store is not None:
+                writer.add(i, stat)
+            else:
+                item_stats.add(i, stat)
+                if memory_budget is not None:
+                    memory_budget.track(item_stats, [i.id])
+            if j % 10 == 0:
+                time.sleep(timeout)
             if type(cm) is not nullcontext:
                 bar()
 
-    return ItemStats(prime_items, prime_stats)
+    if store is not None:
+        return LazyItemStats(store)
+    return item_stats
+
+
+def collect_platforms(
+    platforms: Sequence[str] = PLATFORMS,
+    filters: Optional[Filters] = None,
+    api_url: str = API_URL,
+    fetcher: Optional[Fetcher] = None,
+    workers: int = 8,
+    shard: Optional[Tuple[int, int]] = None,
+    catalogue: Optional["CatalogueCache"] = None,
+    parse_cache: Optional["ParseCache"] = None,
+    stores: Optional[Dict[str, str]] = None,
+) -> Dict[str, ItemStats]:
+    """Collect several platforms concurrently through one fetcher.
+
+    The requests of all platforms are interleaved and sent by `workers`
+    threads sharing the throttle of `fetcher`, so the platforms progress
+    together at the request rate the API allows.
+
+    Args:
+        platforms: The platforms to collect, see `PLATFORMS`.
+        filters: The filters selecting the items, as in `market_data`.
+        api_url: The base url of the API.
+        fetcher: The `Fetcher` shared by all requests, defaults to the shared
+            `default_fetcher`.
+        workers: The number of concurrent requests.
+        shard: Only collect the items of this ``(index, num_shards)`` shard.
+        catalogue: The `CatalogueCache` to load the catalogues from.
+        parse_cache: The `ParseCache` of previously parsed statistics.
+        stores: The indexed snapshot of each platform to write the statistics
+            of its items to as they are collected, as the `store` of
+            `market_data`. None holds them in memory.
+
+    Returns:
+        A dictionary of platform to the `ItemStats` collected for it, the
+        `LazyItemStats` reading its store when `stores` are given.
+    """
+    from concurrent.futures import Future
+    from concurrent.futures import ThreadPoolExecutor
+
+    item_filter = compile_filters(filters)
+    if fetcher is None:
+        fetcher = default_fetcher()
+
+    def select(platform: str) -> List[ShortItem]:
+        items, index = load_catalogue(api_url, fetcher, platform, catalogue)
+        return item_filter.select(items, index, shard=shard)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        selected = dict(zip(platforms, pool.map(select, platforms)))
+        rounds = itertools.zip_longest(
+            *[[(p, i) for i in selected[p]] for p in platforms],
+            fillvalue=(None, None),
+        )
+        requests = (
+            (platform, item)
+            for platform, item in itertools.chain.from_iterable(rounds)
+            if item is not None
+        )
+
+        def submit(platform: str, item: ShortItem) -> "Future[Stat]":
+            return pool.submit(
+                fetch_stat, item, api_url, fetcher, platform, parse_cache
+            )
+
+        if stores is None:
+            futures = [(p, submit(p, i)) for p, i in requests]
+            stats = {p: [] for p in platforms}
+            for platform, future in futures:
+                stats[platform].append(future.result())
+            return {p: ItemStats(selected[p], stats[p]) for p in platforms}
+        with ExitStack() as stack:
+            writers = {
+                p: stack.enter_context(SnapshotWriter(stores[p])) for p in platforms
+            }
+
+            def write() -> None:
+                platform, item, future = futures.popleft()
+                writers[platform].add(item, future.result())
+
+            # written in request order, with at most 2 * workers results in
+            # flight or waiting, refilled as each one is written
+            futures = deque()
+            for platform, item in requests:
+                futures.append((platform, item, submit(platform, item)))
+                if len(futures) >= 2 * workers:
+                    write()
+            while futures:
+                write()
+    return {p: LazyItemStats(stores[p]) for p in platforms}
+
+
+def fetch_catalogue(
+    api_url: str = API_URL,
+    fetcher: Optional[Fetcher] = None,
+    platform: Optional[str] = None,
+) -> List[ShortItem]:
+    """Collects the catalogue items of the items endpoint."""
+    json_data = from_url(api_url + ITEMS_PATH, fetcher, platform)
+    return to_class(ShortItem, collect_data(json_data, ["payload", "items"]))
+
+
+def load_catalogue(
+    api_url: str = API_URL,
+    fetcher: Optional[Fetcher] = None,
+    platform: Optional[str] = None,
+    catalogue: Optional["CatalogueCache"] = None,
+) -> Tuple[List[ShortItem], Optional[Dict[str, Dict[Any, List[int]]]]]:
+    """The catalogue items, from the `CatalogueCache` `catalogue` when given.
+
+    Args:
+        api_url: The base url of the API.
+        fetcher: The `Fetcher` throttling and retrying the requests, defaults
+            to the shared `default_fetcher`.
+        platform: The platform of the catalogue, one of `PLATFORMS`.
+        catalogue: The `CatalogueCache` to load the catalogue from, None
+            requests it.
+
+    Returns:
+        The `ShortItem` objects of the catalogue and, when cached, their
+        `index_items` index, None otherwise.
+    """
+    if catalogue is None:
+        return fetch_catalogue(api_url, fetcher, platform), None
+    return catalogue.get(api_url, fetcher, platform)
+
+
+def fetch_stat(
+    item: ShortItem,
+    api_url: str = API_URL,
+    fetcher: Optional[Fetcher] = None,
+    platform: Optional[str] = None,
+    parse_cache: Optional["ParseCache"] = None,
+) -> Stat:
+    """Collects the closed and live statistics of one item into a Stat object.
+
+    With a `parse_cache`, a response identical to one already parsed is
+    loaded from the cache instead of being decoded and parsed again.
+
+    Args:
+        item: The catalogue item to collect the statistics of.
+        api_url: The base url of the API.
+        fetcher: The `Fetcher` throttling and retrying the requests, defaults
+            to the shared `default_fetcher`.
+        platform: The platform to collect, one of `PLATFORMS`.
+        parse_cache: The `ParseCache` of the statistics parsed from
+            previous responses, None parses every response.
+
+    Returns:
+        The statistics of `item`.
+
+    Raises:
+        MarketAPIError: If the response is not valid json.
+    """
+    url = api_url + STATS_PATH % (item.url_name)
+    if parse_cache is None:
+        return parse_stat(from_url(url, fetcher, platform), item.item_name)
+    body = from_url(url, fetcher, platform, raw=True)
+    key = parse_cache.key(body, item.item_name)
+    stat = parse_cache.get(key)
+    if stat is None:
+        try:
+            with metrics.timer("json_decode_seconds"):
+                json_data = json.loads(body)
+        except ValueError:
+            raise MarketAPIError("undecodable response", url) from None
+        stat = parse_stat(json_data, item.item_name)
+        parse_cache.put(key, stat)
+    return stat
+
+
+def parse_stat(json_data: Dict, item_name: str) -> Stat:
+    """Parses the decoded statistics response of an item into a Stat object."""
+    stat_closed = collect_data(json_data, ["payload", "statistics_closed", "90days"])
+    stat_live = collect_data(json_data, ["payload", "statistics_live", "48hours"])
+    stat_closed = to_class(Stats, stat_closed)
+    stat_live = to_class(LiveStats, stat_live)
+    return to_stats(stat_closed, stat_live, item_name)
 
 
-def from_url(url: str) -> Any:
-    """Gets json response from url."""
-    resp = requests.get(url=url)
-    resp_json = resp.json()
-    return resp_json
+def from_url(
+    url: str,
+    fetcher: Optional[Fetcher] = None,
+    platform: Optional[str] = None,
+    raw: bool = False,
+) -> Any:
+    """Gets json response from url.
+
+    Rate limited and failed responses are retried by `fetcher`, which raises
+    `MarketAPIError` once it gives up. The `platform` is sent in the
+    ``Platform`` header the API selects platforms with. With `raw`, the
+    bytes of the response body are returned undecoded.
+
+    Args:
+        url: The url to request.
+        fetcher: The `Fetcher` throttling and retrying the requests, defaults
+            to the shared `default_fetcher`.
+        platform: The platform to request, one of `PLATFORMS`.
+        raw: Whether to return the undecoded body.
+
+    Returns:
+        The decoded json response, or its body with `raw`.
+    """
+    if fetcher is None:
+        fetcher = default_fetcher()
+    if platform is None:
+        return fetcher.get(url, raw=raw)
+    return fetcher.get(url, headers={"Platform": platform}, raw=raw)
 
 
 def collect_data(resp_json: Dict, accesses: List[str]) -> Union[Dict, List]:
@@ -92,12 +340,22 @@ def collect_data(resp_json: Dict, accesses: List[str]) -> Union[Dict, List]:
     return resp_final
 
 
+@functools.lru_cache(maxsize=None)
+def _schema(cls: Any) -> Any:
+    """The desert schema of dataclass `cls`, built once per class."""
+    import desert
+
+    return desert.schema(cls)
+
+
 def to_class(cls: Any, data: List[Dict]) -> List[object]:
     """Collects json response into dataclass using desert."""
-    all_data = []
-    for d in data:
-        desert_cls = desert.schema(cls)
-        all_data.append(desert_cls.load(d, unknown=EXCLUDE))
+    from marshmallow.utils import EXCLUDE
+
+    schema = _schema(cls)
+    with metrics.timer("to_class_seconds"):
+        all_data = schema.load(data, many=True, unknown=EXCLUDE)
+    metrics.increment("to_class_rows_total", len(all_data))
     return all_data
 
 
@@ -105,6 +363,16 @@ def to_stats(
     stats_closed: List[Stats], stats_live: List[LiveStats], item_name: str
 ) -> Stat:
     """Collects statistics into Stat object."""
+    with metrics.timer("to_stats_seconds"):
+        stat = _to_stats(stats_closed, stats_live, item_name)
+    metrics.increment("to_stats_rows_total", len(stats_closed) + len(stats_live))
+    return stat
+
+
+def _to_stats(
+    stats_closed: List[Stats], stats_live: List[LiveStats], item_name: str
+) -> Stat:
+    """Adds closed and live statistics to a new Stat object."""
     stat = Stat(item_name)
     for st in stats_closed:
         stat.add_stat(
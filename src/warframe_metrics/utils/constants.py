@@ -1,3 +1,9 @@
 """Holds the constants required for processing Warframe market data."""
-STATS_URL = "https://api.warframe.market/v1/items/%s/statistics"
-ITEMS_URL = "https://api.warframe.market/v1/items"
+API_URL = "https://api.warframe.market/v1"
+PLATFORMS = ("pc", "ps4", "xbox", "switch")
+ITEMS_PATH = "/items"
+STATS_PATH = "/items/%s/statistics"
+ORDERS_PATH = "/items/%s/orders"
+STATS_URL = API_URL + STATS_PATH
+ITEMS_URL = API_URL + ITEMS_PATH
+ORDERS_URL = API_URL + ORDERS_PATH
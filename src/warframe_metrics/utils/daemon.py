@@ -0,0 +1,301 @@
+"""Holds a long-running collector that refreshes active items more often."""
+import heapq
+import json
+import logging
+import math
+import os
+import time
+from typing import Callable
+from typing import List
+from typing import Optional
+
+from .activity import item_activity
+from .catalogue import CatalogueCache
+from .collect_data import fetch_stat
+from .collect_data import load_catalogue
+from .constants import API_URL
+from .fetch import AdaptiveThrottle
+from .fetch import Fetcher
+from .filters import compile_filters
+from .filters import Filters
+from .parse_cache import ParseCache
+from .schema import from_json
+from .schema import ItemStats
+from .schema import LiveRing
+from .schema import ShortItem
+from .schema import Stat
+from .schema import to_json
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler(object):
+    """A priority queue of items ordered by when they are next due a refresh.
+
+    The refresh interval of an item shrinks with its activity score, which
+    grows with the logarithm of its recent volume and with its volatility::
+
+        score = log1p(volume) + volatility_weight * volatility
+        interval = max_interval / (1 + score)
+
+    clamped between `min_interval` and `max_interval`.
+
+    Args:
+        min_interval: The shortest interval, in seconds, between refreshes.
+        max_interval: The longest interval, in seconds, between refreshes.
+        volatility_weight: How much volatility counts compared to volume.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 15 * 60,
+        max_interval: float = 24 * 3600,
+        volatility_weight: float = 20.0,
+    ) -> None:
+        """Create a RefreshScheduler object."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.volatility_weight = volatility_weight
+        self._heap = []
+        self._due = {}
+        self._counter = 0
+
+    def __len__(self) -> int:
+        """The number of scheduled items."""
+        return len(self._due)
+
+    def interval(self, stat: Stat) -> float:
+        """The seconds to wait before refreshing the item of `stat` again."""
+        volume, volatility = item_activity(stat)
+        score = math.log1p(volume) + self.volatility_weight * volatility
+        interval = self.max_interval / (1.0 + score)
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def schedule(self, id: str, due: float) -> None:
+        """Schedule (or reschedule) item `id` to be refreshed at time `due`."""
+        self._due[id] = due
+        self._counter += 1
+        heapq.heappush(self._heap, (due, self._counter, id))
+
+    def reschedule(self, id: str, stat: Stat, now: float) -> float:
+        """Schedule item `id` after a refresh at `now`, returning the due time."""
+        due = now + self.interval(stat)
+        self.schedule(id, due)
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """The due time of the next item, None if nothing is scheduled."""
+        self._discard_stale()
+        if not self._heap:
+            return None
+        return self._heap[0][0]
+
+    def pop_due(self, now: float) -> Optional[str]:
+        """Remove and return the most overdue item, None if nothing is due."""
+        self._discard_stale()
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        _, _, id = heapq.heappop(self._heap)
+        del self._due[id]
+        return id
+
+    def _discard_stale(self) -> None:
+        """Drop heap entries superseded by a later `schedule` call."""
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+
+class CollectorDaemon(object):
+    """Keeps an `ItemStats` object fresh by refreshing items as they come due.
+
+    Each refresh is merged into the in-memory `ItemStats` and appended to a
+    journal next to the snapshot file. Every `compact_every` refreshes the
+    snapshot is rewritten and the journal emptied, and a restarted daemon
+    replays the journal on top of the snapshot.
+
+    Args:
+        snapshot_path: The json snapshot to load from and persist to.
+        filters: The filters selecting the items to collect, as in
+            `market_data`.
+        requests_per_second: The request budget shared by all items, the
+            highest rate of the throttle of the fetcher created when no
+            `fetcher` is given.
+        scheduler: The `RefreshScheduler` deciding when items are refreshed.
+        compact_every: The number of refreshes between snapshot rewrites.
+        api_url: The base url of the API.
+        fetcher: The `Fetcher` retrying rate limited and failed requests,
+            whose throttle then sets the request rate.
+        live_capacity: The number of hourly live rows kept per item and
+            order type across refreshes, None keeps only the latest refresh.
+        live_history: Whether live rows evicted from the `live_capacity`
+            buffers are kept in their history, see `Stat.retain_live`.
+        catalogue: The `CatalogueCache` to load the catalogue from, None
+            requests it.
+        parse_cache: The `ParseCache` of previously parsed statistics, so
+            refreshes of unchanged items are not parsed again.
+        clock: A function returning the current time in seconds.
+        sleep: A function sleeping for the given number of seconds.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str,
+        filters: Optional[Filters] = None,
+        requests_per_second: float = 1.0,
+        scheduler: Optional[RefreshScheduler] = None,
+        compact_every: int = 100,
+        api_url: str = API_URL,
+        fetcher: Optional[Fetcher] = None,
+        live_capacity: Optional[int] = None,
+        live_history: bool = False,
+        catalogue: Optional[CatalogueCache] = None,
+        parse_cache: Optional[ParseCache] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Create a CollectorDaemon object."""
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        self.filters = filters
+        self.requests_per_second = requests_per_second
+        self.scheduler = scheduler or RefreshScheduler()
+        self.compact_every = compact_every
+        self.api_url = api_url
+        if fetcher is None and requests_per_second > 0:
+            throttle = AdaptiveThrottle(
+                rate=requests_per_second,
+                min_rate=min(0.2, requests_per_second),
+                max_rate=requests_per_second,
+                clock=clock,
+                sleep=sleep,
+            )
+            fetcher = Fetcher(throttle, sleep=sleep)
+        self.fetcher = fetcher
+        self.live_capacity = live_capacity
+        self.live_history = live_history
+        self.catalogue_cache = catalogue
+        self.parse_cache = parse_cache
+        self.clock = clock
+        self.sleep = sleep
+        self.item_stats = ItemStats([], [])
+        self.catalogue = {}
+        self.refreshes = {}
+        self._since_compact = 0
+
+    def load(self) -> None:
+        """Load the snapshot and journal, then schedule every catalogue item.
+
+        Items already in the snapshot are scheduled according to their
+        activity, new items are scheduled immediately.
+        """
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path) as f:
+                self.item_stats = from_json(ItemStats, f.read())
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        item = ShortItem(**entry["item"])
+                        stat = from_json(Stat, json.dumps(entry["stat"]))
+                        self._merge(item, stat)
+        now = self.clock()
+        for item in self._catalogue():
+            self.catalogue[item.id] = item
+            if item.id in self.item_stats.item_stats:
+                stat = self.item_stats.get_stats(item.id)
+                self.scheduler.schedule(item.id, now + self.scheduler.interval(stat))
+            else:
+                self.scheduler.schedule(item.id, now)
+
+    def _catalogue(self) -> List[ShortItem]:
+        """The catalogue items matching the filters."""
+        items, index = load_catalogue(
+            self.api_url, self.fetcher, catalogue=self.catalogue_cache
+        )
+        return compile_filters(self.filters).select(items, index)
+
+    def _merge(self, item: ShortItem, stat: Stat) -> None:
+        """Merge a refreshed stat into the in-memory `ItemStats`.
+
+        The merged `Stat` replaces the previous one, which snapshots of the
+        `ItemStats` may still be reading, see `ItemStats.snapshot`.
+
+        Args:
+            item: The catalogue item refreshed.
+            stat: Its refreshed statistics.
+        """
+        if item.id in self.item_stats.items:
+            merged = self.item_stats.get_stats(item.id).copy()
+            self._retain_live(merged)
+            merged.merge(stat, newer=True)
+            stat = merged
+        else:
+            self._retain_live(stat)
+        self.item_stats.replace(item, stat)
+
+    def _retain_live(self, stat: Stat) -> None:
+        """Switch the live statistics of `stat` to buffers if configured."""
+        if self.live_capacity is not None and not isinstance(
+            stat.live_stat_buy, LiveRing
+        ):
+            stat.retain_live(self.live_capacity, self.live_history)
+
+    def step(self) -> Optional[str]:
+        """Refresh the most overdue item if one is due.
+
+        Returns:
+            The id of the refreshed item, None if no item was due.
+        """
+        id = self.scheduler.pop_due(self.clock())
+        if id is None:
+            return None
+        item = self.catalogue[id]
+        try:
+            stat = fetch_stat(item, self.api_url, self.fetcher, None, self.parse_cache)
+        except Exception:
+            logger.warning("refreshing %s failed", item.url_name, exc_info=True)
+            self.scheduler.schedule(id, self.clock() + self.scheduler.min_interval)
+            return None
+        self._merge(item, stat)
+        self.refreshes[id] = self.refreshes.get(id, 0) + 1
+        with open(self.journal_path, "a") as f:
+            entry = {"item": item.__dict__, "stat": json.loads(to_json(stat))}
+            f.write(json.dumps(entry) + "\n")
+        self._since_compact += 1
+        if self._since_compact >= self.compact_every:
+            self.persist()
+        self.scheduler.reschedule(id, self.item_stats.get_stats(id), self.clock())
+        return id
+
+    def persist(self) -> None:
+        """Rewrite the snapshot atomically and empty the journal."""
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(to_json(self.item_stats))
+        os.replace(tmp_path, self.snapshot_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._since_compact = 0
+
+    def run(self, max_steps: Optional[int] = None) -> None:
+        """Refresh items until interrupted or `max_steps` refreshes were tried.
+
+        Args:
+            max_steps: The number of refreshes to attempt, None runs forever.
+        """
+        self.load()
+        steps = 0
+        try:
+            while max_steps is None or steps < max_steps:
+                next_due = self.scheduler.next_due()
+                if next_due is None:
+                    break
+                now = self.clock()
+                if next_due > now:
+                    self.sleep(next_due - now)
+                    continue
+                self.step()
+                steps += 1
+        finally:
+            self.persist()
@@ -1,13 +1,42 @@
 """Holds the utils required for common datetime functions."""
-from typing import Dict
+from typing import Union
 
 import datetime
+import functools
 
-def hour_minute_second_microsecond(time_delta: datetime.timedelta) -> Dict:
-    """Converts a timedelta to a dictionary of hour, minute, second, and microsecond."""
-    return {
-        "hour": time_delta.seconds//3600,
-        "minute": (time_delta.seconds//60)%60,
-        "second": (time_delta.seconds)%60,
-        "microsecond": time_delta.microseconds,
-    }
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+DAY_MS = 24 * 3600 * 1000
+_MILLISECOND = datetime.timedelta(milliseconds=1)
+
+
+def to_timestamp(date: Union[datetime.datetime, int]) -> int:
+    """Converts a datetime to integer epoch milliseconds, ints are returned as is."""
+    if isinstance(date, int):
+        return date
+    if date.tzinfo is None:
+        return round(date.timestamp() * 1000)
+    return (date - EPOCH) // _MILLISECOND
+
+
+def from_timestamp(timestamp: int) -> datetime.datetime:
+    """Converts integer epoch milliseconds to a timezone-aware utc datetime."""
+    return EPOCH + datetime.timedelta(milliseconds=timestamp)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(str_date: str) -> int:
+    """Parses a date string of the API into integer epoch milliseconds.
+
+    The same dates repeat across items, so parsed dates are cached.
+
+    Args:
+        str_date: The ISO 8601 date, such as ``2020-01-01T00:00:00.000+00:00``.
+
+    Returns:
+        The epoch milliseconds of the date.
+    """
+    try:
+        date = datetime.datetime.fromisoformat(str_date)
+    except ValueError:
+        date = datetime.datetime.strptime(str_date, "%Y-%m-%dT%H:%M:%S.%f%z")
+    return to_timestamp(date)
@@ -0,0 +1,376 @@
+"""Holds the rate-limited, retrying fetch layer for the warframe.market API."""
+import datetime
+import email.utils
+import heapq
+import random
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from . import metrics
+
+
+class MarketAPIError(Exception):
+    """Raised when the API does not answer with usable data.
+
+    Args:
+        message: The description of the error.
+        url: The url that was requested.
+        status: The last http status received, None for connection errors.
+    """
+
+    def __init__(self, message: str, url: str, status: Optional[int] = None) -> None:
+        """Create a MarketAPIError object."""
+        super().__init__(message, url, status)
+        self.message = message
+        self.url = url
+        self.status = status
+
+    def __str__(self) -> str:
+        """The description of the error."""
+        return self.message
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> float:
+    """Seconds to wait from a ``Retry-After`` header, 0 when absent or invalid.
+
+    Args:
+        value: The header value, either seconds or an http date.
+        now: The current unix time, used for http dates.
+
+    Returns:
+        The number of seconds to wait.
+    """
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    if now is None:
+        now = time.time()
+    return max(0.0, date.timestamp() - now)
+
+
+class AdaptiveThrottle(object):
+    """A request rate limiter that adapts to the errors of the server.
+
+    Requests are spaced ``1 / rate`` seconds apart. Every successful response
+    raises the rate additively by `increase` up to `max_rate`, and every
+    rate-limited or failed response multiplies it by `decrease` down to
+    `min_rate` (AIMD). A ``Retry-After`` pauses every caller sharing the
+    throttle. The throttle is safe to share between threads.
+
+    Args:
+        rate: The initial requests per second.
+        min_rate: The lowest requests per second.
+        max_rate: The highest requests per second.
+        increase: The requests per second added after each success.
+        decrease: The factor the rate is multiplied by after each failure.
+        clock: A monotonic function returning the current time in seconds.
+        sleep: A function sleeping for the given number of seconds.
+    """
+
+    def __init__(
+        self,
+        rate: float = 3.0,
+        min_rate: float = 0.2,
+        max_rate: float = 10.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Create an AdaptiveThrottle object."""
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.clock = clock
+        self.sleep = sleep
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until the caller may send its next request."""
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            self.sleep(slot - now)
+
+    def on_success(self) -> None:
+        """Record a successful response."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_failure(self, retry_after: float = 0.0) -> None:
+        """Record a rate-limited or failed response.
+
+        Args:
+            retry_after: Seconds every caller should pause before the next
+                request, as requested by the server.
+        """
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            if retry_after > 0:
+                self._next_slot = max(self._next_slot, self.clock() + retry_after)
+
+
+class _Call(object):
+    """A request in flight, shared by every caller of the same url."""
+
+    def __init__(self) -> None:
+        """Create a _Call object."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Fetcher(object):
+    """Fetches json from the API with throttling, retries and backoff.
+
+    Responses are classified as successful (2xx with a json body),
+    retryable (429, 5xx, connection errors and undecodable bodies) or
+    fatal (other 4xx). Retryable responses are retried up to `max_retries`
+    times, waiting for the ``Retry-After`` of a 429 or a jittered
+    exponential backoff otherwise.
+
+    Identical requests, with the same url and headers, are coalesced: while
+    one is in flight, other callers wait for it and share its decoded
+    response instead of sending their own, or raise a `MarketAPIError`
+    caused by its error. With a `cache_ttl`, responses are also reused for
+    that many seconds after they arrive. Shared responses must not be
+    modified by their callers.
+
+    Args:
+        throttle: The `AdaptiveThrottle` to space requests with, shared by
+            every user of this fetcher.
+        max_retries: The number of retries before giving up.
+        backoff: The base of the exponential backoff in seconds.
+        max_backoff: The longest backoff in seconds.
+        timeout: The timeout in seconds of each request.
+        headers: Extra headers sent with every request.
+        sleep: A function sleeping for the given number of seconds.
+        rng: The random generator used for jitter.
+        cache_ttl: The seconds a response is reused for, 0 disables the
+            cache while still coalescing requests in flight.
+        clock: A monotonic function returning the current time in seconds.
+    """
+
+    def __init__(
+        self,
+        throttle: Optional[AdaptiveThrottle] = None,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 60.0,
+        timeout: float = 30.0,
+        headers: Optional[dict] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+        cache_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a Fetcher object."""
+        self.throttle = throttle or AdaptiveThrottle()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.sleep = sleep
+        self.rng = rng or random.Random()  # noqa: S311
+        self.cache_ttl = cache_ttl
+        self.clock = clock
+        self._local = threading.local()
+        self._calls = {}
+        self._cache = {}
+        self._expiries = []
+        self._calls_lock = threading.Lock()
+
+    @property
+    def session(self) -> Any:
+        """The `requests.Session` of the calling thread."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _backoff(self, attempt: int) -> float:
+        """The jittered exponential backoff before retry number `attempt`."""
+        return self.rng.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def _wait_to_retry(self, attempt: int, waited: float = 0.0) -> None:
+        """Sleep the backoff after a failed `attempt` unless it was the last.
+
+        Args:
+            attempt: The number of the failed attempt, from 0.
+            waited: The seconds the throttle already pauses for, deducted
+                from the backoff.
+        """
+        if attempt < self.max_retries:
+            delay = self._backoff(attempt) - waited
+            if delay > 0:
+                self.sleep(delay)
+
+    def _cached(self, key: Tuple, now: float) -> Optional[Tuple[float, Any]]:
+        """The cached (expiry, response) of `key` if still fresh."""
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached
+        return None
+
+    def _store(self, key: Tuple, result: Any) -> None:
+        """Cache `result` under `key`, dropping expired responses."""
+        now = self.clock()
+        while self._expiries and self._expiries[0][0] <= now:
+            expiry, expired = heapq.heappop(self._expiries)
+            cached = self._cache.get(expired)
+            if cached is not None and cached[0] == expiry:
+                del self._cache[expired]
+        expiry = now + self.cache_ttl
+        self._cache[key] = (expiry, result)
+        heapq.heappush(self._expiries, (expiry, key))
+
+    def clear_cache(self) -> None:
+        """Forget every cached response."""
+        with self._calls_lock:
+            self._cache = {}
+            self._expiries = []
+
+    def get(self, url: str, headers: Optional[dict] = None, raw: bool = False) -> Any:
+        """Get the decoded json response of `url`.
+
+        The response is shared with identical requests, see `Fetcher`.
+
+        Args:
+            url: The url to request.
+            headers: Headers sent with this request on top of `headers`.
+            raw: Whether to return the body undecoded, in which case
+                undecodable bodies are not retried.
+
+        Returns:
+            The decoded json body, or the bytes of the body if `raw`.
+
+        Raises:
+            MarketAPIError: If the response is fatal or retries are exhausted,
+                or if the identical request waited for failed, in which case
+                its error is the cause.
+        """
+        if headers:
+            headers = dict(self.headers, **headers)
+        else:
+            headers = self.headers
+        key = (url, tuple(sorted(headers.items())), raw)
+        with self._calls_lock:
+            cached = self._cached(key, self.clock())
+            call = self._calls.get(key)
+            leader = cached is None and call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if cached is not None:
+            metrics.increment("fetch_cache_hits_total")
+            return cached[1]
+        if not leader:
+            metrics.increment("fetch_coalesced_total")
+            call.done.wait()
+            error = call.error
+            if error is not None:
+                # a new error per caller, so that they do not share a traceback
+                raise MarketAPIError(str(error), url, error.status) from error
+            return call.result
+        completed = False
+        try:
+            call.result = self._request(url, headers, raw)
+            completed = True
+        except MarketAPIError as e:
+            call.error = e
+            raise
+        finally:
+            if not completed and call.error is None:
+                call.error = MarketAPIError("request interrupted", url)
+            with self._calls_lock:
+                del self._calls[key]
+                if completed and self.cache_ttl > 0:
+                    self._store(key, call.result)
+            call.done.set()
+        return call.result
+
+    def _request(self, url: str, headers: Dict[str, str], raw: bool) -> Any:
+        """Request `url` until it succeeds, see `get`."""
+        import requests
+
+        status = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                metrics.increment("fetch_retries_total")
+            self.throttle.acquire()
+            try:
+                with metrics.timer("fetch_seconds"):
+                    resp = self.session.get(
+                        url=url, headers=headers, timeout=self.timeout
+                    )
+            except requests.RequestException:
+                self.throttle.on_failure()
+                metrics.increment("fetch_requests_total", labels={"status": "error"})
+                self._wait_to_retry(attempt)
+                continue
+            status = resp.status_code
+            if metrics.enabled():
+                metrics.increment(
+                    "fetch_requests_total", labels={"status": str(status)}
+                )
+                metrics.increment("fetch_bytes_total", len(resp.content))
+            if status == 429:
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                # the throttle pauses every caller for retry_after already
+                self.throttle.on_failure(retry_after)
+                self._wait_to_retry(attempt, retry_after)
+                continue
+            if status >= 500:
+                self.throttle.on_failure()
+                self._wait_to_retry(attempt)
+                continue
+            if status >= 400:
+                raise MarketAPIError("%d response" % status, url, status)
+            if raw:
+                self.throttle.on_success()
+                return resp.content
+            try:
+                with metrics.timer("json_decode_seconds"):
+                    resp_json = resp.json()
+            except ValueError:
+                self.throttle.on_failure()
+                self._wait_to_retry(attempt)
+                continue
+            self.throttle.on_success()
+            return resp_json
+        raise MarketAPIError(
+            "giving up after %d retries" % self.max_retries, url, status
+        )
+
+
+_default_fetcher = None
+
+
+def default_fetcher() -> Fetcher:
+    """The fetcher shared by the collectors when none is given."""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = Fetcher()
+    return _default_fetcher
@@ -0,0 +1,149 @@
+"""Holds the compiled filters selecting catalogue items to collect.
+
+A filters dictionary maps `ShortItem` attributes to conditions on their
+values. A condition is either
+
+* a value, matching attributes equal to it,
+* a set, frozenset, list or tuple, matching attributes in it,
+* a compiled regular expression, matching attributes it searches, or
+* a callable, matching attributes for which it returns True.
+
+For example ``{"item_name": re.compile("prime", re.I), "url_name": {...}}``.
+A callable taking the whole `ShortItem` can be given instead of a dictionary.
+"""
+import re
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from .schema import ShortItem
+from .shard import in_shard
+
+INDEXED = ("id", "item_name", "url_name")
+PATTERN_TYPE = type(re.compile(""))
+PRIME_FILTERS = {"item_name": re.compile("prime", re.IGNORECASE)}
+
+Filters = Union[Dict[str, Any], Callable[[ShortItem], bool], "CompiledFilter"]
+
+
+def index_items(
+    items: Sequence[ShortItem], attrs: Iterable[str] = INDEXED
+) -> Dict[str, Dict[Any, List[int]]]:
+    """Index the positions of `items` by the values of `attrs`.
+
+    Args:
+        items: The catalogue items.
+        attrs: The `ShortItem` attributes to index.
+
+    Returns:
+        A dictionary of attribute to value to the positions of the items
+        with that value.
+    """
+    index = {attr: {} for attr in attrs}
+    for position, item in enumerate(items):
+        for attr, values in index.items():
+            values.setdefault(getattr(item, attr), []).append(position)
+    return index
+
+
+def _predicate(condition: Any) -> Callable[[Any], bool]:
+    """The function testing an attribute value against `condition`."""
+    if isinstance(condition, PATTERN_TYPE):
+        return lambda value: condition.search(value) is not None
+    if callable(condition):
+        return condition
+    if isinstance(condition, (set, frozenset, list, tuple)):
+        values = frozenset(condition)
+        return values.__contains__
+    return lambda value: value == condition
+
+
+class CompiledFilter(object):
+    """Filters compiled once into per-attribute predicates.
+
+    Exact and set conditions on the attributes of `INDEXED` are answered
+    from an index of the catalogue in `select`, the other conditions are
+    only evaluated for the items that remain.
+
+    Args:
+        filters: The filters to compile, see the module documentation. None
+            matches every item.
+    """
+
+    def __init__(self, filters: Optional[Filters] = None) -> None:
+        """Create a CompiledFilter object."""
+        self.exact = {}
+        self.predicates = []
+        self.item_predicate = None
+        if filters is None:
+            return
+        if not isinstance(filters, dict):
+            self.item_predicate = filters
+            return
+        for attr, condition in filters.items():
+            if (
+                attr not in INDEXED
+                or callable(condition)
+                or isinstance(condition, PATTERN_TYPE)
+            ):
+                self.predicates.append((attr, _predicate(condition)))
+            elif isinstance(condition, (set, frozenset, list, tuple)):
+                self.exact[attr] = frozenset(condition)
+            else:
+                self.exact[attr] = frozenset([condition])
+
+    def __call__(self, item: ShortItem) -> bool:
+        """Whether `item` matches the filters."""
+        for attr, values in self.exact.items():
+            if getattr(item, attr) not in values:
+                return False
+        for attr, predicate in self.predicates:
+            if not predicate(getattr(item, attr)):
+                return False
+        return self.item_predicate is None or bool(self.item_predicate(item))
+
+    def select(
+        self,
+        items: Sequence[ShortItem],
+        index: Optional[Dict[str, Dict[Any, List[int]]]] = None,
+        shard: Optional[Tuple[int, int]] = None,
+    ) -> List[ShortItem]:
+        """The matching items, in catalogue order.
+
+        Args:
+            items: The catalogue items.
+            index: The `index_items` index of `items`, built when exact
+                conditions need one and it is not given.
+            shard: Only select the items of this ``(index, num_shards)``
+                shard, see `shard_of`.
+
+        Returns:
+            The items matching the filters.
+        """
+        if self.exact:
+            if index is None:
+                index = index_items(items, self.exact)
+            candidates = None
+            for attr, values in self.exact.items():
+                positions = set()
+                for value in values:
+                    positions.update(index[attr].get(value, ()))
+                if candidates is None:
+                    candidates = positions
+                else:
+                    candidates &= positions
+            items = [items[p] for p in sorted(candidates)]
+        return [i for i in items if in_shard(i, shard) and self(i)]
+
+
+def compile_filters(filters: Optional[Filters] = None) -> CompiledFilter:
+    """Compile `filters`, returning compiled filters unchanged."""
+    if isinstance(filters, CompiledFilter):
+        return filters
+    return CompiledFilter(filters)
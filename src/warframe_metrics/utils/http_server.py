@@ -0,0 +1,97 @@
+"""Holds the base of the local json http servers of the package.
+
+`BackgroundServer` runs a threading http server in a background thread and
+answers GET requests with the ``(status, headers, body)`` returned by the
+`answer` method of its subclass, such as `LocalMarketServer` and
+`QueryServer`.
+"""
+import threading
+from abc import ABC
+from abc import abstractmethod
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Dict
+from typing import Mapping
+from typing import Tuple
+from typing import TypeVar
+
+Server = TypeVar("Server", bound="BackgroundServer")
+
+
+class BackgroundServer(ABC):
+    """A local http server answering GET requests from a background thread.
+
+    The server can be used as a context manager, which starts it and stops
+    it. Subclasses implement `answer`.
+
+    Args:
+        host: The host to bind to.
+        port: The port to bind to, 0 picks a free port.
+    """
+
+    #: The path appended to the address of the server to form its `url`.
+    base_path = ""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Create a BackgroundServer object."""
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """The base url of the server."""
+        host, port = self._httpd.server_address[:2]
+        return "http://%s:%d%s" % (host, port, self.base_path)
+
+    def start(self: Server) -> Server:
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self: Server) -> Server:
+        """Start the server."""
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        """Stop the server."""
+        self.stop()
+
+    @abstractmethod
+    def answer(
+        self, path: str, headers: Mapping[str, str]
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """The status, headers and json body answering a GET request of `path`."""
+
+    def _handler(self) -> type:
+        """Build the request handler class bound to this server."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Handles GET requests with the `answer` of the server."""
+
+            def do_GET(self) -> None:  # noqa: N802
+                """Answer a GET request."""
+                path = self.path.split("?", 1)[0]
+                status, headers, body = server.answer(path, self.headers)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                """Silence the per request logging."""
+
+        return Handler
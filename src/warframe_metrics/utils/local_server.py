@@ -0,0 +1,254 @@
+"""Holds a local stand-in for the warframe.market API used for load testing."""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import Union
+
+from .http_server import BackgroundServer
+from .synthetic import SyntheticCatalogue
+
+STATS_PATH = re.compile(r"^/v1/items/([^/]+)/statistics/?$")
+ITEMS_PATH = re.compile(r"^/v1/items/?$")
+ORDERS_PATH = re.compile(r"^/v1/items/([^/]+)/orders/?$")
+
+
+class RecordedCatalogue(object):
+    """Recorded api responses served by `LocalMarketServer`.
+
+    Args:
+        items: The json payload of the items endpoint.
+        stats: A dictionary of url name to the json payload of the statistics
+            endpoint for that item.
+        orders: A dictionary of url name to the json payload of the orders
+            endpoint for that item.
+    """
+
+    def __init__(
+        self, items: Dict, stats: Dict[str, Dict], orders: Optional[Dict] = None
+    ) -> None:
+        """Create a RecordedCatalogue object."""
+        self.items = items
+        self.stats = stats
+        self.orders = orders or {}
+
+    def items_payload(self) -> Dict:
+        """The json payload of the items endpoint."""
+        return self.items
+
+    def stats_payload(self, url_name: str) -> Dict:
+        """The json payload of the statistics endpoint for `url_name`."""
+        return self.stats[url_name]
+
+    def orders_payload(self, url_name: str) -> Dict:
+        """The json payload of the orders endpoint for `url_name`."""
+        return self.orders[url_name]
+
+    def save(self, directory: str) -> None:
+        """Save the responses as ``items.json`` and ``<endpoint>/<url_name>.json``."""
+        with open(os.path.join(directory, "items.json"), "w") as f:
+            json.dump(self.items, f)
+        for endpoint, payloads in (("statistics", self.stats), ("orders", self.orders)):
+            os.makedirs(os.path.join(directory, endpoint), exist_ok=True)
+            for url_name, payload in payloads.items():
+                with open(
+                    os.path.join(directory, endpoint, url_name + ".json"), "w"
+                ) as f:
+                    json.dump(payload, f)
+
+    @classmethod
+    def load(cls: Type, directory: str) -> "RecordedCatalogue":
+        """Load responses saved with `save`."""
+        with open(os.path.join(directory, "items.json")) as f:
+            items = json.load(f)
+        payloads = {"statistics": {}, "orders": {}}
+        for endpoint in payloads:
+            if not os.path.isdir(os.path.join(directory, endpoint)):
+                continue
+            for name in os.listdir(os.path.join(directory, endpoint)):
+                with open(os.path.join(directory, endpoint, name)) as f:
+                    payloads[endpoint][name[: -len(".json")]] = json.load(f)
+        return cls(items, payloads["statistics"], payloads["orders"])
+
+
+class LocalMarketServer(BackgroundServer):
+    """A local http server serving the items, statistics and orders endpoints.
+
+    The server runs in a background thread and can be used as a context
+    manager, see `BackgroundServer`. Point the collectors at it with the
+    `url` attribute, for example ``market_data(api_url=server.url)``. Every
+    platform is served the same data, and the `platforms` attribute counts
+    requests per platform.
+
+    Args:
+        catalogue: The data to serve, a `SyntheticCatalogue` or a
+            `RecordedCatalogue`. Defaults to a synthetic catalogue of 100 items.
+        latency: The seconds to wait before answering, either a constant or a
+            ``(low, high)`` range to draw uniformly from.
+        rate_limit: The sustained requests per second allowed before answering
+            with 429 and a ``Retry-After`` header. None disables rate limiting.
+        burst: The number of requests allowed at once on top of `rate_limit`.
+        error_rate: The fraction of requests answered with a 5xx status.
+        error_status: The status code used for injected errors.
+        seed: The seed for latency and error injection.
+        host: The host to bind to.
+        port: The port to bind to, 0 picks a free port.
+    """
+
+    base_path = "/v1"
+
+    def __init__(
+        self,
+        catalogue: Optional[Union[SyntheticCatalogue, RecordedCatalogue]] = None,
+        latency: Union[float, Tuple[float, float]] = 0.0,
+        rate_limit: Optional[float] = None,
+        burst: int = 1,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """Create a LocalMarketServer object."""
+        if catalogue is None:
+            catalogue = SyntheticCatalogue()
+        self.catalogue = catalogue
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.counts = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0}
+        self.platforms = {}
+        self._random = random.Random(seed)  # noqa: S311
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._cache = {}
+        super().__init__(host, port)
+
+    def _take_token(self) -> float:
+        """Take a rate limit token, returning 0 or the seconds to retry after."""
+        if self.rate_limit is None:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst),
+            self._tokens + (now - self._last_refill) * self.rate_limit,
+        )
+        self._last_refill = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / self.rate_limit
+
+    def _respond(
+        self, path: str, platform: str = "pc"
+    ) -> Tuple[int, Dict[str, str], bytes, float]:
+        """Decide the status, headers, body and delay of a response."""
+        with self._lock:
+            self.counts["requests"] += 1
+            self.platforms[platform] = self.platforms.get(platform, 0) + 1
+            if isinstance(self.latency, tuple):
+                delay = self._random.uniform(*self.latency)
+            else:
+                delay = self.latency
+            retry_after = self._take_token()
+            if retry_after > 0:
+                self.counts["rate_limited"] += 1
+                headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+                return 429, headers, b'{"error": "Too Many Requests"}', delay
+            if self._random.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return self.error_status, {}, b'{"error": "Injected error"}', delay
+        try:
+            body = self._payload(path)
+        except KeyError:
+            return 404, {}, b'{"error": "Not Found"}', delay
+        with self._lock:
+            self.counts["ok"] += 1
+        return 200, {}, body, delay
+
+    def _payload(self, path: str) -> bytes:
+        """The encoded payload for `path`, raising KeyError when unknown."""
+        if path in self._cache:
+            return self._cache[path]
+        if ITEMS_PATH.match(path):
+            payload = self.catalogue.items_payload()
+        elif STATS_PATH.match(path):
+            payload = self.catalogue.stats_payload(STATS_PATH.match(path).group(1))
+        elif ORDERS_PATH.match(path):
+            payload = self.catalogue.orders_payload(ORDERS_PATH.match(path).group(1))
+        else:
+            raise KeyError(path)
+        body = json.dumps(payload).encode()
+        self._cache[path] = body
+        return body
+
+    def answer(
+        self, path: str, headers: Mapping[str, str]
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """Answer a GET request after the latency of the server.
+
+        Args:
+            path: The path requested, without its query string.
+            headers: The headers of the request, whose ``Platform`` header
+                selects the platform.
+
+        Returns:
+            The http status, the headers and the body of the response.
+        """
+        status, headers, body, delay = self._respond(
+            path, headers.get("Platform", "pc")
+        )
+        if delay > 0:
+            time.sleep(delay)
+        return status, headers, body
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run a local server from the command line until interrupted."""
+    parser = argparse.ArgumentParser(description=LocalMarketServer.__doc__)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--recorded", help="directory of recorded responses")
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.0])
+    parser.add_argument("--rate-limit", type=float)
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    if args.recorded:
+        catalogue = RecordedCatalogue.load(args.recorded)
+    else:
+        catalogue = SyntheticCatalogue(args.items, args.days)
+    latency = args.latency[0] if len(args.latency) == 1 else tuple(args.latency[:2])
+    server = LocalMarketServer(
+        catalogue,
+        latency=latency,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        error_rate=args.error_rate,
+        port=args.port,
+    )
+    print("Serving warframe.market stand-in at %s" % server.url)
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
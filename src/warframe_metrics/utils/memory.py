@@ -0,0 +1,203 @@
+"""Holds the memory reporting and budgets of `Stat` and `ItemStats` objects.
+
+`memory_report` measures the deep size of every item and column, counting
+objects shared between them once::
+
+    report = memory_report(item_stats)
+    report.total, report.top(10), report.columns["timestamps"]
+
+A `MemoryBudget` bounds the statistics held in memory by `market_data` and
+`ItemStats.merge`. Once they exceed its limit, the coldest items, those with
+the least recent volume, are spilled to disk with `ItemStats.spill` until
+the statistics fit under the low-water mark again.
+"""
+import sys
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from .activity import item_activity
+from .schema import ItemStats
+from .schema import Stat
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """The size in bytes of `obj` and of the objects it holds.
+
+    Args:
+        obj: The object to measure.
+        seen: The ids of the objects already counted, which are skipped and
+            updated, so objects shared between several calls count once.
+
+    Returns:
+        The number of bytes.
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            stack.append(vars(obj))
+    return size
+
+
+def stat_memory(stat: Stat, seen: Optional[Set[int]] = None) -> Dict[str, int]:
+    """The deep size in bytes of every attribute of `stat`.
+
+    Args:
+        stat: The `Stat` object to measure.
+        seen: The ids of the objects already counted, see `deep_sizeof`.
+
+    Returns:
+        A dictionary of attribute name, such as "timestamps" or "live_stat_buy",
+        to its size. The object itself is counted under "self".
+    """
+    if seen is None:
+        seen = set()
+    attributes = vars(stat)
+    seen.update((id(stat), id(attributes)))
+    sizes = {"self": sys.getsizeof(stat) + sys.getsizeof(attributes)}
+    for name, value in attributes.items():
+        sizes[name] = deep_sizeof(name, seen) + deep_sizeof(value, seen)
+    return sizes
+
+
+@dataclass
+class MemoryReport:
+    """The memory used by an `ItemStats` object, see `memory_report`.
+
+    Attributes:
+        total: The bytes used by the statistics held in memory.
+        items: The bytes used by the statistics of each item, by item id.
+        columns: The bytes used by each `Stat` attribute over all items.
+        spilled: The number of items spilled to disk, which use no memory.
+    """
+
+    total: int
+    items: Dict[str, int]
+    columns: Dict[str, int]
+    spilled: int = 0
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """The `n` items using the most memory as (id, bytes) pairs."""
+        return sorted(self.items.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+
+def memory_report(item_stats: ItemStats) -> MemoryReport:
+    """Report the deep memory used by the statistics of `item_stats`.
+
+    Objects shared between items, such as cached small integers, are counted
+    for the first item holding them only.
+
+    Args:
+        item_stats: The statistics to measure.
+
+    Returns:
+        The total, per item and per column memory of the statistics.
+    """
+    seen = set()
+    items = {}
+    columns = {}
+    for id, stat in item_stats.item_stats.items():
+        sizes = stat_memory(stat, seen)
+        items[id] = sum(sizes.values())
+        for name, size in sizes.items():
+            columns[name] = columns.get(name, 0) + size
+    return MemoryReport(sum(items.values()), items, columns, len(item_stats.spilled))
+
+
+class MemoryBudget(object):
+    """A limit on the memory held by the statistics of an `ItemStats` object.
+
+    The size of every item is measured when it is added or changed, and
+    once their sum exceeds `limit` the coldest items are spilled to
+    `directory` until it is below ``low_water * limit``. Sizes are measured
+    per item, so objects shared between items count once for each of them
+    and the budget errs on the safe side.
+
+    Args:
+        limit: The number of bytes the statistics may use.
+        directory: The directory spilled items are written to.
+        low_water: The fraction of `limit` spilling goes down to, below one
+            so that spilling does not happen again on the next item.
+    """
+
+    def __init__(self, limit: int, directory: str, low_water: float = 0.8) -> None:
+        """Create a MemoryBudget object."""
+        self.limit = limit
+        self.directory = directory
+        self.low_water = low_water
+        self.sizes = {}
+        self.used = 0
+
+    def _measure(self, item_stats: ItemStats, id: str) -> None:
+        """Measure the statistics of item `id` again."""
+        self.used -= self.sizes.pop(id, 0)
+        if id in item_stats.item_stats:
+            self.sizes[id] = sum(stat_memory(item_stats.item_stats[id]).values())
+            self.used += self.sizes[id]
+
+    def track(self, item_stats: ItemStats, ids: Iterable[str]) -> List[str]:
+        """Measure the items `ids` after they were added or changed.
+
+        Args:
+            item_stats: The `ItemStats` object holding the items.
+            ids: The ids of the added or changed items.
+
+        Returns:
+            The ids of the items spilled to keep within the budget.
+        """
+        for id in ids:
+            self._measure(item_stats, id)
+        if self.used <= self.limit:
+            return []
+        return self.enforce(item_stats)
+
+    def enforce(self, item_stats: ItemStats) -> List[str]:
+        """Spill the coldest items of `item_stats` until within the budget.
+
+        Items read back by `ItemStats.get_stats` since they were spilled are
+        measured again first.
+
+        Args:
+            item_stats: The statistics to spill the coldest items of.
+
+        Returns:
+            The ids of the spilled items, coldest first.
+        """
+        for id in list(self.sizes):
+            if id not in item_stats.item_stats:
+                self._measure(item_stats, id)
+        for id in item_stats.item_stats:
+            if id not in self.sizes:
+                self._measure(item_stats, id)
+        spilled = []
+        if self.used <= self.limit:
+            return spilled
+        coldest = sorted(
+            item_stats.item_stats,
+            key=lambda id: item_activity(item_stats.item_stats[id])[0],
+        )
+        for id in coldest:
+            if self.used <= self.low_water * self.limit:
+                break
+            item_stats.spill(id, self.directory)
+            self._measure(item_stats, id)
+            spilled.append(id)
+        return spilled
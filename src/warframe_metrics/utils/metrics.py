@@ -0,0 +1,283 @@
+"""Holds the timers and counters used to instrument collection and analysis.
+
+Instrumentation is disabled until a sink is installed with `set_sink`, and
+while disabled `timer` and `increment` return immediately. For example::
+
+    sink = PrometheusSink()
+    set_sink(sink)
+    market_data()
+    print(sink.exposition())
+
+The package reports the histograms ``fetch_seconds``, ``json_decode_seconds``,
+``to_class_seconds``, ``to_stats_seconds``, ``orders_parse_seconds``,
+``merge_seconds``, ``to_json_seconds``, ``from_json_seconds`` and
+``rank_seconds`` and the counters ``fetch_requests_total`` (by status),
+``fetch_retries_total``, ``fetch_bytes_total``, ``to_class_rows_total``,
+``to_stats_rows_total``, ``orders_rows_total``, ``to_json_bytes_total`` and
+``from_json_bytes_total``. Rows parsed per second follow from dividing a rows
+counter by the sum of the matching histogram.
+"""
+import bisect
+import functools
+import logging
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from contextlib import contextmanager
+from contextlib import nullcontext
+from typing import Any
+from typing import Callable
+from typing import ContextManager
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class MetricsSink(ABC):
+    """Base class of the destinations timers and counters are reported to."""
+
+    @abstractmethod
+    def increment(
+        self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Add `value` to the counter `name`."""
+
+    @abstractmethod
+    def observe(
+        self, name: str, value: float, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Record `value` in the histogram `name`."""
+
+
+class Histogram(object):
+    """A cumulative histogram with fixed bucket upper bounds."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """Create a Histogram object."""
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """The (upper bound, cumulative count) pairs, ending with infinity."""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class InMemorySink(MetricsSink):
+    """Keeps counters and histograms in memory for later inspection."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """Create an InMemorySink object."""
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Optional[Dict[str, str]]) -> Key:
+        """The dictionary key of a metric and its labels."""
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def increment(
+        self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Add `value` to the counter `name`."""
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(
+        self, name: str, value: float, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Record `value` in the histogram `name`."""
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.buckets)
+            self.histograms[key].observe(value)
+
+    def counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        """The current value of a counter, 0 if it was never incremented."""
+        return self.counters.get(self._key(name, labels), 0.0)
+
+    def histogram(
+        self, name: str, labels: Optional[Dict[str, str]] = None
+    ) -> Optional[Histogram]:
+        """The histogram `name`, None if nothing was observed."""
+        return self.histograms.get(self._key(name, labels))
+
+    def reset(self) -> None:
+        """Remove every recorded value."""
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+
+class PrometheusSink(InMemorySink):
+    """An in-memory sink that renders the Prometheus text exposition format."""
+
+    def __init__(
+        self,
+        prefix: str = "warframe_metrics_",
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Create a PrometheusSink object."""
+        super().__init__(buckets)
+        self.prefix = prefix
+
+    @staticmethod
+    def _labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+        """Format labels as ``{key="value",...}``."""
+        parts = ['%s="%s"' % (k, str(v).replace('"', '\\"')) for k, v in labels]
+        if extra:
+            parts.append(extra)
+        return "{%s}" % ",".join(parts) if parts else ""
+
+    def exposition(self) -> str:
+        """The recorded metrics in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda kv: kv[0])
+        typed = set()
+        for (name, labels), value in counters:
+            name = self.prefix + name
+            if name not in typed:
+                lines.append("# TYPE %s counter" % name)
+                typed.add(name)
+            lines.append("%s%s %r" % (name, self._labels(labels), value))
+        for (name, labels), hist in histograms:
+            name = self.prefix + name
+            if name not in typed:
+                lines.append("# TYPE %s histogram" % name)
+                typed.add(name)
+            for bound, count in hist.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    "%s_bucket%s %d"
+                    % (name, self._labels(labels, 'le="%s"' % le), count)
+                )
+            lines.append("%s_sum%s %r" % (name, self._labels(labels), hist.sum))
+            lines.append("%s_count%s %d" % (name, self._labels(labels), hist.count))
+        return "\n".join(lines) + "\n"
+
+
+class LoggingSink(MetricsSink):
+    """Writes every counter increment and observation to a logger."""
+
+    def __init__(
+        self, logger: Optional[logging.Logger] = None, level: int = logging.DEBUG
+    ) -> None:
+        """Create a LoggingSink object."""
+        self.logger = logger or logging.getLogger("warframe_metrics")
+        self.level = level
+
+    def increment(
+        self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Log a counter increment."""
+        self.logger.log(self.level, "%s += %s %s", name, value, labels or "")
+
+    def observe(
+        self, name: str, value: float, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Log an observation."""
+        self.logger.log(self.level, "%s = %s %s", name, value, labels or "")
+
+
+_sink = None
+_disabled = nullcontext()
+
+
+def set_sink(sink: Optional[MetricsSink]) -> Optional[MetricsSink]:
+    """Install the sink metrics are reported to, None disables metrics.
+
+    Args:
+        sink: The `MetricsSink` to report to.
+
+    Returns:
+        The previously installed sink.
+    """
+    global _sink
+    previous = _sink
+    _sink = sink
+    return previous
+
+
+def get_sink() -> Optional[MetricsSink]:
+    """The installed sink, None when metrics are disabled."""
+    return _sink
+
+
+def enabled() -> bool:
+    """Whether a sink is installed."""
+    return _sink is not None
+
+
+def increment(
+    name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None
+) -> None:
+    """Add `value` to the counter `name` of the installed sink."""
+    if _sink is not None:
+        _sink.increment(name, value, labels)
+
+
+def observe(name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+    """Record `value` in the histogram `name` of the installed sink."""
+    if _sink is not None:
+        _sink.observe(name, value, labels)
+
+
+@contextmanager
+def _timer(
+    sink: MetricsSink, name: str, labels: Optional[Dict[str, str]]
+) -> Iterator[None]:
+    """Observe the seconds spent inside the context."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sink.observe(name, time.perf_counter() - start, labels)
+
+
+def timer(name: str, labels: Optional[Dict[str, str]] = None) -> ContextManager:
+    """A context manager recording its duration in seconds to histogram `name`."""
+    if _sink is None:
+        return _disabled
+    return _timer(_sink, name, labels)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """A decorator recording the duration of every call to histogram `name`."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _sink is None:
+                return func(*args, **kwargs)
+            with _timer(_sink, name, None):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,236 @@
+"""Holds the collector and in-memory order books of the orders endpoint."""
+import bisect
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from . import metrics
+from .catalogue import CatalogueCache
+from .collect_data import collect_data
+from .collect_data import from_url
+from .collect_data import load_catalogue
+from .constants import API_URL
+from .constants import ORDERS_PATH
+from .fetch import Fetcher
+from .filters import compile_filters
+from .filters import Filters
+from .schema import ShortItem
+
+
+@dataclass
+class Order:
+    """A single buy or sell order."""
+
+    id: str
+    platinum: float
+    quantity: int
+    order_type: str
+    user_status: str
+    mod_rank: Optional[int] = None
+
+    @classmethod
+    def from_json(cls: type, json_data: Dict) -> "Order":
+        """The order from a row of the orders endpoint."""
+        return cls(
+            id=json_data["id"],
+            platinum=json_data["platinum"],
+            quantity=json_data["quantity"],
+            order_type=json_data["order_type"],
+            user_status=json_data.get("user", {}).get("status", "offline"),
+            mod_rank=json_data.get("mod_rank"),
+        )
+
+
+class OrderBook(object):
+    """The aggregated buy and sell orders of one item.
+
+    Orders are aggregated into price levels. The prices of each side are
+    kept sorted, so the best bid and ask are read in O(1) and a price level
+    is found in O(log n).
+
+    Args:
+        item_name: The name of the item.
+        statuses: The user statuses whose orders are kept, such as
+            ``{"ingame"}``, None keeps every order.
+        mod_rank: Only keep orders of this mod rank, None keeps every order.
+    """
+
+    def __init__(
+        self,
+        item_name: str,
+        statuses: Optional[Set[str]] = None,
+        mod_rank: Optional[int] = None,
+    ) -> None:
+        """Create an OrderBook object."""
+        self.item_name = item_name
+        self.statuses = statuses
+        self.mod_rank = mod_rank
+        self._prices = {"buy": [], "sell": []}
+        self._levels = {"buy": {}, "sell": {}}
+        self._orders = {}
+
+    def __len__(self) -> int:
+        """The number of orders in the book."""
+        return len(self._orders)
+
+    def _accepts(self, order: Order) -> bool:
+        """Whether `order` belongs in this book."""
+        if self.statuses is not None and order.user_status not in self.statuses:
+            return False
+        return self.mod_rank is None or order.mod_rank == self.mod_rank
+
+    def add(self, order: Order) -> None:
+        """Add an order, replacing any order with the same id."""
+        if order.id in self._orders:
+            self.remove(order.id)
+        if not self._accepts(order):
+            return
+        levels = self._levels[order.order_type]
+        if order.platinum not in levels:
+            bisect.insort(self._prices[order.order_type], order.platinum)
+            levels[order.platinum] = 0
+        levels[order.platinum] += order.quantity
+        self._orders[order.id] = order
+
+    def remove(self, order_id: str) -> None:
+        """Remove an order, doing nothing if it is not in the book."""
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return
+        levels = self._levels[order.order_type]
+        levels[order.platinum] -= order.quantity
+        if levels[order.platinum] <= 0:
+            del levels[order.platinum]
+            prices = self._prices[order.order_type]
+            del prices[bisect.bisect_left(prices, order.platinum)]
+
+    def replace(self, orders: Iterable[Order]) -> None:
+        """Replace every order of the book with `orders`."""
+        self._prices = {"buy": [], "sell": []}
+        self._levels = {"buy": {}, "sell": {}}
+        self._orders = {}
+        for order in orders:
+            self.add(order)
+
+    def best_bid(self) -> Optional[float]:
+        """The highest buy price, None without buy orders."""
+        prices = self._prices["buy"]
+        return prices[-1] if prices else None
+
+    def best_ask(self) -> Optional[float]:
+        """The lowest sell price, None without sell orders."""
+        prices = self._prices["sell"]
+        return prices[0] if prices else None
+
+    def spread(self) -> Optional[float]:
+        """The best ask minus the best bid, None if a side is empty."""
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def quantity_at(self, order_type: str, price: float) -> int:
+        """The total quantity of `order_type` orders at `price`."""
+        return self._levels[order_type].get(price, 0)
+
+    def depth(self, order_type: str, levels: int = 5) -> List[Tuple[float, int]]:
+        """The best `levels` price levels of a side as (price, quantity) pairs.
+
+        Args:
+            order_type: Either "buy" or "sell".
+            levels: The number of price levels to return.
+
+        Returns:
+            The price levels, best first.
+        """
+        prices = self._prices[order_type]
+        if order_type == "buy":
+            best = prices[: -levels - 1 : -1]
+        else:
+            best = prices[:levels]
+        return [(p, self._levels[order_type][p]) for p in best]
+
+    def quantity_within(self, order_type: str, price: float) -> int:
+        """The quantity offered at `price` or better.
+
+        That is the quantity of buy orders at or above `price`, or of sell
+        orders at or below it. The first level is found in O(log n).
+
+        Args:
+            order_type: The side of the book, ``buy`` or ``sell``.
+            price: The worst price included.
+
+        Returns:
+            The total quantity of the levels at `price` or better.
+        """
+        prices = self._prices[order_type]
+        if order_type == "buy":
+            best = prices[bisect.bisect_left(prices, price) :]
+        else:
+            best = prices[: bisect.bisect_right(prices, price)]
+        return sum(self._levels[order_type][p] for p in best)
+
+
+def fetch_orders(
+    item: ShortItem,
+    api_url: str = API_URL,
+    fetcher: Optional[Fetcher] = None,
+    platform: Optional[str] = None,
+) -> List[Order]:
+    """Collects the current orders of one item."""
+    json_data = from_url(api_url + ORDERS_PATH % (item.url_name), fetcher, platform)
+    rows = collect_data(json_data, ["payload", "orders"])
+    with metrics.timer("orders_parse_seconds"):
+        orders = [Order.from_json(row) for row in rows if row.get("visible", True)]
+    metrics.increment("orders_rows_total", len(orders))
+    return orders
+
+
+def collect_order_books(
+    filters: Optional[Filters] = None,
+    statuses: Optional[Set[str]] = None,
+    progress_bar: bool = False,
+    api_url: str = API_URL,
+    fetcher: Optional[Fetcher] = None,
+    books: Optional[Dict[str, OrderBook]] = None,
+    platform: Optional[str] = None,
+    catalogue: Optional[CatalogueCache] = None,
+) -> Dict[str, OrderBook]:
+    """Collect the order books of the items matching `filters`.
+
+    Args:
+        filters: The filters selecting the items, as in `market_data`.
+        statuses: The user statuses whose orders are kept, see `OrderBook`.
+        progress_bar: Whether to use a progress bar or not.
+        api_url: The base url of the API.
+        fetcher: The `Fetcher` throttling and retrying the requests, defaults
+            to the shared `default_fetcher`.
+        books: Existing order books by item id to refresh in-place, new
+            books are added for items not in it.
+        platform: The platform to collect, one of `PLATFORMS`.
+        catalogue: The `CatalogueCache` to load the catalogue from, None
+            requests it.
+
+    Returns:
+        A dictionary of item id to `OrderBook`.
+    """
+    from alive_progress import alive_bar
+
+    if books is None:
+        books = {}
+    items, index = load_catalogue(api_url, fetcher, platform, catalogue)
+    items = compile_filters(filters).select(items, index)
+    cm = alive_bar(len(items)) if progress_bar else nullcontext()
+    with cm as bar:
+        for item in items:
+            if item.id not in books:
+                books[item.id] = OrderBook(item.item_name, statuses)
+            books[item.id].replace(fetch_orders(item, api_url, fetcher, platform))
+            if bar is not None:
+                bar()
+    return books
@@ -0,0 +1,125 @@
+"""Holds the persisted cache of parsed statistics responses.
+
+Decoding a statistics response and parsing it into a `Stat` with `to_class`
+and `to_stats` costs far more than loading the result, yet most items answer
+byte for byte the same between two collections. `ParseCache` keeps the
+parsed `Stat` of each response as a compact json document, in a file named
+after the hash of the response body and item name, so an unchanged response is
+loaded without any parsing::
+
+    cache = ParseCache(os.path.expanduser("~/.cache/warframe-metrics/stats"))
+    item_stats = market_data(parse_cache=cache)
+
+Once the files exceed `max_bytes`, the least recently used are removed. The
+`Stat` layout is part of every key, so files written by an older layout are
+never loaded, and a file that cannot be decoded is removed and counted as a
+miss.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from . import metrics
+from .schema import from_json
+from .schema import json_serial
+from .schema import Stat
+
+# part of every key, so files of another format or `Stat` layout never match
+VERSION = ("json:" + ",".join(sorted(vars(Stat(""))))).encode()
+SUFFIX = ".stat"
+
+
+class ParseCache(object):
+    """A directory of parsed statistics, keyed by the hash of their response.
+
+    Args:
+        directory: The directory of the cache, created when missing.
+        max_bytes: The total size of the cached files kept, the least
+            recently used are removed beyond it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 2**20) -> None:
+        """Create a ParseCache object."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sizes = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(SUFFIX):
+                st = os.stat(os.path.join(directory, name))
+                entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._sizes[name] = size
+            self.size += size
+
+    def __len__(self) -> int:
+        """The number of cached statistics."""
+        return len(self._sizes)
+
+    def key(self, body: bytes, item_name: str) -> str:
+        """The key of the statistics of `item_name` parsed from `body`."""
+        digest = hashlib.sha256(VERSION + b"\0" + item_name.encode() + b"\0")
+        digest.update(body)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        """The file caching the statistics of `key`."""
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key: str) -> Optional[Stat]:
+        """A new copy of the statistics cached under `key`, None if missing."""
+        name = key + SUFFIX
+        with self._lock:
+            if name not in self._sizes:
+                metrics.increment("parse_cache_misses_total")
+                return None
+            try:
+                with open(self.path(key), "rb") as f:
+                    stat = from_json(Stat, f.read().decode())
+                os.utime(self.path(key))
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                self._remove(name)
+                metrics.increment("parse_cache_misses_total")
+                return None
+            self._sizes.move_to_end(name)
+        metrics.increment("parse_cache_hits_total")
+        return stat
+
+    def put(self, key: str, stat: Stat) -> None:
+        """Cache `stat` under `key`, removing the least recently used files."""
+        data = json.dumps(
+            stat.to_json(), default=json_serial, separators=(",", ":")
+        ).encode()
+        if len(data) > self.max_bytes:
+            return
+        name = key + SUFFIX
+        with self._lock:
+            tmp_path = "%s.%d.tmp" % (self.path(key), os.getpid())
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path(key))
+            self.size += len(data) - self._sizes.pop(name, 0)
+            self._sizes[name] = len(data)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._sizes)))
+                metrics.increment("parse_cache_evictions_total")
+
+    def _remove(self, name: str) -> None:
+        """Remove the cached file `name`."""
+        self.size -= self._sizes.pop(name)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Remove every cached file."""
+        with self._lock:
+            for name in list(self._sizes):
+                self._remove(name)
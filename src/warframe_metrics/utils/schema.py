@@ -1,7 +1,12 @@
 """Holds the objects required for processing Warframe market data."""
 from __future__ import annotations
 
+import copy
+import dataclasses
 import datetime
+import itertools
+import os
+import threading
 import warnings
 from dataclasses import asdict
 from dataclasses import dataclass
@@ -12,36 +17,61 @@ from typing import Dict
 from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
 from typing import Type
+from typing import TYPE_CHECKING
 from typing import Union
 
-import pandas as pd
+from . import metrics
+from .datetime_utils import DAY_MS
+from .datetime_utils import from_timestamp
+from .datetime_utils import parse_timestamp
+from .datetime_utils import to_timestamp
+
+if TYPE_CHECKING:
+    from .memory import MemoryBudget
 
-from .datetime_utils import hour_minute_second_microsecond
 
 def to_json(obj: Union[Stat, ItemStats, LiveStat]) -> str:
     """Dumps Stat, ItemStats, LiveStat into json string."""
-    json_rep = obj.to_json()
-    json_rep_str = dumps(json_rep, default=json_serial)
+    with metrics.timer("to_json_seconds"):
+        json_rep = obj.to_json()
+        json_rep_str = dumps(json_rep, default=json_serial)
+    metrics.increment("to_json_bytes_total", len(json_rep_str))
     return json_rep_str
 
 
 def from_json(cls: Type, json_rep_str: str) -> Union[Stat, ItemStats, LiveStat]:
     """Loads Stat, ItemStats, LiveStat from json string."""
-    json_rep = loads(json_rep_str, object_hook=date_hook)
-    obj = cls.from_json(json_rep)
+    with metrics.timer("from_json_seconds"):
+        json_rep = loads(json_rep_str)
+        obj = cls.from_json(json_rep)
+    metrics.increment("from_json_bytes_total", len(json_rep_str))
     return obj
 
 
 def json_serial(obj: Any) -> int:
     """JSON serializer for objects not serializable by default json code."""
-    if isinstance(obj, (datetime.datetime, datetime.date)):
+    if isinstance(obj, datetime.datetime):
+        return to_timestamp(obj)
+    if isinstance(obj, datetime.date):
         return int(obj.timestamp() * 1000)
     raise TypeError("Type %s not serializable" % type(obj))
 
 
 def date_hook(json_dict: Dict) -> Dict:
-    """Date hook for reading values from json string."""
+    """Date hook for reading values from json string.
+
+    `from_json` no longer needs it, as `Stat` and `LiveStat` objects hold
+    their dates as epoch milliseconds.
+
+    Args:
+        json_dict: A decoded json object.
+
+    Returns:
+        `json_dict`, with its ``dates`` as datetimes.
+    """
     for (key, value) in json_dict.items():
         if key == "dates":
             dates = []
@@ -53,6 +83,34 @@ def date_hook(json_dict: Dict) -> Dict:
     return json_dict
 
 
+RANK_BITS = 6
+
+
+def row_keys(timestamps: Sequence[int], mod_ranks: Optional[Sequence] = None) -> Any:
+    """The (day, mod rank) composite keys of closed statistics rows.
+
+    The utc day of each row fills the high bits of its key and its mod rank
+    the low `RANK_BITS` bits, so the keys of one day sort by mod rank. Keys
+    are computed in bulk on int64 arrays and are shared by `Stat.merge` and
+    `ItemStats.diff`.
+
+    Args:
+        timestamps: The epoch milliseconds of the rows.
+        mod_ranks: The mod rank of every row, missing ranks as None. Rows
+            have rank 0 when it is None or empty.
+
+    Returns:
+        The int64 array of keys.
+    """
+    import numpy as np
+
+    keys = (np.asarray(timestamps, dtype=np.int64) // DAY_MS) << RANK_BITS
+    if mod_ranks is not None and len(mod_ranks) > 0:
+        ranks = np.nan_to_num(np.asarray(mod_ranks, dtype=float))
+        keys |= np.clip(ranks, 0, (1 << RANK_BITS) - 1).astype(np.int64)
+    return keys
+
+
 @dataclass
 class ShortItem:
     """A singular item schema."""
@@ -100,31 +158,245 @@ class LiveStats:
     mod_rank: Optional[int]
 
 
+CLOSED_COLUMNS = (
+    "volumes",
+    "min_prices",
+    "max_prices",
+    "open_prices",
+    "closed_prices",
+    "avg_prices",
+    "wa_prices",
+    "medians",
+    "moving_avgs",
+    "donch_tops",
+    "donch_bots",
+)
+
+
+@dataclass
+class ItemStatsDiff:
+    """The differences between two `ItemStats` objects, see `ItemStats.diff`.
+
+    Attributes:
+        added: The ids of the items only found in the newer object.
+        removed: The ids of the items only found in the older object.
+        new_dates: The dates of the rows only found in the newer object, by
+            item id.
+        changed: The ``(date, old, new)`` values that changed, by item id and
+            column.
+    """
+
+    added: List[str]
+    removed: List[str]
+    new_dates: Dict[str, List[datetime.datetime]]
+    changed: Dict[str, Dict[str, List[Tuple[datetime.datetime, Any, Any]]]]
+
+    def __bool__(self) -> bool:
+        """Whether there is any difference."""
+        return bool(self.added or self.removed or self.new_dates or self.changed)
+
+
+# the bits of the flattened row keys of `ItemStats.diff` above the `row_keys`
+_OCCURRENCE_SHIFT = 24
+_OWNER_SHIFT = 40
+
+
+def _flatten_stats(
+    stats: List[Stat], columns: Tuple[str, ...], ranked: List[bool]
+) -> Tuple[Any, Any, Dict[str, Any]]:
+    """The closed statistics rows of `stats` concatenated into arrays.
+
+    The rows of an item sharing a day, and mod rank when ranked, are told
+    apart by their order, so the k-th of them has the same key in any two
+    statistics of the item.
+
+    Args:
+        stats: The statistics of every item.
+        columns: The closed statistics columns to concatenate.
+        ranked: Whether the mod rank of the rows of every item is part of
+            their key.
+
+    Returns:
+        The unique key of every row, combining the position of its item in
+        `stats`, the order of the row among those sharing its day and mod
+        rank, and its `row_keys` key, the position of the first row of every
+        item, and the float array of every column, with missing values as
+        NaN.
+    """
+    import numpy as np
+
+    lengths = [len(s.timestamps) for s in stats]
+
+    def column(name: str, missing: Any, use: Optional[List[bool]] = None) -> Any:
+        chunks = []
+        for i, (s, n) in enumerate(zip(stats, lengths)):
+            values = getattr(s, name)
+            usable = len(values) == n and (use is None or use[i])
+            chunks.append(values if usable else [missing] * n)
+        try:
+            return np.fromiter(
+                itertools.chain.from_iterable(chunks), float, sum(lengths)
+            )
+        except TypeError:
+            return np.array(list(itertools.chain.from_iterable(chunks)), dtype=float)
+
+    timestamps = np.fromiter(
+        itertools.chain.from_iterable(s.timestamps for s in stats),
+        np.int64,
+        sum(lengths),
+    )
+    owners = np.repeat(np.arange(len(stats), dtype=np.int64), lengths)
+    keys = (owners << _OWNER_SHIFT) | row_keys(
+        timestamps, column("mod_ranks", 0, ranked)
+    )
+    order = np.argsort(keys, kind="stable")
+    positions = np.arange(len(keys))
+    first = np.r_[True, keys[order][1:] != keys[order][:-1]]
+    occurrences = np.empty_like(keys)
+    occurrences[order] = positions - np.maximum.accumulate(
+        np.where(first, positions, 0)
+    )
+    keys |= occurrences << _OCCURRENCE_SHIFT
+    starts = np.cumsum([0] + lengths[:-1], dtype=np.int64)
+    values = {c: column(c, None) for c in columns}
+    return keys, starts, values
+
+
+def _group_rows(owners: Any, rows: Any, starts: Any) -> List[Tuple[int, List[int]]]:
+    """Group sorted flattened `rows` by owner, as positions within the owner."""
+    import numpy as np
+
+    owners_at, first = np.unique(owners, return_index=True)
+    local = np.split(rows - starts[owners], first[1:])
+    return list(zip(owners_at.tolist(), [g.tolist() for g in local]))
+
+
 class ItemStats(object):
-    """A object to process and hold item,statistics pairs."""
+    """A object to process and hold item,statistics pairs.
+
+    Statistics are updated copy-on-write: `merge` merges into a copy of the
+    `Stat` of an item and swaps it in once complete. `snapshot` therefore
+    returns a consistent read-only view sharing every `Stat` object, which
+    readers in other threads can use while this object keeps being updated.
+    """
 
     def __init__(self, items: List[ShortItem], stats: List[Stat]) -> None:
         """Create an ItemStats object."""
-        item_stats = {}
-        new_items = {}
-        name_items = {}
+        self.item_stats = {}
+        self.items = {}
+        self.name_items = {}
+        self.spilled = {}
+        self.frozen = False
+        self._shared_spills = set()
+        self._lock = threading.Lock()
         for i, s in zip(items, stats):
-            if i.id in item_stats:
-                raise ValueError("items has duplicate ids with id: " + i.id)
-            if i.id in new_items:
-                raise ValueError("items has duplicate ids with id: " + i.id)
-            if i.item_name in name_items:
-                i.item_name = i.item_name + "2"
-                warnings.warn("items has duplicate names with name: " + i.item_name)
-            item_stats[i.id] = s
-            new_items[i.id] = i
-            name_items[i.item_name] = i
-        self.item_stats = item_stats
-        self.items = new_items
-        self.name_items = name_items
+            self.add(i, s)
+
+    def __getstate__(self) -> Dict:
+        """The state of the object to copy or pickle, without its lock."""
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        """Restore a copied or pickled object with a new lock."""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _check_writable(self) -> None:
+        """Raise a ValueError if this object is a read-only snapshot."""
+        if self.frozen:
+            raise ValueError("ItemStats snapshots are read-only.")
+
+    def add(self, item: ShortItem, stat: Stat) -> None:
+        """Add the statistics of a new item.
+
+        An item whose name is already taken is added as a renamed copy, so
+        shared items such as those of a `CatalogueCache` are left unchanged.
+
+        Args:
+            item: The new catalogue item.
+            stat: Its statistics.
+
+        Raises:
+            ValueError: If the id of `item` is already taken.
+        """
+        self._check_writable()
+        if item.id in self.items:
+            raise ValueError("items has duplicate ids with id: " + item.id)
+        if item.item_name in self.name_items:
+            item = dataclasses.replace(item, item_name=item.item_name + "2")
+            warnings.warn(
+                "items has duplicate names with name: " + item.item_name,
+                stacklevel=2,
+            )
+        self.replace(item, stat)
+
+    def replace(self, item: ShortItem, stat: Stat) -> None:
+        """Set the statistics of `item`, swapping any previous ones at once.
+
+        The previous `Stat` object is left unchanged, so snapshots holding it
+        keep reading it.
+
+        Args:
+            item: The catalogue item.
+            stat: Its new statistics.
+        """
+        self._check_writable()
+        with self._lock:
+            self.item_stats[item.id] = stat
+            self.items[item.id] = item
+            self.name_items[item.item_name] = item
+            path = self.spilled.pop(item.id, None)
+        if path is not None and path not in self._shared_spills:
+            os.remove(path)
+
+    def snapshot(self) -> ItemStats:
+        """A read-only view of the items and statistics held now.
+
+        The view shares every `Stat` object with this one and copies only
+        the dictionaries holding them, so it is cheap to take. Later updates
+        of this object swap in new `Stat` objects instead of changing shared
+        ones, so the view never sees them, let alone half of a merge. Files
+        of spilled items are shared too, and are no longer removed once
+        read back.
+
+        Returns:
+            An `ItemStats` object whose `frozen` attribute is True. Its
+            statistics must not be changed, and `add`, `replace`, `merge`
+            and `spill` raise a ValueError.
+        """
+        view = copy.copy(self)
+        with self._lock:
+            view.item_stats = self.item_stats.copy()
+            view.items = self.items.copy()
+            view.name_items = self.name_items.copy()
+            view.spilled = self.spilled.copy()
+            self._shared_spills.update(self.spilled.values())
+        view.frozen = True
+        view._shared_spills = set(view.spilled.values())
+        return view
 
     def get_stats(self, id: str) -> Stat:
-        """Get statistics from item id."""
+        """Get statistics from item id, reading them back if spilled.
+
+        Snapshots read spilled statistics without keeping them in memory.
+
+        Args:
+            id: The id of the item.
+
+        Returns:
+            The statistics of the item.
+        """
+        if id in self.spilled:
+            if self.frozen:
+                return self._read_spilled(id)
+            stat = self._read_spilled(id)
+            with self._lock:
+                self.item_stats[id] = stat
+                path = self.spilled.pop(id)
+            if path not in self._shared_spills:
+                os.remove(path)
         return self.item_stats[id]
 
     def get_item_by_id(self, id: str) -> ShortItem:
@@ -136,14 +408,148 @@ class ItemStats(object):
         return self.name_items[name]
 
     def __iter__(self) -> Iterator:
-        """Iterator over the dictionary of item ids to statistics."""
-        return iter(self.item_stats.items())
+        """Iterator over the item ids and statistics, spilled items included.
+
+        The statistics of spilled items are read from disk for the iteration
+        only and stay spilled, so changes to them are not kept.
+
+        Yields:
+            The id and statistics of every item.
+        """
+        for id in self.items:
+            yield id, self._peek(id)
+
+    def _peek(self, id: str) -> Stat:
+        """The statistics of item `id`, read without restoring it if spilled."""
+        if id in self.spilled:
+            return self._read_spilled(id)
+        return self.item_stats[id]
+
+    def _read_spilled(self, id: str) -> Stat:
+        """Read the statistics of a spilled item."""
+        with open(self.spilled[id]) as f:
+            return from_json(Stat, f.read())
+
+    def spill(self, id: str, directory: str) -> None:
+        """Move the statistics of item `id` to a file in `directory`.
+
+        The item stays in the object, and `get_stats` reads its statistics
+        back into memory.
+
+        Args:
+            id: The id of the item to spill.
+            directory: The directory to write the statistics to.
+        """
+        self._check_writable()
+        if id in self.spilled:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, id + ".json")
+        n = 0
+        while path in self._shared_spills:
+            n += 1
+            path = os.path.join(directory, "%s.%d.json" % (id, n))
+        with open(path, "w") as f:
+            f.write(to_json(self.item_stats[id]))
+        with self._lock:
+            self.spilled[id] = path
+            del self.item_stats[id]
+
+    def merge(
+        self,
+        other: ItemStats,
+        newer: bool = True,
+        memory_budget: Optional[MemoryBudget] = None,
+    ) -> None:
+        """Merge another `ItemStats` object into this one in-place.
+
+        Items found in both objects have a copy of their `Stat` object merged
+        with `Stat.merge`, which then replaces it, and items only found in
+        `other` are added with `add`, renaming those whose name is taken.
+
+        Args:
+            other: The `ItemStats` to merge with.
+            newer: A boolean representing whether the parameter `other`
+                represents newer statistics or older ones.
+            memory_budget: The `MemoryBudget` spilling the coldest items to
+                disk when the merged statistics exceed it.
+        """
+        self._check_writable()
+        for id, stat in other:
+            if id in self.items:
+                merged = self.get_stats(id).copy()
+                merged.merge(stat, newer=newer)
+                self.replace(self.items[id], merged)
+            else:
+                self.add(other.get_item_by_id(id), stat)
+            if memory_budget is not None:
+                memory_budget.track(self, [id])
+
+    def diff(
+        self, other: ItemStats, columns: Tuple[str, ...] = CLOSED_COLUMNS
+    ) -> ItemStatsDiff:
+        """The differences from this `ItemStats` object to a newer one.
+
+        The closed statistics rows of the items found in both objects are
+        aligned on their day, and mod rank when this object's statistics of
+        the item have mod ranks, as in `Stat.merge`, and compared column by
+        column with vectorized comparisons over all items at once. Rows
+        sharing a day and rank are paired in order, the extra rows of the
+        newer object being new rows. Missing values equal each other.
+
+        Args:
+            other: The newer `ItemStats` to compare with.
+            columns: The closed statistics columns to compare.
+
+        Returns:
+            An `ItemStatsDiff` object of the differences.
+        """
+        import numpy as np
+
+        common = [id for id in self.items if id in other.items]
+        added = [id for id in other.items if id not in self.items]
+        removed = [id for id in self.items if id not in other.items]
+        old_stats = [self._peek(id) for id in common]
+        new_stats = [other._peek(id) for id in common]
+        ranked = [len(s.mod_ranks) > 0 for s in old_stats]
+        old_keys, old_starts, old_values = _flatten_stats(old_stats, columns, ranked)
+        new_keys, new_starts, new_values = _flatten_stats(new_stats, columns, ranked)
+        result = ItemStatsDiff(added, removed, {}, {})
+        new_only = np.flatnonzero(~np.isin(new_keys, old_keys))
+        new_owners = new_keys[new_only] >> _OWNER_SHIFT
+        for owner, rows in _group_rows(new_owners, new_only, new_starts):
+            timestamps = new_stats[owner].timestamps
+            result.new_dates[common[owner]] = [
+                from_timestamp(timestamps[r]) for r in rows
+            ]
+        keys, old_rows, new_rows = np.intersect1d(
+            old_keys, new_keys, return_indices=True
+        )
+        for c in columns:
+            old, new = old_values[c][old_rows], new_values[c][new_rows]
+            changed = np.flatnonzero((old != new) & ~(np.isnan(old) & np.isnan(new)))
+            owners = keys[changed] >> _OWNER_SHIFT
+            old_groups = _group_rows(owners, old_rows[changed], old_starts)
+            new_groups = _group_rows(owners, new_rows[changed], new_starts)
+            for (owner, old_local), (_, new_local) in zip(old_groups, new_groups):
+                old_column = getattr(old_stats[owner], c)
+                new_stat = new_stats[owner]
+                new_column = getattr(new_stat, c)
+                result.changed.setdefault(common[owner], {})[c] = [
+                    (
+                        from_timestamp(new_stat.timestamps[n]),
+                        old_column[o],
+                        new_column[n],
+                    )
+                    for o, n in zip(old_local, new_local)
+                ]
+        return result
 
     def to_json(self) -> Dict:
         """The object to json format."""
         items = []
         stats = []
-        for it, stat in self.item_stats.items():
+        for it, stat in self:
             items.append(asdict(self.get_item_by_id(it)))
             stats.append(stat.to_json())
         return {"items": items, "statistics": stats}
@@ -162,7 +568,11 @@ class ItemStats(object):
 
 
 class LiveStat(object):
-    """A object to process and hold live statistics."""
+    """A object to process and hold live statistics.
+
+    Dates are held in `timestamps` as integer epoch milliseconds, `dates`
+    converts them to datetimes on demand.
+    """
 
     def __init__(self, item_name: str, buy: bool = False) -> None:
         """Create an LiveStat object."""
@@ -170,7 +580,7 @@ class LiveStat(object):
         self.buy = buy
         self.max_prices = []
         self.min_prices = []
-        self.dates = []
+        self.timestamps = []
         self.volumes = []
         self.avg_prices = []
         self.medians = []
@@ -200,16 +610,32 @@ class LiveStat(object):
         else:
             self.moving_avgs.append(0)
         self.avg_prices.append(avg_price)
-        date = datetime.datetime.strptime(str_date, "%Y-%m-%dT%H:%M:%S.%f%z")
         self.max_prices.append(max_price)
         self.min_prices.append(min_price)
-        self.dates.append(date)
+        self.timestamps.append(parse_timestamp(str_date))
         self.wa_prices.append(wa_price)
 
+    @property
+    def dates(self) -> List[datetime.datetime]:
+        """The dates of the statistics, as timezone-aware datetimes."""
+        return [from_timestamp(t) for t in self.timestamps]
+
+    @dates.setter
+    def dates(self, dates: List[Union[datetime.datetime, int]]) -> None:
+        """Set the dates from datetimes or epoch milliseconds."""
+        self.timestamps = [to_timestamp(d) for d in dates]
+
+    def copy(self) -> LiveStat:
+        """A copy whose columns can be appended to without changing this one."""
+        live_stat = copy.copy(self)
+        for key, value in vars(self).items():
+            if isinstance(value, list):
+                setattr(live_stat, key, list(value))
+        return live_stat
+
     def to_json(self) -> Dict:
         """The object to json format."""
-        json_data = self.__dict__.copy()
-        return json_data
+        return {"dates" if k == "timestamps" else k: v for k, v in vars(self).items()}
 
     @classmethod
     def from_json(cls: Type, json_data: Dict) -> LiveStat:
@@ -220,13 +646,211 @@ class LiveStat(object):
         return live_stat
 
 
+LIVE_COLUMNS = (
+    "timestamps",
+    "volumes",
+    "min_prices",
+    "max_prices",
+    "avg_prices",
+    "wa_prices",
+    "medians",
+    "moving_avgs",
+    "mod_ranks",
+)
+
+
+class LiveRing(object):
+    """A fixed-capacity ring buffer of live statistics rows.
+
+    A drop-in replacement for `LiveStat` that keeps the most recent
+    `capacity` rows in preallocated columns. Appending a row is O(1), a row
+    whose date is already held overwrites it, and once full every new row
+    evicts the oldest one. Evicted rows are appended to `history` when one
+    is given. Rows must be appended in date order, rows older than the newest
+    held row that are not already held go straight to `history`.
+
+    The columns are read like those of `LiveStat`, for example
+    ``ring.volumes`` or ``ring.dates``, and are returned oldest first.
+
+    Args:
+        item_name: The name of the item.
+        buy: Whether the rows are buy or sell statistics.
+        capacity: The number of rows held, 48 holds two days of hourly rows.
+        history: The `LiveStat` evicted rows are spilled to, None drops them.
+    """
+
+    def __init__(
+        self,
+        item_name: str,
+        buy: bool = False,
+        capacity: int = 48,
+        history: Optional[LiveStat] = None,
+    ) -> None:
+        """Create a LiveRing object."""
+        self.item_name = item_name
+        self.buy = buy
+        self.capacity = capacity
+        self.history = history
+        self._columns = {c: [None] * capacity for c in LIVE_COLUMNS}
+        self._start = 0
+        self._size = 0
+        self._slots = {}
+
+    def __len__(self) -> int:
+        """The number of rows held."""
+        return self._size
+
+    def __getattr__(self, name: str) -> List:
+        """The column `name`, oldest row first."""
+        if name == "dates":
+            return [from_timestamp(t) for t in self.timestamps]
+        if name not in LIVE_COLUMNS:
+            raise AttributeError(name)
+        column = self._columns[name]
+        end = self._start + self._size
+        values = column[self._start : min(end, self.capacity)]
+        values += column[: max(0, end - self.capacity)]
+        if name == "mod_ranks" and all(r is None for r in values):
+            return []
+        return values
+
+    def _row(self, slot: int) -> Dict[str, Any]:
+        """The values of the row held in `slot`."""
+        return {c: self._columns[c][slot] for c in LIVE_COLUMNS}
+
+    def _spill(self, row: Dict[str, Any]) -> None:
+        """Append an evicted row to the history."""
+        if self.history is None:
+            return
+        for c in LIVE_COLUMNS:
+            if c != "mod_ranks" or row[c] is not None:
+                getattr(self.history, c).append(row[c])
+
+    def append(self, date: Union[datetime.datetime, int], **values: Any) -> None:
+        """Append a row, overwriting the held row with the same date.
+
+        Args:
+            date: The date of the row, a datetime or epoch milliseconds.
+            **values: The value of every other column of `LIVE_COLUMNS`,
+                missing columns are None.
+        """  # noqa: RST210
+        date = to_timestamp(date)
+        row = {c: values.get(c) for c in LIVE_COLUMNS}
+        row["timestamps"] = date
+        if date in self._slots:
+            slot = self._slots[date]
+        elif self._size and date < self._columns["timestamps"][self._newest()]:
+            self._spill(row)
+            return
+        else:
+            if self._size == self.capacity:
+                slot = self._start
+                evicted = self._row(slot)
+                del self._slots[evicted["timestamps"]]
+                self._spill(evicted)
+                self._start = (self._start + 1) % self.capacity
+            else:
+                slot = (self._start + self._size) % self.capacity
+                self._size += 1
+            self._slots[date] = slot
+        for c in LIVE_COLUMNS:
+            self._columns[c][slot] = row[c]
+
+    def add_stat(
+        self,
+        str_date: str,
+        min_price: float,
+        max_price: float,
+        volume: int,
+        avg_price: float,
+        wa_price: float,
+        median: float,
+        moving_avg: Optional[float],
+        mod_rank: Optional[int] = None,
+    ) -> None:
+        """Add live statistics, see `LiveStat.add_stat`."""
+        self.append(
+            parse_timestamp(str_date),
+            volumes=volume,
+            min_prices=min_price,
+            max_prices=max_price,
+            avg_prices=avg_price,
+            wa_prices=wa_price,
+            medians=median,
+            moving_avgs=moving_avg or 0,
+            mod_ranks=mod_rank or None,
+        )
+
+    def _newest(self) -> int:
+        """The slot of the newest row."""
+        return (self._start + self._size - 1) % self.capacity
+
+    def extend(self, live_stat: Union[LiveStat, LiveRing]) -> None:
+        """Append every row of a `LiveStat` or `LiveRing`, oldest first."""
+        columns = {c: getattr(live_stat, c) for c in LIVE_COLUMNS}
+        timestamps = columns["timestamps"]
+        if len(columns["mod_ranks"]) != len(timestamps):
+            columns["mod_ranks"] = [None] * len(timestamps)
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        for i in order:
+            values = {c: columns[c][i] for c in LIVE_COLUMNS if c != "timestamps"}
+            self.append(timestamps[i], **values)
+
+    def copy(self) -> LiveRing:
+        """A copy holding its own rows and history."""
+        ring = copy.copy(self)
+        ring._columns = {c: list(v) for c, v in self._columns.items()}
+        ring._slots = dict(self._slots)
+        if self.history is not None:
+            ring.history = self.history.copy()
+        return ring
+
+    @classmethod
+    def from_live_stat(
+        cls: Type,
+        live_stat: Union[LiveStat, LiveRing],
+        capacity: int = 48,
+        history: Optional[LiveStat] = None,
+    ) -> LiveRing:
+        """A ring holding the most recent rows of `live_stat`."""
+        ring = cls(live_stat.item_name, live_stat.buy, capacity, history)
+        ring.extend(live_stat)
+        return ring
+
+    def to_json(self) -> Dict:
+        """The object to json format, readable as a `LiveStat`."""
+        json_data = {"item_name": self.item_name, "buy": self.buy}
+        for c in LIVE_COLUMNS:
+            json_data["dates" if c == "timestamps" else c] = getattr(self, c)
+        json_data["capacity"] = self.capacity
+        if self.history is not None:
+            json_data["history"] = self.history.to_json()
+        return json_data
+
+    @classmethod
+    def from_json(cls: Type, json_data: Dict) -> LiveRing:
+        """The object from a json format."""
+        history = None
+        if json_data.get("history") is not None:
+            history = LiveStat.from_json(json_data["history"])
+        live_stat = LiveStat(json_data["item_name"], json_data["buy"])
+        for c in LIVE_COLUMNS:
+            c = "dates" if c == "timestamps" else c
+            setattr(live_stat, c, json_data[c])
+        return cls.from_live_stat(live_stat, json_data["capacity"], history)
+
+
 class Stat(object):
-    """A object to process and hold live and closed statistics."""
+    """A object to process and hold live and closed statistics.
+
+    Like `LiveStat`, dates are held in `timestamps` as integer epoch
+    milliseconds and read as datetimes through `dates`.
+    """
 
     def __init__(self, item_name: str) -> None:
         """Create an Stat object."""
         self.item_name = item_name
-        self.dates = []
+        self.timestamps = []
         self.volumes = []
         self.avg_prices = []
         self.medians = []
@@ -264,8 +888,7 @@ class Stat(object):
         self.volumes.append(volume)
         self.medians.append(median)
         self.avg_prices.append(avg_price)
-        date = datetime.datetime.strptime(str_date, "%Y-%m-%dT%H:%M:%S.%f%z")
-        self.dates.append(date)
+        self.timestamps.append(parse_timestamp(str_date))
         self.min_prices.append(min_price)
         self.max_prices.append(max_price)
         self.open_prices.append(open_price)
@@ -278,6 +901,16 @@ class Stat(object):
         self.donch_tops.append(donch_top)
         self.donch_bots.append(donch_bot)
 
+    @property
+    def dates(self) -> List[datetime.datetime]:
+        """The dates of the statistics, as timezone-aware datetimes."""
+        return [from_timestamp(t) for t in self.timestamps]
+
+    @dates.setter
+    def dates(self, dates: List[Union[datetime.datetime, int]]) -> None:
+        """Set the dates from datetimes or epoch milliseconds."""
+        self.timestamps = [to_timestamp(d) for d in dates]
+
     def add_live_stats(
         self,
         str_date: str,
@@ -358,6 +991,22 @@ class Stat(object):
         plt.gca().xaxis.set_major_locator(mdates.DayLocator(interval=10))
         plt.show()
 
+    def copy(self) -> Stat:
+        """A copy that can be merged into without changing this one.
+
+        The closed statistics columns are shared, as `merge` replaces them
+        rather than changing them, and only `LiveRing` buffers are copied.
+
+        Returns:
+            The copy.
+        """
+        stat = copy.copy(self)
+        for attr in ("live_stat_buy", "live_stat_sell"):
+            live_stat = getattr(self, attr)
+            if isinstance(live_stat, LiveRing):
+                setattr(stat, attr, live_stat.copy())
+        return stat
+
     def get_live_stats(self, stat_name: str, buy: bool = False) -> List:
         """Get the live statistics."""
         if buy:
@@ -366,17 +1015,21 @@ class Stat(object):
             stat = getattr(self.live_stat_sell, stat_name)
         return stat
 
+    @metrics.timed("merge_seconds")
     def merge(self, other: Stat, newer: bool = True) -> None:
         """Merge two `Stat` object togther based on dates.
 
-        Combine two `Stat` objecst using the dates replaced to be only
-        year, month, and day. These replaced dates are then used to merge
+        Combine two `Stat` objecst using the `row_keys` of their rows, the
+        day of each row combined with its mod rank when the statistics have
+        mod ranks. These keys are then used to merge
         the two stat objects. The idea is to combined new collected data
         with old stored data. This merge is done in-place and does not
         return a new Stat `object`. Please note that this function is not
         highly optimized and expects one statistics to be collected each
         days. The live statistics are simply set to the newer `Stat` object
-        chosen based on the `newer` parameter.
+        chosen based on the `newer` parameter, unless `retain_live` was
+        called, in which case newer live statistics are appended to the
+        buffers.
 
         Args:
             other: The `Stat` to merge with.
@@ -387,33 +1040,13 @@ class Stat(object):
         Raises:
             ValueError: If the `Stat` objects have different item names.
         """
+        import pandas as pd
+
         if other.item_name != self.item_name:
             raise ValueError("Merging stats for different items.")
-        if len(self.mod_ranks) > 0:
-
-            self_dates = []
-            other_dates = []
-            for d1, r1 in zip(self.dates, self.mod_ranks):
-                d1 = d1.replace(**hour_minute_second_microsecond(datetime.timedelta(minutes=r1)))
-                self_dates.append(d1)
-
-            if len(other.mod_ranks) > 0:
-                for d2, r2 in zip(other.dates, other.mod_ranks):
-                    d2 = d2.replace(**hour_minute_second_microsecond(datetime.timedelta(minutes=r2)))
-                    other_dates.append(d2)
-            else:
-                other_dates = [
-                    d.replace(minute=0, hour=0, second=0, microsecond=0)
-                    for d in other.dates
-                ]
-        else:
-            self_dates = [
-                d.replace(minute=0, hour=0, second=0, microsecond=0) for d in self.dates
-            ]
-            other_dates = [
-                d.replace(minute=0, hour=0, second=0, microsecond=0)
-                for d in other.dates
-            ]
+        ranked = len(self.mod_ranks) > 0
+        self_keys = row_keys(self.timestamps, self.mod_ranks if ranked else None)
+        other_keys = row_keys(other.timestamps, other.mod_ranks if ranked else None)
         other_stat = other.__dict__.copy()
         stat = self.__dict__.copy()
         stat.pop("live_stat_buy")
@@ -425,11 +1058,11 @@ class Stat(object):
             other_stat.pop("mod_ranks")
         else:
             if len(other.mod_ranks) == 0:
-                other_stat["mod_ranks"] = [0]*len(other.dates)
+                other_stat["mod_ranks"] = [0] * len(other.timestamps)
         other_stat.pop("live_stat_buy")
         other_stat.pop("live_stat_sell")
-        other_stat["date_key"] = other_dates
-        stat["date_key"] = self_dates
+        other_stat["date_key"] = other_keys
+        stat["date_key"] = self_keys
         other_stat_df = pd.DataFrame(other_stat)
         stat_df = pd.DataFrame(stat)
         merged = pd.merge(
@@ -441,13 +1074,13 @@ class Stat(object):
             suffixes=("_left", "_right"),
         )
         stat.pop("date_key")
-        main_attr = "dates_right"
-        sec_attr = "dates_left"
+        main_attr = "timestamps_right"
+        sec_attr = "timestamps_left"
         if newer is False:
-            main_attr = "dates_left"
-            sec_attr = "dates_right"
+            main_attr = "timestamps_left"
+            sec_attr = "timestamps_right"
         merged.loc[merged[main_attr].isna(), main_attr] = merged[sec_attr]
-        merged = merged.sort_values(by=[main_attr])
+        merged = merged.sort_values(by=[main_attr, "date_key"])
         for attr in stat:
             main_attr = attr + "_right"
             sec_attr = attr + "_left"
@@ -456,16 +1089,44 @@ class Stat(object):
                 sec_attr = attr + "_right"
             merged.loc[merged[main_attr].isna(), main_attr] = merged[sec_attr]
             values = merged[main_attr].to_list()
-            if "dates" in main_attr:
-                values = [v.to_pydatetime() for v in values]
+            if attr == "timestamps":
+                values = [int(v) for v in values]
             setattr(self, attr, values)
         if newer:
-            self.live_stat_buy = other.live_stat_buy
-            self.live_stat_sell = other.live_stat_sell
+            if isinstance(self.live_stat_buy, LiveRing):
+                self.live_stat_buy.extend(other.live_stat_buy)
+                self.live_stat_sell.extend(other.live_stat_sell)
+            else:
+                self.live_stat_buy = other.live_stat_buy
+                self.live_stat_sell = other.live_stat_sell
+
+    def retain_live(self, capacity: int = 48, history: bool = False) -> None:
+        """Hold the live statistics in `LiveRing` buffers of `capacity` rows.
+
+        Afterwards `merge` appends newer live statistics to the buffers
+        instead of replacing them, keeping the most recent `capacity` hourly
+        rows across refreshes.
+
+        Args:
+            capacity: The number of rows kept for each of buy and sell.
+            history: Whether evicted rows are spilled to the `history`
+                attribute of each buffer rather than dropped.
+        """
+        buffers = []
+        for live_stat in (self.live_stat_buy, self.live_stat_sell):
+            spill = None
+            if isinstance(live_stat, LiveRing) and live_stat.history is not None:
+                spill = live_stat.history
+            elif history:
+                spill = LiveStat(self.item_name, live_stat.buy)
+            buffers.append(LiveRing.from_live_stat(live_stat, capacity, spill))
+        self.live_stat_buy, self.live_stat_sell = buffers
 
     def to_json(self) -> Dict:
         """The object to json format."""
-        json_data = self.__dict__.copy()
+        json_data = {
+            "dates" if k == "timestamps" else k: v for k, v in vars(self).items()
+        }
         json_data["live_stat_buy"] = self.live_stat_buy.to_json()
         json_data["live_stat_sell"] = self.live_stat_sell.to_json()
         return json_data
@@ -476,7 +1137,10 @@ class Stat(object):
         stat = cls(json_data["item_name"])
         for key in json_data:
             if key == "live_stat_buy" or key == "live_stat_sell":
-                loaded_live_stat = LiveStat.from_json(json_data[key])
+                if "capacity" in json_data[key]:
+                    loaded_live_stat = LiveRing.from_json(json_data[key])
+                else:
+                    loaded_live_stat = LiveStat.from_json(json_data[key])
                 setattr(stat, key, loaded_live_stat)
             else:
                 setattr(stat, key, json_data[key])
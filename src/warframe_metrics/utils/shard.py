@@ -0,0 +1,158 @@
+"""Holds the utils to split a collection into shards and combine the results.
+
+Items are assigned to shards by hashing their url name, so every worker
+agrees on the assignment without coordinating. A worker collects its shard
+into a partial snapshot, for example on another machine with::
+
+    warframe-metrics collect --shard 2/8 -o partial-2.json
+
+and `combine_snapshots` (or ``warframe-metrics combine``) merges the
+partial snapshots into one `ItemStats`.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+from .constants import API_URL
+from .schema import ItemStats
+from .schema import ShortItem
+from .schema import to_json
+from .snapshot import open_snapshot
+
+
+def shard_of(url_name: str, num_shards: int) -> int:
+    """The shard an item belongs to, stable across processes and machines.
+
+    Args:
+        url_name: The url name of the item.
+        num_shards: The total number of shards.
+
+    Returns:
+        The shard index, between 0 and `num_shards` - 1.
+    """
+    digest = hashlib.blake2b(url_name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+def in_shard(item: ShortItem, shard: Optional[Tuple[int, int]]) -> bool:
+    """Whether `item` belongs to `shard`, given as ``(index, num_shards)``.
+
+    Every item belongs to the shard None.
+
+    Args:
+        item: The catalogue item.
+        shard: The ``(index, num_shards)`` shard, or None.
+
+    Returns:
+        Whether `item` belongs to `shard`.
+    """
+    if shard is None:
+        return True
+    index, num_shards = shard
+    return shard_of(item.url_name, num_shards) == index
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse a shard written as ``index/num_shards``, such as ``2/8``."""
+    try:
+        index, num_shards = (int(v) for v in value.split("/"))
+    except ValueError:
+        raise ValueError("shards must look like index/count: " + value) from None
+    if num_shards < 1 or not 0 <= index < num_shards:
+        raise ValueError("shard index must be between 0 and count - 1: " + value)
+    return index, num_shards
+
+
+def combine_snapshots(paths: Iterable[str]) -> ItemStats:
+    """Merge partial snapshots into one `ItemStats` object.
+
+    Args:
+        paths: The partial json or indexed snapshot files, older snapshots
+            first when they overlap.
+
+    Returns:
+        The combined `ItemStats` object.
+    """
+    combined = ItemStats([], [])
+    for path in paths:
+        combined.merge(open_snapshot(path), newer=True)
+    return combined
+
+
+def _collect_shard(
+    shard: Tuple[int, int],
+    path: str,
+    filters: Dict[str, Any],
+    prime: bool,
+    api_url: str,
+    timeout: float,
+) -> str:
+    """Collect one shard into a partial snapshot, run in a worker process."""
+    if prime:
+        from ..market.prime import collect_prime_data
+
+        item_stats = collect_prime_data(timeout=timeout, api_url=api_url, shard=shard)
+    else:
+        from .collect_data import market_data
+
+        item_stats = market_data(
+            filters=filters, timeout=timeout, api_url=api_url, shard=shard
+        )
+    with open(path, "w") as f:
+        f.write(to_json(item_stats))
+    return path
+
+
+def collect_sharded(
+    num_shards: int,
+    directory: str,
+    workers: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    prime: bool = False,
+    api_url: str = API_URL,
+    timeout: float = 1.0,
+) -> ItemStats:
+    """Collect every shard in local worker processes and combine the results.
+
+    Each worker has its own `Fetcher`, so the request rate seen by the API
+    grows with the number of workers.
+
+    Args:
+        num_shards: The number of shards to split the catalogue into.
+        directory: The directory the partial snapshots are written to, as
+            ``shard-<index>-of-<num_shards>.json``.
+        workers: The number of worker processes, defaults to `num_shards`.
+        filters: A dictionary of `ShortItem` attributes to values, as in
+            `market_data`.
+        prime: Whether to collect prime items with `collect_prime_data`.
+        api_url: The base url of the API.
+        timeout: The number of seconds each worker waits every ten items.
+
+    Returns:
+        The combined `ItemStats` object.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = [
+        os.path.join(directory, "shard-%d-of-%d.json" % (i, num_shards))
+        for i in range(num_shards)
+    ]
+    with ProcessPoolExecutor(max_workers=workers or num_shards) as pool:
+        futures = [
+            pool.submit(
+                _collect_shard,
+                (i, num_shards),
+                path,
+                filters or {},
+                prime,
+                api_url,
+                timeout,
+            )
+            for i, path in enumerate(paths)
+        ]
+        done = [future.result() for future in futures]
+    return combine_snapshots(done)
@@ -0,0 +1,246 @@
+"""Holds indexed snapshot files and the lazy `ItemStats` view over them.
+
+A json snapshot must be deserialized whole before any item can be read. An
+indexed snapshot stores the statistics of every item as a separate json
+document on its own line, after a header line holding the offset of the
+index of the items and of the byte range of their statistics::
+
+    WFMSNAP1<index offset, 16 digits>
+    <statistics of the first item>
+    ...
+    {"items": [...], "offsets": [[start, length], ...]}
+
+`LazyItemStats` reads the header and the index only, so opening a snapshot
+of thousands of items is instant, and decodes the `Stat` of an item on its
+first access::
+
+    item_stats = open_snapshot("primes.wfms")
+    item_stats.get_stats(item_stats.get_item("Ash Prime Set").id)
+"""
+import json
+import os
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any
+from typing import Tuple
+
+from . import metrics
+from .schema import from_json
+from .schema import ItemStats
+from .schema import json_serial
+from .schema import ShortItem
+from .schema import Stat
+
+MAGIC = b"WFMSNAP1"
+HEADER_SIZE = len(MAGIC) + 17
+
+
+def _encode(stat: Stat) -> str:
+    """The compact json document of `stat`."""
+    return json.dumps(stat.to_json(), default=json_serial, separators=(",", ":"))
+
+
+class SnapshotWriter(object):
+    """Writes an indexed snapshot item by item.
+
+    The statistics of each item are written as soon as they are added, so
+    only the index is held in memory however many items are written. The
+    snapshot is written to a temporary file moved to `path` on `close`, and
+    a writer used as a context manager discards it if an error is raised.
+
+    Args:
+        path: The file to write.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Create a SnapshotWriter object."""
+        self.path = path
+        self.items = []
+        self.offsets = []
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(b"\0" * HEADER_SIZE)
+
+    def add(self, item: ShortItem, stat: Stat) -> None:
+        """Write the statistics `stat` of `item`."""
+        data = _encode(stat).encode() + b"\n"
+        self.items.append(asdict(item))
+        self.offsets.append([self._file.tell(), len(data)])
+        self._file.write(data)
+
+    def close(self) -> None:
+        """Write the index and move the snapshot to its path."""
+        index_offset = self._file.tell()
+        index = {"items": self.items, "offsets": self.offsets}
+        self._file.write(json.dumps(index).encode())
+        self._file.seek(0)
+        self._file.write(MAGIC + b"%016d\n" % index_offset)
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        """Discard the snapshot written so far."""
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> "SnapshotWriter":
+        """Return the writer."""
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        """Close the writer, or abort it if an error was raised."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_indexed_snapshot(item_stats: ItemStats, path: str) -> None:
+    """Write `item_stats` as an indexed snapshot, atomically.
+
+    Args:
+        item_stats: The statistics to write, spilled and lazy items included.
+        path: The file to write.
+    """
+    with SnapshotWriter(path) as writer:
+        for id, stat in item_stats:
+            writer.add(item_stats.get_item_by_id(id), stat)
+
+
+def is_indexed_snapshot(path: str) -> bool:
+    """Whether the file at `path` is an indexed snapshot."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class LazyItemStats(ItemStats):
+    """An `ItemStats` view over an indexed snapshot, decoding items lazily.
+
+    The items and their lookups are built when the object is created, and
+    the statistics of an item are decoded when first read by `get_stats`,
+    iteration or `diff`. The most recently read `cache_size` statistics are
+    kept decoded, older ones are decoded again when read.
+
+    Statistics evicted from the cache are read back unchanged, so changes
+    to them are only kept once the item is pinned in memory with `pin`.
+    Items changed by `merge` or added with `add` are held in memory like
+    those of an `ItemStats` object.
+
+    Args:
+        path: The indexed snapshot to read, see `write_indexed_snapshot`.
+        cache_size: The number of decoded statistics kept.
+    """
+
+    def __init__(self, path: str, cache_size: int = 128) -> None:
+        """Create a LazyItemStats object."""
+        super().__init__([], [])
+        self.path = path
+        self.cache_size = cache_size
+        self.offsets = {}
+        self._cache = OrderedDict()
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            if not header.startswith(MAGIC):
+                raise ValueError("not an indexed snapshot: " + path)
+            f.seek(int(header[len(MAGIC) :]))
+            index = json.loads(f.read())
+        for row, offset in zip(index["items"], index["offsets"]):
+            item = ShortItem(**row)
+            self.items[item.id] = item
+            self.name_items[item.item_name] = item
+            self.offsets[item.id] = tuple(offset)
+
+    def _is_lazy(self, id: str) -> bool:
+        """Whether the statistics of item `id` are read from the snapshot."""
+        return (
+            id in self.offsets and id not in self.item_stats and id not in self.spilled
+        )
+
+    def _load(self, id: str) -> Stat:
+        """Decode the statistics of item `id` from the snapshot."""
+        start, length = self.offsets[id]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(length)
+        metrics.increment("lazy_stats_decoded_total")
+        return from_json(Stat, data.decode())
+
+    def _cached(self, id: str) -> Stat:
+        """The decoded statistics of item `id`, through the cache."""
+        stat = self._cache.get(id)
+        if stat is None:
+            stat = self._load(id)
+            self._cache[id] = stat
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(id)
+        return stat
+
+    def get_stats(self, id: str) -> Stat:
+        """Get statistics from item id, decoding them on first access."""
+        if self._is_lazy(id):
+            return self._cached(id)
+        return super().get_stats(id)
+
+    def _peek(self, id: str) -> Stat:
+        """The statistics of item `id`, decoded or read without restoring them."""
+        if self._is_lazy(id):
+            return self._cached(id)
+        return super()._peek(id)
+
+    def pin(self, id: str) -> Stat:
+        """Hold the statistics of item `id` in memory so changes are kept."""
+        self._check_writable()
+        if self._is_lazy(id):
+            stat = self._cache.pop(id, None)
+            self.item_stats[id] = stat if stat is not None else self._load(id)
+        return self.get_stats(id)
+
+    def spill(self, id: str, directory: str) -> None:
+        """Move the statistics of item `id` out of memory.
+
+        Unchanged statistics are dropped from the cache, as they can be
+        decoded from the snapshot again, see `ItemStats.spill` otherwise.
+
+        Args:
+            id: The id of the item.
+            directory: The directory to spill changed statistics to.
+        """
+        self._cache.pop(id, None)
+        if not self._is_lazy(id):
+            super().spill(id, directory)
+
+    def snapshot(self) -> "LazyItemStats":
+        """A read-only view of the items held now, see `ItemStats.snapshot`.
+
+        The view decodes statistics into a cache of its own.
+
+        Returns:
+            The read-only view.
+        """
+        view = super().snapshot()
+        view._cache = OrderedDict()
+        return view
+
+    def cache_info(self) -> Tuple[int, int]:
+        """The number of decoded statistics cached and the cache size."""
+        return len(self._cache), self.cache_size
+
+
+def open_snapshot(path: str, cache_size: int = 128) -> ItemStats:
+    """Open a snapshot, lazily if it is an indexed snapshot.
+
+    Args:
+        path: A json or indexed snapshot.
+        cache_size: The number of decoded statistics a `LazyItemStats`
+            object keeps.
+
+    Returns:
+        A `LazyItemStats` object for indexed snapshots, and an `ItemStats`
+        object read whole for json snapshots.
+    """
+    if is_indexed_snapshot(path):
+        return LazyItemStats(path, cache_size)
+    with open(path) as f:
+        return from_json(ItemStats, f.read())
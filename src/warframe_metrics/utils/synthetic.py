@@ -0,0 +1,298 @@
+"""Holds a deterministic generator of synthetic Warframe market data."""
+import datetime
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+import numpy as np
+
+from .collect_data import to_stats
+from .schema import ItemStats
+from .schema import LiveStats
+from .schema import ShortItem
+from .schema import Stat
+from .schema import Stats
+
+PRIME_PARTS = ["Set", "Blueprint", "Chassis", "Neuroptics", "Systems", "Barrel"]
+ITEM_TYPES = ["Warframe", "Primary", "Secondary", "Melee"]
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000+00:00"
+END = datetime.datetime(2021, 6, 1, tzinfo=datetime.timezone.utc)
+
+
+class SyntheticCatalogue(object):
+    """A deterministic stand-in for the warframe.market item catalogue.
+
+    Every item's statistics are generated from the catalogue seed and the
+    item index alone, so any item can be generated on its own and two
+    catalogues created with the same arguments hold identical data. The
+    payloads follow the layout of the ``/v1/items`` and
+    ``/v1/items/<url_name>/statistics`` endpoints.
+
+    Args:
+        num_items: The number of items in the catalogue.
+        num_days: The number of days of closed statistics per item.
+        seed: The seed all generated values derive from.
+        prime_fraction: The fraction of items that are prime parts.
+        mod_fraction: The fraction of items that are ranked mods, which get
+            two closed rows per day (rank 0 and the max rank).
+        end: The last day of closed statistics.
+    """
+
+    def __init__(
+        self,
+        num_items: int = 100,
+        num_days: int = 90,
+        seed: int = 0,
+        prime_fraction: float = 0.3,
+        mod_fraction: float = 0.1,
+        end: datetime.datetime = END,
+    ) -> None:
+        """Create a SyntheticCatalogue object."""
+        self.num_items = num_items
+        self.num_days = num_days
+        self.seed = seed
+        self.prime_fraction = prime_fraction
+        self.mod_fraction = mod_fraction
+        self.end = end.replace(hour=0, minute=0, second=0, microsecond=0)
+        self._url_names = {}
+        for index in range(num_items):
+            self._url_names[self.url_name(index)] = index
+
+    def _kind(self, index: int) -> str:
+        """The kind of item at `index`, which is "prime", "mod" or "misc"."""
+        position = (index * 0.6180339887) % 1.0
+        if position < self.prime_fraction:
+            return "prime"
+        if position < self.prime_fraction + self.mod_fraction:
+            return "mod"
+        return "misc"
+
+    def item_name(self, index: int) -> str:
+        """The item name of the item at `index`."""
+        kind = self._kind(index)
+        if kind == "prime":
+            part = PRIME_PARTS[index % len(PRIME_PARTS)]
+            return "Synth%06d Prime %s" % (index, part)
+        if kind == "mod":
+            return "Synth%06d Mod" % index
+        return "Synth%06d Relic" % index
+
+    def url_name(self, index: int) -> str:
+        """The url name of the item at `index`."""
+        return self.item_name(index).lower().replace(" ", "_")
+
+    def index(self, url_name: str) -> int:
+        """The index of the item with `url_name`."""
+        return self._url_names[url_name]
+
+    def url_names(self) -> List[str]:
+        """The url names of all items in catalogue order."""
+        return list(self._url_names)
+
+    def short_item(self, index: int) -> ShortItem:
+        """The `ShortItem` of the item at `index`."""
+        url_name = self.url_name(index)
+        return ShortItem(
+            thumb="icons/en/thumbs/%s.128x128.png" % url_name,
+            id="%024x" % (index + 1),
+            item_name=self.item_name(index),
+            url_name=url_name,
+        )
+
+    def short_items(self) -> List[ShortItem]:
+        """The `ShortItem` objects of all items."""
+        return [self.short_item(i) for i in range(self.num_items)]
+
+    def items_payload(self) -> Dict:
+        """The json payload of the items endpoint."""
+        items = []
+        for i in range(self.num_items):
+            item = self.short_item(i)
+            items.append(
+                {
+                    "id": item.id,
+                    "item_name": item.item_name,
+                    "thumb": item.thumb,
+                    "url_name": item.url_name,
+                }
+            )
+        return {"payload": {"items": items}}
+
+    def _rows(self, index: int, num_rows: int, price: float, stream: int) -> Dict:
+        """Random walk prices and volumes for one item."""
+        rng = np.random.default_rng([self.seed, index, stream])
+        base = price * np.exp(np.cumsum(rng.normal(0.0, 0.05, num_rows)))
+        spread = rng.uniform(0.05, 0.3, num_rows) * base
+        return {
+            "volume": rng.poisson(max(1.0, 40.0 / (1 + index % 7)), num_rows) + 1,
+            "min_price": np.maximum(1, np.round(base - spread)),
+            "max_price": np.round(base + spread) + 1,
+            "open_price": np.round(base + rng.normal(0, 1, num_rows)),
+            "closed_price": np.round(base + rng.normal(0, 1, num_rows)),
+            "avg_price": np.round(base, 1),
+            "wa_price": np.round(base + rng.normal(0, 0.5, num_rows), 3),
+            "median": np.round(base),
+        }
+
+    def _base_price(self, index: int) -> float:
+        """The starting price of the item at `index`."""
+        return 5.0 + (index * 37) % 120
+
+    def closed_payload(self, index: int) -> List[Dict]:
+        """The closed statistics json rows of the item at `index`."""
+        ranks = [0, 10] if self._kind(index) == "mod" else [None]
+        rows = []
+        for r, rank in enumerate(ranks):
+            values = self._rows(index, self.num_days, self._base_price(index), r)
+            moving = np.convolve(values["avg_price"], np.ones(7) / 7.0, mode="full")
+            for d in range(self.num_days):
+                date = self.end - datetime.timedelta(days=self.num_days - 1 - d)
+                row = {
+                    "datetime": date.strftime(DATE_FORMAT),
+                    "volume": int(values["volume"][d]),
+                    "min_price": float(values["min_price"][d]),
+                    "max_price": float(values["max_price"][d]),
+                    "open_price": float(values["open_price"][d]),
+                    "closed_price": float(values["closed_price"][d]),
+                    "avg_price": float(values["avg_price"][d]),
+                    "wa_price": float(values["wa_price"][d]),
+                    "median": float(values["median"][d]),
+                    "moving_avg": round(float(moving[d]), 1) if d >= 6 else None,
+                    "donch_top": float(
+                        values["max_price"][max(0, d - 6) : d + 1].max()
+                    ),
+                    "donch_bot": float(
+                        values["min_price"][max(0, d - 6) : d + 1].min()
+                    ),
+                    "id": "%012x%012x" % (index + 1, len(rows) + 1),
+                }
+                if rank is not None:
+                    row["mod_rank"] = rank
+                rows.append(row)
+        rows.sort(key=lambda row: row["datetime"])
+        return rows
+
+    def live_payload(self, index: int) -> List[Dict]:
+        """The live statistics json rows (48 hours) of the item at `index`."""
+        rows = []
+        last_hour = self.end + datetime.timedelta(hours=23)
+        for order_type, stream in (("buy", 8), ("sell", 9)):
+            values = self._rows(index, 48, self._base_price(index), stream)
+            for h in range(48):
+                date = last_hour - datetime.timedelta(hours=47 - h)
+                rows.append(
+                    {
+                        "datetime": date.strftime(DATE_FORMAT),
+                        "volume": int(values["volume"][h]),
+                        "min_price": float(values["min_price"][h]),
+                        "max_price": float(values["max_price"][h]),
+                        "avg_price": float(values["avg_price"][h]),
+                        "wa_price": float(values["wa_price"][h]),
+                        "median": float(values["median"][h]),
+                        "moving_avg": None,
+                        "order_type": order_type,
+                        "id": "%012x%012x" % (index + 1, 100000 + len(rows)),
+                    }
+                )
+        return rows
+
+    def stats_payload(self, url_name: str) -> Dict:
+        """The json payload of the statistics endpoint for `url_name`."""
+        index = self.index(url_name)
+        return {
+            "payload": {
+                "statistics_closed": {"90days": self.closed_payload(index)},
+                "statistics_live": {"48hours": self.live_payload(index)},
+            }
+        }
+
+    def orders_payload(self, url_name: str) -> Dict:
+        """The json payload of the orders endpoint for `url_name`."""
+        index = self.index(url_name)
+        rng = np.random.default_rng([self.seed, index, 10])
+        price = self._base_price(index)
+        ranks = [0, 10] if self._kind(index) == "mod" else [None]
+        orders = []
+        for n in range(int(rng.integers(5, 40))):
+            order_type = "buy" if rng.random() < 0.4 else "sell"
+            offset = rng.exponential(0.1 * price) + 1
+            row = {
+                "id": "%012x%012x" % (index + 1, 200000 + n),
+                "platinum": float(
+                    max(
+                        1,
+                        round(
+                            price - offset if order_type == "buy" else price + offset
+                        ),
+                    )
+                ),
+                "quantity": int(rng.integers(1, 6)),
+                "order_type": order_type,
+                "platform": "pc",
+                "region": "en",
+                "visible": True,
+                "user": {
+                    "ingame_name": "synth_user%d" % int(rng.integers(1000)),
+                    "status": ["ingame", "online", "offline"][int(rng.integers(3))],
+                },
+            }
+            rank = ranks[int(rng.integers(len(ranks)))]
+            if rank is not None:
+                row["mod_rank"] = rank
+            orders.append(row)
+        return {"payload": {"orders": orders}}
+
+    def closed_stats(self, index: int) -> List[Stats]:
+        """The closed `Stats` objects of the item at `index`."""
+        rows = self.closed_payload(index)
+        return [Stats(**dict({"mod_rank": None}, **row)) for row in rows]
+
+    def live_stats(self, index: int) -> List[LiveStats]:
+        """The `LiveStats` objects of the item at `index`."""
+        rows = self.live_payload(index)
+        return [LiveStats(**dict({"mod_rank": None}, **row)) for row in rows]
+
+    def stat(self, index: int) -> Stat:
+        """The `Stat` object of the item at `index`, built with `to_stats`."""
+        return to_stats(
+            self.closed_stats(index), self.live_stats(index), self.item_name(index)
+        )
+
+    def item_stats(self, indices: Optional[Iterable[int]] = None) -> ItemStats:
+        """The `ItemStats` of the items at `indices`, every item by default."""
+        if indices is None:
+            indices = range(self.num_items)
+        indices = list(indices)
+        return ItemStats(
+            [self.short_item(i) for i in indices], [self.stat(i) for i in indices]
+        )
+
+    def vault_csv(self, path: str) -> str:
+        """Write a prime vault csv (as on the wiki) for the prime items.
+
+        Args:
+            path: The location to write the csv file to.
+
+        Returns:
+            The `path` written to.
+        """
+        lines = ['"Item Name","Item Type","Vault Date","Last Unvaulting"']
+        first_day = self.end - datetime.timedelta(days=self.num_days + 30)
+        for index in range(self.num_items):
+            if self._kind(index) != "prime":
+                continue
+            unvaulted = first_day - datetime.timedelta(days=index % 400)
+            vaulted = unvaulted - datetime.timedelta(days=200 + index % 300)
+            lines.append(
+                '"Synth%06d Prime","%s","%s","%s"'
+                % (
+                    index,
+                    ITEM_TYPES[index % len(ITEM_TYPES)],
+                    vaulted.strftime("%Y-%m-%d"),
+                    unvaulted.strftime("%Y-%m-%d"),
+                )
+            )
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
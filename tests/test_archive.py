@@ -0,0 +1,90 @@
+"""Tests archive module inside utils package."""
+import os
+
+from warframe_metrics.main import main
+from warframe_metrics.utils.archive import SnapshotArchive
+from warframe_metrics.utils.collect_data import to_class
+from warframe_metrics.utils.collect_data import to_stats
+from warframe_metrics.utils.datetime_utils import DAY_MS
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.schema import LiveStats
+from warframe_metrics.utils.schema import Stats
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def snapshot(catalogue: SyntheticCatalogue) -> ItemStats:
+    """Build the snapshot of a synthetic catalogue."""
+    stats = []
+    for i in range(catalogue.num_items):
+        closed = to_class(Stats, catalogue.closed_payload(i))
+        live = to_class(LiveStats, catalogue.live_payload(i))
+        stats.append(to_stats(closed, live, catalogue.item_name(i)))
+    return ItemStats(catalogue.short_items(), stats)
+
+
+def next_day(item_stats: ItemStats) -> ItemStats:
+    """The snapshot of the following day, dropping the oldest row."""
+    item_stats = from_json(ItemStats, to_json(item_stats))
+    for _, stat in item_stats:
+        for column in ["timestamps", "volumes", "avg_prices", "mod_ranks"]:
+            values = getattr(stat, column)
+            if len(values) == 0:
+                continue
+            values.pop(0)
+            if column == "timestamps":
+                values.append(values[-1] + DAY_MS)
+            else:
+                values.append(values[-1])
+        for column in ["medians", "min_prices", "max_prices", "open_prices"]:
+            getattr(stat, column).pop(0)
+            getattr(stat, column).append(1.0)
+        for column in ["closed_prices", "wa_prices", "moving_avgs"]:
+            getattr(stat, column).pop(0)
+            getattr(stat, column).append(2.0)
+        for column in ["donch_tops", "donch_bots"]:
+            getattr(stat, column).pop(0)
+            getattr(stat, column).append(3.0)
+    return item_stats
+
+
+def objects(directory: str) -> int:
+    """The number of objects stored in an archive."""
+    return sum(
+        len(files) for _, _, files in os.walk(os.path.join(directory, "objects"))
+    )
+
+
+def test_archive_round_trip_and_dedup(tmp_path: str) -> None:
+    """Test snapshots are reconstructed exactly and history stored once."""
+    directory = os.path.join(str(tmp_path), "archive")
+    archive = SnapshotArchive(directory)
+    first = snapshot(SyntheticCatalogue(6, 60))
+    second = next_day(first)
+    archive.add("day1", first)
+    after_first = objects(directory)
+    archive.add("day2", second)
+    added = objects(directory) - after_first
+    assert archive.names() == ["day1", "day2"]
+    assert to_json(archive.load("day1")) == to_json(first)
+    assert to_json(archive.load("day2")) == to_json(second)
+    # a header and at most the first and last chunk change per item
+    assert added <= 3 * len(first.items)
+    assert added < after_first / 2
+    archive.remove("day1")
+    assert archive.collect_garbage() > 0
+    assert to_json(archive.load("day2")) == to_json(second)
+
+
+def test_archive_commands(tmp_path: str) -> None:
+    """Test the archive and restore commands."""
+    path = os.path.join(str(tmp_path), "2021-06-01.json")
+    restored = os.path.join(str(tmp_path), "restored.json")
+    directory = os.path.join(str(tmp_path), "archive")
+    with open(path, "w") as f:
+        f.write(to_json(snapshot(SyntheticCatalogue(3, 10))))
+    assert main(["archive", directory, path]) == 0
+    assert main(["restore", directory, "2021-06-01", "-o", restored]) == 0
+    with open(path) as f, open(restored) as g:
+        assert f.read() == g.read()
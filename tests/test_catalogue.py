@@ -0,0 +1,69 @@
+"""Tests catalogue module inside utils package."""
+import os
+
+import pytest
+
+from warframe_metrics.main import main
+from warframe_metrics.utils.catalogue import CatalogueCache
+from warframe_metrics.utils.collect_data import market_data
+from warframe_metrics.utils.fetch import AdaptiveThrottle
+from warframe_metrics.utils.fetch import Fetcher
+from warframe_metrics.utils.fetch import MarketAPIError
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.schema import ShortItem
+from warframe_metrics.utils.schema import Stat
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def _fetcher() -> Fetcher:
+    """A fetcher giving up quickly."""
+    return Fetcher(AdaptiveThrottle(rate=1000.0), max_retries=0, timeout=1)
+
+
+def test_catalogue_cache(tmpdir: str) -> None:
+    """Test fresh catalogues are not requested and stale ones are reused."""
+    now = [1000.0]
+    cache = CatalogueCache(str(tmpdir), ttl=60, clock=lambda: now[0])
+    catalogue = SyntheticCatalogue(8, 2)
+    with LocalMarketServer(catalogue) as server:
+        items, index = cache.get(server.url)
+        assert items == catalogue.short_items()
+        assert index["url_name"][catalogue.url_name(3)] == [3]
+        assert cache.get(server.url)[0] is items
+        assert server.counts["requests"] == 1
+        now[0] += 61
+        assert cache.get(server.url)[0] is items
+        assert server.counts["requests"] == 2
+        assert cache.get(server.url, refresh=True)[1] is index
+        other = CatalogueCache(str(tmpdir), ttl=60, clock=lambda: now[0])
+        assert other.get(server.url)[0] == items
+        assert server.counts["requests"] == 3
+        url = server.url
+    twin = ShortItem("", "twin", items[0].item_name, "twin")
+    with pytest.warns(UserWarning):
+        item_stats = ItemStats([twin, items[0]], [Stat("twin"), Stat("first")])
+    assert items[0].item_name + "2" in item_stats.name_items
+    assert items == catalogue.short_items()
+    now[0] += 61
+    assert other.get(url, _fetcher())[0] == items
+    cache.clear()
+    assert os.listdir(str(tmpdir)) == []
+    with pytest.raises(MarketAPIError):
+        cache.get(url, _fetcher())
+
+
+def test_collect_with_catalogue_cache(tmpdir: str) -> None:
+    """Test collections load the catalogue from the cache."""
+    directory = str(tmpdir)
+    catalogue = SyntheticCatalogue(6, 3)
+    cache = CatalogueCache(directory)
+    with LocalMarketServer(catalogue) as server:
+        market_data(timeout=0, api_url=server.url, catalogue=cache)
+        data = market_data(timeout=0, api_url=server.url, catalogue=cache)
+        assert server.counts["requests"] == 1 + 6 + 6
+        args = ["--api-url", server.url, "--catalogue-cache", directory]
+        output = os.path.join(directory, "snapshot.json")
+        assert main(["collect", "--timeout", "0", "-o", output] + args) == 0
+        assert server.counts["requests"] == 1 + 6 + 6 + 6
+    assert len(data.items) == 6
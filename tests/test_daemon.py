@@ -0,0 +1,110 @@
+"""Tests daemon module inside utils package."""
+import os
+
+from warframe_metrics.utils.activity import item_activity
+from warframe_metrics.utils.daemon import CollectorDaemon
+from warframe_metrics.utils.daemon import RefreshScheduler
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.schema import LiveRing
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+class FakeClock(object):
+    """A clock advanced by sleeping."""
+
+    def __init__(self) -> None:
+        """Create a FakeClock object."""
+        self.now = 1000.0
+
+    def time(self) -> float:
+        """The current time."""
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Advance the clock."""
+        self.now += seconds
+
+
+def test_scheduler_order() -> None:
+    """Test items come out in due order and rescheduling replaces entries."""
+    scheduler = RefreshScheduler()
+    scheduler.schedule("a", 5.0)
+    scheduler.schedule("b", 1.0)
+    scheduler.schedule("a", 0.5)
+    assert len(scheduler) == 2
+    assert scheduler.next_due() == 0.5
+    assert scheduler.pop_due(2.0) == "a"
+    assert scheduler.pop_due(2.0) == "b"
+    assert scheduler.pop_due(2.0) is None
+    assert scheduler.next_due() is None
+
+
+def test_hot_items_refresh_more_often(tmp_path: str) -> None:
+    """Test active items are refreshed more often than quiet ones."""
+    catalogue = SyntheticCatalogue(14, 20)
+    clock = FakeClock()
+    snapshot = os.path.join(str(tmp_path), "snap.json")
+    with LocalMarketServer(catalogue) as server:
+        daemon = CollectorDaemon(
+            snapshot,
+            requests_per_second=10.0,
+            scheduler=RefreshScheduler(min_interval=60, max_interval=3600),
+            compact_every=20,
+            api_url=server.url,
+            clock=clock.time,
+            sleep=clock.sleep,
+        )
+        daemon.run(max_steps=40)
+    assert daemon.fetcher.throttle.max_rate == 10.0
+    hot = daemon.refreshes[catalogue.short_item(0).id]
+    cold = daemon.refreshes[catalogue.short_item(6).id]
+    volume_hot = item_activity(daemon.item_stats.get_stats(catalogue.short_item(0).id))
+    volume_cold = item_activity(daemon.item_stats.get_stats(catalogue.short_item(6).id))
+    assert volume_hot[0] > volume_cold[0]
+    assert hot > cold
+    assert len(daemon.refreshes) == 14
+    assert not os.path.exists(snapshot + ".journal")
+    with open(snapshot) as f:
+        assert len(from_json(ItemStats, f.read()).items) == 14
+
+
+def test_journal_replay(tmp_path: str) -> None:
+    """Test a restarted daemon replays refreshes that were not compacted."""
+    catalogue = SyntheticCatalogue(4, 5)
+    snapshot = os.path.join(str(tmp_path), "snap.json")
+    clock = FakeClock()
+    with LocalMarketServer(catalogue) as server:
+        kwargs = dict(api_url=server.url, clock=clock.time, sleep=clock.sleep)
+        daemon = CollectorDaemon(snapshot, **kwargs)
+        daemon.load()
+        for _ in range(3):
+            assert daemon.step() is not None
+        assert os.path.exists(snapshot + ".journal")
+        assert not os.path.exists(snapshot)
+        restarted = CollectorDaemon(snapshot, **kwargs)
+        restarted.load()
+    assert len(restarted.item_stats.item_stats) == 3
+    assert len(restarted.scheduler) == 4
+
+
+def test_live_capacity(tmp_path: str) -> None:
+    """Test the daemon keeps live rows in buffers across refreshes."""
+    catalogue = SyntheticCatalogue(1, 5)
+    snapshot = os.path.join(str(tmp_path), "snap.json")
+    clock = FakeClock()
+    with LocalMarketServer(catalogue) as server:
+        kwargs = dict(api_url=server.url, clock=clock.time, sleep=clock.sleep)
+        daemon = CollectorDaemon(snapshot, live_capacity=72, **kwargs)
+        daemon.load()
+        id = daemon.step()
+        daemon.scheduler.schedule(id, clock.time())
+        assert daemon.step() == id
+        daemon.persist()
+        restarted = CollectorDaemon(snapshot, live_capacity=72, **kwargs)
+        restarted.load()
+    live = restarted.item_stats.get_stats(id).live_stat_buy
+    assert isinstance(live, LiveRing)
+    assert live.capacity == 72
+    assert len(live) == 48
@@ -0,0 +1,169 @@
+"""Tests fetch module inside utils package."""
+import pickle  # noqa: S403
+import random
+import threading
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+
+from warframe_metrics.utils import metrics
+from warframe_metrics.utils.collect_data import market_data
+from warframe_metrics.utils.constants import ITEMS_URL
+from warframe_metrics.utils.fetch import AdaptiveThrottle
+from warframe_metrics.utils.fetch import Fetcher
+from warframe_metrics.utils.fetch import MarketAPIError
+from warframe_metrics.utils.fetch import parse_retry_after
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def _fetcher(sleeps: List[float], **kwargs: float) -> Fetcher:
+    """A fetcher recording its sleeps instead of sleeping, on a fake clock."""
+    now = [0.0]
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    throttle = AdaptiveThrottle(rate=1000.0, clock=lambda: now[0], sleep=sleep)
+    rng = random.Random(0)  # noqa: S311
+    return Fetcher(throttle, sleep=sleep, rng=rng, clock=lambda: now[0], **kwargs)
+
+
+def test_retries_and_retry_after(requests_mock: Mock) -> None:
+    """Test 429s and 5xxs are retried, honoring Retry-After."""
+    requests_mock.get(
+        ITEMS_URL,
+        [
+            {"status_code": 429, "headers": {"Retry-After": "7"}},
+            {"status_code": 503},
+            {"status_code": 200, "text": "not json"},
+            {"status_code": 200, "json": {"items": "test"}},
+        ],
+    )
+    sleeps = []
+    fetcher = _fetcher(sleeps)
+    sink = metrics.InMemorySink()
+    previous = metrics.set_sink(sink)
+    try:
+        assert fetcher.get(ITEMS_URL) == {"items": "test"}
+    finally:
+        metrics.set_sink(previous)
+    assert requests_mock.call_count == 4
+    assert sleeps[0] == 7.0 and all(s < 7.0 for s in sleeps[1:])
+    assert sink.counter("fetch_retries_total") == 3
+    assert sink.counter("fetch_requests_total", {"status": "429"}) == 1
+    assert fetcher.throttle.rate < 1000.0
+
+
+def test_fatal_and_exhausted(requests_mock: Mock) -> None:
+    """Test 4xx responses fail at once and retries are bounded."""
+    requests_mock.get(ITEMS_URL, status_code=404)
+    with pytest.raises(MarketAPIError) as err:
+        _fetcher([]).get(ITEMS_URL)
+    assert err.value.status == 404
+    assert requests_mock.call_count == 1
+    requests_mock.get(ITEMS_URL, status_code=502)
+    sleeps = []
+    with pytest.raises(MarketAPIError) as err:
+        _fetcher(sleeps, max_retries=3, backoff=1.0).get(ITEMS_URL)
+    assert err.value.status == 502
+    assert requests_mock.call_count == 1 + 4
+    assert len(sleeps) == 3 and all(0 <= s <= 2**i for i, s in enumerate(sleeps))
+    error = pickle.loads(pickle.dumps(err.value))  # noqa: S301
+    assert (error.url, error.status) == (ITEMS_URL, 502)
+    assert str(error) == str(err.value) == "giving up after 3 retries"
+
+
+def test_throttle_adapts() -> None:
+    """Test the rate falls on failures, recovers on successes and is spaced."""
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    throttle = AdaptiveThrottle(
+        rate=4.0, min_rate=1.0, max_rate=4.0, increase=0.5, clock=lambda: now[0]
+    )
+    throttle.sleep = sleep
+    throttle.acquire()
+    throttle.acquire()
+    assert sleeps == [0.25]
+    throttle.on_failure(retry_after=5.0)
+    throttle.on_failure()
+    assert throttle.rate == 1.0
+    throttle.acquire()
+    assert now[0] == pytest.approx(5.25)
+    for _ in range(10):
+        throttle.on_success()
+    assert throttle.rate == 4.0
+
+
+def test_parse_retry_after() -> None:
+    """Test Retry-After in seconds and as an http date."""
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) == 0.0
+    assert parse_retry_after("soon") == 0.0
+    date = "Wed, 21 Oct 2015 07:28:10 GMT"
+    assert parse_retry_after(date, now=1445412480.0) == 10.0
+
+
+def test_collect_through_rate_limit() -> None:
+    """Test a collection finishes against a rate limited and failing server."""
+    catalogue = SyntheticCatalogue(8, 5)
+    fetcher = Fetcher(AdaptiveThrottle(rate=50.0), backoff=0.01)
+    with LocalMarketServer(
+        catalogue, rate_limit=40.0, burst=2, error_rate=0.1, seed=3
+    ) as server:
+        data = market_data(timeout=0, api_url=server.url, fetcher=fetcher)
+        assert server.counts["ok"] == 1 + 8
+        assert server.counts["rate_limited"] + server.counts["errors"] > 0
+    assert len(data.items) == 8
+
+
+def test_coalesce_and_cache() -> None:
+    """Test identical requests in flight are sent once and then cached."""
+    now = [0.0]
+    with LocalMarketServer(SyntheticCatalogue(3, 5), latency=0.2) as server:
+        fetcher = Fetcher(
+            AdaptiveThrottle(rate=1000.0), cache_ttl=10.0, clock=lambda: now[0]
+        )
+        url = server.url + "/items"
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(fetcher.get(url)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert server.counts["requests"] == 1
+        assert len(results) == 5 and all(r is results[0] for r in results)
+        assert fetcher.get(url) is results[0]
+        assert fetcher.get(url, headers={"Platform": "ps4"}) is not results[0]
+        assert server.counts["requests"] == 2
+        now[0] = 11.0
+        assert fetcher.get(url) == results[0]
+        assert server.counts["requests"] == 3
+        now[0] = 22.0
+        fetcher.get(url, headers={"Platform": "xbox"})
+        assert len(fetcher._cache) == 1
+        errors = []
+
+        def get_missing() -> None:
+            try:
+                fetcher.get(server.url + "/items/unknown/statistics")
+            except MarketAPIError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=get_missing) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 3 and all(e.status == 404 for e in errors)
+        assert len({id(e) for e in errors}) == 3
@@ -0,0 +1,56 @@
+"""Tests filters module inside utils package."""
+import re
+
+from warframe_metrics.main import _parse_filters
+from warframe_metrics.market.prime import collect_prime_data
+from warframe_metrics.utils.collect_data import market_data
+from warframe_metrics.utils.filters import compile_filters
+from warframe_metrics.utils.filters import index_items
+from warframe_metrics.utils.filters import PRIME_FILTERS
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_compiled_filters() -> None:
+    """Test values, sets, regular expressions, callables and indexes."""
+    catalogue = SyntheticCatalogue(30, 1)
+    items = catalogue.short_items()
+    names = {catalogue.item_name(3), catalogue.item_name(7), "missing"}
+    by_name = compile_filters({"item_name": names})
+    assert [i.item_name for i in by_name.select(items)] == [
+        catalogue.item_name(3),
+        catalogue.item_name(7),
+    ]
+    index = index_items(items)
+    assert by_name.select(items, index) == by_name.select(items)
+    primes = compile_filters(PRIME_FILTERS).select(items)
+    assert primes == [i for i in items if "prime" in i.item_name.lower()]
+    barrels = compile_filters(
+        {"item_name": re.compile("Barrel$"), "thumb": lambda t: t.endswith(".png")}
+    ).select(items)
+    assert barrels and all(i.item_name.endswith("Barrel") for i in barrels)
+    assert compile_filters(lambda i: i.id == items[4].id).select(items) == [items[4]]
+    assert compile_filters({"url_name": catalogue.url_name(2)})(items[2])
+    assert compile_filters(None).select(items) == items
+    assert len(compile_filters().select(items, shard=(0, 2))) < len(items)
+
+
+def test_only_matching_items_are_fetched() -> None:
+    """Test statistics are only requested for matching items."""
+    catalogue = SyntheticCatalogue(12, 5)
+    with LocalMarketServer(catalogue) as server:
+        primes = collect_prime_data(timeout=0, api_url=server.url)
+        assert server.counts["requests"] == 1 + len(primes.items)
+        names = ["item_name=" + catalogue.item_name(i) for i in (0, 1)]
+        data = market_data(
+            filters=_parse_filters(names, prime=True), timeout=0, api_url=server.url
+        )
+        barrels = market_data(
+            filters=_parse_filters(["item_name~Barrel$"], prime=True),
+            timeout=0,
+            api_url=server.url,
+        )
+    assert len(primes.items) > 0
+    assert all("Prime" in i.item_name for i in primes.items.values())
+    assert [i.item_name for i in data.items.values()] == [catalogue.item_name(0)]
+    assert [i.item_name for i in barrels.items.values()] == [catalogue.item_name(5)]
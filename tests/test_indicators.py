@@ -0,0 +1,112 @@
+"""Tests indicators module inside analysis package."""
+import numpy as np
+
+from warframe_metrics.analysis.indicators import bollinger_bands
+from warframe_metrics.analysis.indicators import ema
+from warframe_metrics.analysis.indicators import IndicatorEngine
+from warframe_metrics.analysis.indicators import rsi
+from warframe_metrics.analysis.indicators import stat_matrix
+from warframe_metrics.analysis.indicators import vwap
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.schema import ShortItem
+from warframe_metrics.utils.schema import Stat
+
+
+def make_stat(name: str, days: int, start: int = 1) -> Stat:
+    """Create a stat object with one row per day."""
+    stat = Stat(name)
+    for d in range(start, start + days):
+        stat.add_stat(
+            str_date="2021-05-%02dT00:00:00.000+00:00" % d,
+            volume=d,
+            min_price=1,
+            max_price=20,
+            open_price=5,
+            closed_price=7,
+            wa_price=10 + (d % 3),
+            avg_price=10,
+            moving_avg=None,
+            donch_top=20,
+            donch_bot=1,
+            median=10,
+        )
+    return stat
+
+
+def test_ema() -> None:
+    """Test exponential moving average with missing values."""
+    values = np.array([[1.0, np.nan, 3.0]])
+    out, state = ema(values, span=3)
+    assert np.allclose(out, [[1.0, 1.0, 2.0]])
+    assert np.allclose(state, [2.0])
+
+
+def test_rsi_bounds() -> None:
+    """Test rsi of strictly rising prices."""
+    values = np.arange(1.0, 20.0).reshape(1, -1)
+    out, _ = rsi(values, period=5)
+    assert np.isnan(out[0, :5]).all()
+    assert np.allclose(out[0, 5:], 100.0)
+
+
+def test_bollinger_and_vwap() -> None:
+    """Test bollinger bands and vwap against direct computation."""
+    prices = np.array([[1.0, 2.0, 3.0, 4.0]])
+    volumes = np.array([[1.0, 1.0, 2.0, 0.0]])
+    mid, upper, lower = bollinger_bands(prices, window=2, num_std=1.0)
+    assert np.isnan(mid[0, 0])
+    assert np.allclose(mid[0, 1:], [1.5, 2.5, 3.5])
+    assert np.allclose(upper[0, 1:] - mid[0, 1:], 0.5)
+    assert np.allclose(mid[0, 1:] - lower[0, 1:], 0.5)
+    out = vwap(prices, volumes, window=2)
+    assert np.allclose(out[0], [1.0, 1.5, 8.0 / 3.0, 3.0])
+
+
+def test_incremental_matches_full() -> None:
+    """Test incremental updates give the same values as a full computation."""
+    rng = np.random.default_rng(0)
+    prices = rng.uniform(5, 15, size=(4, 60))
+    prices[1, 10:14] = np.nan
+    volumes = rng.integers(0, 10, size=(4, 60)).astype(float)
+    full = IndicatorEngine().compute(prices, volumes)
+    engine = IndicatorEngine()
+    first = engine.compute(prices[:, :25], volumes[:, :25])
+    second = engine.update(prices[:, 25:], volumes[:, 25:])
+    for key in full:
+        combined = np.concatenate([first[key], second[key]], axis=1)
+        np.testing.assert_allclose(combined, full[key], equal_nan=True)
+
+
+def test_stat_matrix_fills_missing_days() -> None:
+    """Test missing days are NaN columns, so windows span calendar days."""
+    stat = make_stat("a", 10)
+    for values in vars(stat).values():
+        if isinstance(values, list) and len(values) == 10:
+            del values[4:7]
+    matrix = stat_matrix(ItemStats([ShortItem("t", "id1", "a", "a")], [stat]))
+    assert np.array_equal(np.diff(matrix.days), np.ones(9))
+    prices = matrix.values["wa_prices"]
+    assert np.isnan(prices[0, 4:7]).all() and not np.isnan(prices[0, 7:]).any()
+    mid = bollinger_bands(prices, window=3)[0]
+    assert np.isnan(mid[0, 4:9]).all() and not np.isnan(mid[0, 9])
+
+
+def test_item_stats_update() -> None:
+    """Test indicators over `ItemStats` with appended days and new items."""
+    items = [ShortItem("t", "id1", "a", "a"), ShortItem("t", "id2", "b", "b")]
+    old = ItemStats(items, [make_stat("a", 20), make_stat("b", 16, start=5)])
+    matrix = stat_matrix(old)
+    assert matrix.values["wa_prices"].shape == (2, 20)
+    assert np.isnan(matrix.values["wa_prices"][1, :4]).all()
+    engine = IndicatorEngine()
+    engine.compute_item_stats(old)
+    new_items = items + [ShortItem("t", "id3", "c", "c")]
+    new = ItemStats(
+        new_items, [make_stat("a", 25), make_stat("b", 21, start=5), make_stat("c", 3)]
+    )
+    new_matrix, result = engine.update_item_stats(new)
+    assert len(new_matrix.days) == 5
+    assert engine.ids == ["id1", "id2", "id3"]
+    full = IndicatorEngine().compute_item_stats(new)[1]
+    for key in result:
+        np.testing.assert_allclose(result[key][:2], full[key][:2, -5:], equal_nan=True)
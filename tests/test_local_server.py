@@ -0,0 +1,79 @@
+"""Tests local_server module inside utils package."""
+import os
+
+import requests
+
+from warframe_metrics.main import main
+from warframe_metrics.market.prime import collect_prime_data
+from warframe_metrics.utils.collect_data import collect_platforms
+from warframe_metrics.utils.collect_data import market_data
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.local_server import RecordedCatalogue
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_collect_from_local_server() -> None:
+    """Test the collectors against the local server."""
+    catalogue = SyntheticCatalogue(12, 10)
+    with LocalMarketServer(catalogue) as server:
+        data = market_data(timeout=0, api_url=server.url)
+        primes = collect_prime_data(timeout=0, api_url=server.url)
+        assert server.counts["ok"] == 2 + 12 + len(primes.items)
+    assert len(data.items) == 12
+    assert all("Prime" in i.item_name for i in primes.items.values())
+    assert len(primes.items) > 0
+
+
+def test_rate_limit_and_errors() -> None:
+    """Test the server answers with 429 and injected errors."""
+    with LocalMarketServer(SyntheticCatalogue(2, 5), rate_limit=0.5) as server:
+        first = requests.get(server.url + "/items", timeout=5)
+        second = requests.get(server.url + "/items", timeout=5)
+        missing = requests.get(server.url + "/items/unknown/statistics", timeout=5)
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) >= 1
+    assert missing.status_code == 429
+    with LocalMarketServer(SyntheticCatalogue(2, 5), error_rate=1.0) as server:
+        assert requests.get(server.url + "/items", timeout=5).status_code == 503
+        assert server.counts["errors"] == 1
+
+
+def test_recorded_catalogue(tmp_path: str) -> None:
+    """Test serving recorded responses saved to disk."""
+    catalogue = SyntheticCatalogue(3, 5)
+    recorded = RecordedCatalogue(
+        catalogue.items_payload(),
+        {n: catalogue.stats_payload(n) for n in catalogue.url_names()},
+    )
+    recorded.save(str(tmp_path))
+    loaded = RecordedCatalogue.load(str(tmp_path))
+    with LocalMarketServer(loaded) as server:
+        name = catalogue.url_names()[1]
+        resp = requests.get(server.url + "/items/%s/statistics" % name, timeout=5)
+        assert resp.json() == catalogue.stats_payload(name)
+        assert (
+            requests.get(server.url + "/items/nope/statistics", timeout=5).status_code
+            == 404
+        )
+
+
+def test_collect_platforms(tmp_path: str) -> None:
+    """Test collecting several platforms concurrently."""
+    catalogue = SyntheticCatalogue(6, 5)
+    output = os.path.join(str(tmp_path), "snap.json")
+    with LocalMarketServer(catalogue) as server:
+        ps4 = market_data(timeout=0, api_url=server.url, platform="ps4")
+        assert server.platforms == {"ps4": 1 + 6}
+        results = collect_platforms(["pc", "xbox", "switch"], api_url=server.url)
+        assert server.platforms["xbox"] == 1 + 6
+        args = ["--platform", "pc", "--platform", "ps4", "--api-url", server.url]
+        assert main(["collect", "--prime", "-o", output] + args) == 0
+    assert sorted(results) == ["pc", "switch", "xbox"]
+    assert sorted(results["xbox"].items) == sorted(ps4.items)
+    for platform in ["pc", "ps4"]:
+        with open(os.path.join(str(tmp_path), "snap.%s.json" % platform)) as f:
+            primes = from_json(ItemStats, f.read())
+        assert all("Prime" in i.item_name for i in primes.items.values())
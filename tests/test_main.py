@@ -0,0 +1,83 @@
+"""Tests the command-line interface."""
+import os
+import subprocess  # noqa: S404
+import sys
+
+import pytest
+from pytest import CaptureFixture
+
+from warframe_metrics.main import main
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def read(path: str) -> ItemStats:
+    """Read a snapshot."""
+    with open(path) as f:
+        return from_json(ItemStats, f.read())
+
+
+def test_collect_refresh_merge_export(tmp_path: str) -> None:
+    """Test the collection, merging and export commands."""
+    snapshot = os.path.join(str(tmp_path), "snap.json")
+    merged = os.path.join(str(tmp_path), "merged.json")
+    exported = os.path.join(str(tmp_path), "snap.csv")
+    with LocalMarketServer(SyntheticCatalogue(8, 5)) as server:
+        args = ["--api-url", server.url, "--timeout", "0"]
+        assert main(["collect", "--prime", "-o", snapshot] + args) == 0
+        primes = read(snapshot)
+        name = SyntheticCatalogue(8, 5).item_name(1)
+        filters = ["--filter", "item_name=" + name]
+        assert main(["refresh", snapshot] + filters + args) == 0
+    refreshed = read(snapshot)
+    assert len(refreshed.items) == len(primes.items) + 1
+    assert name in refreshed.name_items
+    assert main(["merge", snapshot, snapshot, "-o", merged]) == 0
+    assert len(read(merged).items) == len(refreshed.items)
+    assert main(["export", merged, "-o", exported, "--columns", "volumes"]) == 0
+    with open(exported) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "id,item_name,date,mod_rank,volumes"
+    assert len(lines) == 1 + 5 * len(refreshed.items)
+
+
+def test_rank(tmp_path: str, capsys: CaptureFixture) -> None:
+    """Test ranking with and without collected data."""
+    catalogue = SyntheticCatalogue(30, 90)
+    vault_csv = catalogue.vault_csv(os.path.join(str(tmp_path), "vault.csv"))
+    assert main(["rank", vault_csv, "Warframe", "--quick"]) == 0
+    quick = capsys.readouterr().out.splitlines()
+    assert len(quick) > 0
+    assert main(["rank", vault_csv, "Warframe"]) == 2
+    snapshot = os.path.join(str(tmp_path), "snap.json")
+    with LocalMarketServer(catalogue) as server:
+        main(["collect", "--prime", "-o", snapshot, "--api-url", server.url])
+    capsys.readouterr()
+    assert main(["rank", vault_csv, "Warframe", "--data", snapshot]) == 0
+    ranked = capsys.readouterr().out.splitlines()
+    assert len(ranked) >= len(quick)
+
+
+def test_invalid_filter(capsys: CaptureFixture) -> None:
+    """Test invalid filters are usage errors rather than tracebacks."""
+    for value in ["item_name", "item_name~("]:
+        for command in (["collect"], ["orders"], ["daemon", "snap.json"]):
+            with pytest.raises(SystemExit) as err:
+                main(command + ["--filter", value])
+            assert err.value.code == 2
+            assert "usage:" in capsys.readouterr().err
+
+
+def test_lazy_imports() -> None:
+    """Test the command-line interface does not import heavy modules upfront."""
+    code = (
+        "import sys, warframe_metrics.main, warframe_metrics.market.prime;"
+        "print(' '.join(m for m in ['pandas', 'requests', 'desert', 'alive_progress']"
+        " if m in sys.modules))"
+    )
+    out = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
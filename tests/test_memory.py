@@ -0,0 +1,59 @@
+"""Tests memory module inside utils package."""
+import os
+
+from warframe_metrics.utils.collect_data import market_data
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.memory import deep_sizeof
+from warframe_metrics.utils.memory import memory_report
+from warframe_metrics.utils.memory import MemoryBudget
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_memory_report() -> None:
+    """Test the report breaks the deep size down per item and column."""
+    item_stats = SyntheticCatalogue(6, 30).item_stats()
+    report = memory_report(item_stats)
+    assert report.total == sum(report.items.values()) == sum(report.columns.values())
+    assert set(report.items) == set(item_stats.items)
+    assert report.columns["timestamps"] > report.columns["item_name"]
+    assert report.columns["live_stat_buy"] > 0
+    assert report.top(2)[0][1] == max(report.items.values())
+    assert deep_sizeof([1.5, 2.5]) > deep_sizeof([])
+    shared = [1.5]
+    seen = set()
+    assert deep_sizeof([shared], seen) > deep_sizeof([shared], seen)
+
+
+def test_memory_budget(tmpdir: str) -> None:
+    """Test the coldest items are spilled and read back transparently."""
+    directory = str(tmpdir)
+    item_stats = SyntheticCatalogue(8, 30).item_stats()
+    expected = to_json(item_stats)
+    total = memory_report(item_stats).total
+    budget = MemoryBudget(total // 2, directory)
+    spilled = budget.enforce(item_stats)
+    assert spilled and len(item_stats.spilled) == len(spilled)
+    assert budget.used <= budget.low_water * budget.limit
+    assert memory_report(item_stats).spilled == len(spilled)
+    assert sorted(os.listdir(directory)) == sorted(i + ".json" for i in spilled)
+    assert to_json(item_stats) == expected
+    stat = item_stats.get_stats(spilled[0])
+    assert spilled[0] in item_stats.item_stats and stat.dates
+    assert len(os.listdir(directory)) == len(spilled) - 1
+    control = SyntheticCatalogue(8, 30).item_stats()
+    control.merge(SyntheticCatalogue(8, 30).item_stats())
+    item_stats.merge(SyntheticCatalogue(8, 30).item_stats(), memory_budget=budget)
+    assert budget.used <= budget.limit
+    assert to_json(item_stats) == to_json(control)
+
+
+def test_collect_with_budget(tmpdir: str) -> None:
+    """Test collections spill items once over their budget."""
+    catalogue = SyntheticCatalogue(10, 20)
+    with LocalMarketServer(catalogue) as server:
+        full = market_data(timeout=0, api_url=server.url)
+        budget = MemoryBudget(memory_report(full).total // 3, str(tmpdir))
+        data = market_data(timeout=0, api_url=server.url, memory_budget=budget)
+    assert data.spilled
+    assert to_json(data) == to_json(full)
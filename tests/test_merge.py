@@ -1,12 +1,25 @@
 """Tests merging of Stat objects."""
+import copy
+import dataclasses
 import datetime
+import threading
 from datetime import timezone
 from typing import Tuple
 
+import pytest
+
 from warframe_metrics.utils.collect_data import to_stats
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.schema import LiveRing
+from warframe_metrics.utils.schema import LiveStat
 from warframe_metrics.utils.schema import LiveStats
+from warframe_metrics.utils.schema import RANK_BITS
+from warframe_metrics.utils.schema import row_keys
 from warframe_metrics.utils.schema import Stat
 from warframe_metrics.utils.schema import Stats
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
 
 
 def compare(stat1: Stat, stat2: Stat) -> bool:
@@ -639,3 +652,173 @@ def test_merge_ranked_difflen() -> None:
     stat_test2.merge(stat)
     assert stat_test2.dates == correct_dates
     assert compare(stat_test2, stat_test)
+
+
+def test_live_ring() -> None:
+    """Test the live ring buffer deduplicates, evicts and spills rows."""
+    start = datetime.datetime(2021, 5, 16, tzinfo=timezone.utc)
+    hours = [start + datetime.timedelta(hours=h) for h in range(6)]
+    history = LiveStat("item", buy=True)
+    ring = LiveRing("item", buy=True, capacity=4, history=history)
+    for h, date in enumerate(hours[:5]):
+        ring.append(date, volumes=h, avg_prices=float(h))
+    ring.append(hours[3], volumes=30, avg_prices=3.5)
+    ring.append(hours[0], volumes=99)
+    assert len(ring) == 4
+    assert ring.dates == hours[1:5]
+    assert ring.volumes == [1, 2, 30, 4]
+    assert ring.mod_ranks == []
+    assert history.dates == [hours[0], hours[0]]
+    assert history.volumes == [0, 99]
+
+
+def test_merge_retains_live() -> None:
+    """Test merging keeps live rows across refreshes once retained."""
+    stat, other = set_stats()
+    old_dates = list(stat.live_stat_sell.dates)
+    new_dates = list(other.live_stat_sell.dates)
+    stat.retain_live(capacity=48, history=True)
+    stat.merge(other, newer=True)
+    assert isinstance(stat.live_stat_sell, LiveRing)
+    assert stat.live_stat_sell.dates == sorted(set(old_dates + new_dates))
+    restored = from_json(Stat, to_json(stat))
+    assert isinstance(restored.live_stat_sell, LiveRing)
+    assert restored.live_stat_sell.dates == stat.live_stat_sell.dates
+    assert restored.live_stat_sell.history.dates == []
+    later = stat.live_stat_sell.dates[-1] + datetime.timedelta(hours=1)
+    stat.add_live_stats(later.isoformat(), 1.0, 3.0, 5, 2.0, 2.0, 2.0, None)
+    assert stat.live_stat_sell.dates[-1] == later
+    assert stat.live_stat_sell.volumes[-1] == 5
+    assert stat.live_stat_sell.moving_avgs[-1] == 0
+
+
+def test_item_stats_diff() -> None:
+    """Test diffing finds added and removed items, new rows and changes."""
+    catalogue = SyntheticCatalogue(5, 10)
+    items = catalogue.short_items()
+    stats = [catalogue.stat(i) for i in range(len(items))]
+    old = ItemStats(items[:4], stats[:4])
+    new_stats = copy.deepcopy(stats)
+    changed = new_stats[1]
+    changed.avg_prices[3] += 1.5
+    changed.moving_avgs[4] = None
+    next_day = changed.dates[-1] + datetime.timedelta(days=1)
+    for attr in changed.__dict__:
+        values = getattr(changed, attr)
+        if isinstance(values, list) and len(values) == 10:
+            values.append(
+                int(next_day.timestamp() * 1000) if attr == "timestamps" else values[-1]
+            )
+    new = ItemStats(items[1:], new_stats[1:])
+    diff = old.diff(new)
+    assert diff.added == [items[4].id]
+    assert diff.removed == [items[0].id]
+    assert diff.new_dates == {items[1].id: [next_day]}
+    assert diff.changed == {
+        items[1].id: {
+            "avg_prices": [
+                (changed.dates[3], stats[1].avg_prices[3], changed.avg_prices[3])
+            ],
+            "moving_avgs": [(changed.dates[4], stats[1].moving_avgs[4], None)],
+        }
+    }
+    assert not old.diff(ItemStats(items[:4], copy.deepcopy(stats[:4])))
+
+
+def test_item_stats_merge_duplicate_name() -> None:
+    """Test merging an item whose name is taken keeps both items reachable."""
+    catalogue = SyntheticCatalogue(3, 10)
+    items = catalogue.short_items()
+    stats = [catalogue.stat(i) for i in range(len(items))]
+    item_stats = ItemStats(items[:2], stats[:2])
+    clash = dataclasses.replace(items[2], item_name=items[0].item_name)
+    with pytest.warns(UserWarning):
+        item_stats.merge(ItemStats([clash], stats[2:]))
+    assert len(item_stats.items) == 3
+    assert item_stats.get_item(items[0].item_name).id == items[0].id
+    assert item_stats.get_item(items[0].item_name + "2").id == items[2].id
+    assert clash.item_name == items[0].item_name
+
+
+def _insert_row(stat: Stat, position: int, source: int) -> None:
+    """Insert a copy of row `source` of the closed statistics at `position`."""
+    length = len(stat.timestamps)
+    for values in vars(stat).values():
+        if isinstance(values, list) and len(values) == length:
+            values.insert(position, values[source])
+
+
+def test_item_stats_diff_duplicate_days() -> None:
+    """Test rows sharing a day are paired in order and extra ones are new."""
+    catalogue = SyntheticCatalogue(1, 10, mod_fraction=0.0)
+    items = catalogue.short_items()
+    stat = catalogue.stat(0)
+    _insert_row(stat, 6, 5)
+    new_stat = copy.deepcopy(stat)
+    new_stat.avg_prices[6] += 1.0
+    _insert_row(new_stat, 7, 5)
+    diff = ItemStats(items, [stat]).diff(ItemStats(items, [new_stat]))
+    assert diff.new_dates == {items[0].id: [stat.dates[5]]}
+    assert diff.changed == {
+        items[0].id: {
+            "avg_prices": [(stat.dates[6], stat.avg_prices[6], new_stat.avg_prices[6])]
+        }
+    }
+
+
+def test_item_stats_diff_rank_rule() -> None:
+    """Test mod ranks only align rows when the older statistics are ranked."""
+    catalogue = SyntheticCatalogue(1, 10, mod_fraction=0.0)
+    items = catalogue.short_items()
+    stat = catalogue.stat(0)
+    ranked = copy.deepcopy(stat)
+    ranked.mod_ranks = [3] * len(ranked.timestamps)
+    assert not ItemStats(items, [stat]).diff(ItemStats(items, [ranked]))
+    merged = copy.deepcopy(stat)
+    merged.merge(ranked)
+    assert merged.timestamps == stat.timestamps
+    diff = ItemStats(items, [ranked]).diff(ItemStats(items, [stat]))
+    assert len(diff.new_dates[items[0].id]) == len(stat.timestamps)
+
+
+def test_row_keys() -> None:
+    """Test the composite keys order rows by day then mod rank."""
+    day = int(datetime.datetime(2021, 5, 16, 21, tzinfo=timezone.utc).timestamp())
+    timestamps = [day * 1000, day * 1000 + 3600 * 1000, (day + 86400) * 1000]
+    keys = row_keys(timestamps, [3, None, 0]).tolist()
+    assert keys[1] < keys[0] < keys[2]
+    assert keys[0] >> RANK_BITS == keys[1] >> RANK_BITS
+    assert row_keys(timestamps, []).tolist() == row_keys(timestamps).tolist()
+    assert row_keys(timestamps).tolist()[0] == keys[1]
+
+
+def test_item_stats_snapshot() -> None:
+    """Test snapshots share unchanged statistics and never see merges."""
+    catalogue = SyntheticCatalogue(6, 20, mod_fraction=0.5)
+    items = catalogue.short_items()
+    stats = [catalogue.stat(i) for i in range(len(items))]
+    item_stats = ItemStats(items[:4], stats[:4])
+    for _, stat in item_stats:
+        stat.retain_live(4)
+    expected = to_json(item_stats)
+    view = item_stats.snapshot()
+    newer = ItemStats(copy.deepcopy(items[2:]), copy.deepcopy(stats[2:]))
+    errors = []
+
+    def read() -> None:
+        for _ in range(50):
+            for _, stat in item_stats.snapshot():
+                if len(stat.timestamps) != len(stat.volumes):
+                    errors.append(stat.item_name)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    item_stats.merge(newer)
+    reader.join()
+    assert not errors
+    assert to_json(view) == expected
+    assert view.get_stats(items[0].id) is item_stats.get_stats(items[0].id)
+    assert view.get_stats(items[2].id) is not item_stats.get_stats(items[2].id)
+    assert len(view.items) == 4 and len(item_stats.items) == 6
+    with pytest.raises(ValueError):
+        view.merge(newer)
@@ -0,0 +1,84 @@
+"""Tests metrics module inside utils package."""
+import logging
+from unittest.mock import Mock
+
+import pytest
+from pytest import LogCaptureFixture
+
+from warframe_metrics.utils import metrics
+from warframe_metrics.utils.collect_data import from_url
+from warframe_metrics.utils.collect_data import to_class
+from warframe_metrics.utils.collect_data import to_stats
+from warframe_metrics.utils.constants import ITEMS_URL
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ShortItem
+from warframe_metrics.utils.schema import Stat
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_disabled() -> None:
+    """Test nothing is recorded without a sink."""
+    assert metrics.get_sink() is None
+    with metrics.timer("x"):
+        metrics.increment("y")
+    assert not metrics.enabled()
+    with pytest.raises(TypeError):
+        metrics.MetricsSink()
+
+
+def test_instrumented_hot_paths(requests_mock: Mock) -> None:
+    """Test timers and counters around collection and serialization."""
+    sink = metrics.InMemorySink()
+    previous = metrics.set_sink(sink)
+    try:
+        catalogue = SyntheticCatalogue(3, 5)
+        requests_mock.get(ITEMS_URL, json=catalogue.items_payload())
+        items = to_class(ShortItem, from_url(ITEMS_URL)["payload"]["items"])
+        stat = to_stats(catalogue.closed_stats(0), catalogue.live_stats(0), "a")
+        other = to_stats(catalogue.closed_stats(0), catalogue.live_stats(0), "a")
+        stat.merge(other)
+        from_json(Stat, to_json(stat))
+    finally:
+        metrics.set_sink(previous)
+    assert len(items) == 3
+    assert sink.counter("fetch_requests_total", {"status": "200"}) == 1
+    assert sink.counter("fetch_bytes_total") > 0
+    assert sink.counter("to_class_rows_total") == 3
+    assert sink.counter("to_stats_rows_total") == 2 * (5 + 96)
+    for name in [
+        "fetch_seconds",
+        "json_decode_seconds",
+        "to_class_seconds",
+        "to_stats_seconds",
+        "merge_seconds",
+        "to_json_seconds",
+        "from_json_seconds",
+    ]:
+        assert sink.histogram(name).count >= 1
+
+
+def test_prometheus_exposition() -> None:
+    """Test the prometheus text format."""
+    sink = metrics.PrometheusSink(buckets=(0.1, 1.0))
+    sink.increment("fetch_requests_total", labels={"status": "429"})
+    sink.observe("fetch_seconds", 0.5)
+    text = sink.exposition()
+    assert "# TYPE warframe_metrics_fetch_requests_total counter" in text
+    assert 'warframe_metrics_fetch_requests_total{status="429"} 1.0' in text
+    assert 'warframe_metrics_fetch_seconds_bucket{le="0.1"} 0' in text
+    assert 'warframe_metrics_fetch_seconds_bucket{le="1.0"} 1' in text
+    assert 'warframe_metrics_fetch_seconds_bucket{le="+Inf"} 1' in text
+    assert "warframe_metrics_fetch_seconds_count 1" in text
+
+
+def test_logging_sink(caplog: LogCaptureFixture) -> None:
+    """Test the logging sink writes observations."""
+    previous = metrics.set_sink(metrics.LoggingSink(level=logging.INFO))
+    caplog.set_level(logging.INFO, logger="warframe_metrics")
+    try:
+        with metrics.timer("merge_seconds"):
+            pass
+    finally:
+        metrics.set_sink(previous)
+    assert "merge_seconds" in caplog.text
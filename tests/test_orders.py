@@ -0,0 +1,57 @@
+"""Tests orders module inside utils package."""
+from pytest import CaptureFixture
+
+from warframe_metrics.main import main
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.orders import collect_order_books
+from warframe_metrics.utils.orders import Order
+from warframe_metrics.utils.orders import OrderBook
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_order_book() -> None:
+    """Test the top of book, depth and updates of an order book."""
+    book = OrderBook("item", statuses={"ingame", "online"})
+    book.replace(
+        [
+            Order("b1", 10, 2, "buy", "ingame"),
+            Order("b2", 12, 1, "buy", "online"),
+            Order("b3", 12, 3, "buy", "ingame"),
+            Order("b4", 20, 1, "buy", "offline"),
+            Order("s1", 15, 1, "sell", "ingame"),
+            Order("s2", 14, 2, "sell", "ingame"),
+            Order("s3", 18, 1, "sell", "online"),
+        ]
+    )
+    assert len(book) == 6
+    assert book.best_bid() == 12
+    assert book.best_ask() == 14
+    assert book.spread() == 2
+    assert book.depth("buy") == [(12, 4), (10, 2)]
+    assert book.depth("sell", 2) == [(14, 2), (15, 1)]
+    assert book.quantity_within("sell", 15) == 3
+    assert book.quantity_within("buy", 11) == 4
+    book.remove("s2")
+    book.add(Order("b2", 13, 1, "buy", "ingame"))
+    assert book.best_ask() == 15
+    assert book.best_bid() == 13
+    assert book.quantity_at("buy", 12) == 3
+    book.replace([])
+    assert book.spread() is None
+
+
+def test_collect_order_books(capsys: CaptureFixture) -> None:
+    """Test collecting order books from the local server."""
+    catalogue = SyntheticCatalogue(6, 5)
+    with LocalMarketServer(catalogue) as server:
+        books = collect_order_books(api_url=server.url)
+        ingame = collect_order_books(statuses={"ingame"}, api_url=server.url)
+        assert main(["orders", "--api-url", server.url]) == 0
+    assert len(books) == 6
+    for id, book in books.items():
+        assert len(ingame[id]) <= len(book)
+        if book.spread() is not None:
+            assert book.spread() > 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "item_name\tbest_bid\tbest_ask\tspread"
+    assert len(lines) == 7
@@ -0,0 +1,76 @@
+"""Tests parse_cache module inside utils package."""
+import os
+
+import pytest
+
+from warframe_metrics.main import main
+from warframe_metrics.utils import collect_data
+from warframe_metrics.utils.collect_data import market_data
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.parse_cache import ParseCache
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_collect_with_parse_cache(tmpdir: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test unchanged responses are loaded from the cache without parsing."""
+    directory = os.path.join(str(tmpdir), "stats")
+    catalogue = SyntheticCatalogue(8, 20)
+    with LocalMarketServer(catalogue) as server:
+        full = market_data(timeout=0, api_url=server.url)
+        cache = ParseCache(directory)
+        first = market_data(timeout=0, api_url=server.url, parse_cache=cache)
+        assert len(cache) == 8 and to_json(first) == to_json(full)
+
+        def parse_stat(*args: object) -> None:
+            raise AssertionError("parsed a cached response")
+
+        with monkeypatch.context() as m:
+            m.setattr(collect_data, "parse_stat", parse_stat)
+            cached = market_data(
+                timeout=0, api_url=server.url, parse_cache=ParseCache(directory)
+            )
+        assert to_json(cached) == to_json(full)
+        id = next(iter(full.items))
+        assert cached.get_stats(id) is not first.get_stats(id)
+        output = os.path.join(str(tmpdir), "snap.json")
+        args = ["--api-url", server.url, "--timeout", "0", "-o", output]
+        assert main(["collect", "--parse-cache", directory] + args) == 0
+    assert len(ParseCache(directory)) == 8
+
+
+def test_parse_cache_eviction(tmpdir: str) -> None:
+    """Test the least recently used statistics are removed beyond the size."""
+    catalogue = SyntheticCatalogue(4, 20)
+    stats = [catalogue.stat(i) for i in range(4)]
+    cache = ParseCache(str(tmpdir))
+    keys = [cache.key(b"%d" % i, s.item_name) for i, s in enumerate(stats)]
+    cache.put(keys[0], stats[0])
+    size = cache.size
+    cache.max_bytes = int(size * 2.5)
+    cache.put(keys[1], stats[1])
+    assert to_json(cache.get(keys[0])) == to_json(stats[0])
+    cache.put(keys[2], stats[2])
+    assert cache.get(keys[1]) is None and len(cache) == 2
+    assert cache.size <= cache.max_bytes
+    assert sorted(os.listdir(str(tmpdir))) == sorted(
+        os.path.basename(cache.path(k)) for k in (keys[0], keys[2])
+    )
+    cache.clear()
+    assert len(cache) == 0 and not os.listdir(str(tmpdir))
+
+
+def test_parse_cache_invalid_file(tmpdir: str) -> None:
+    """Test a file of another layout is removed and counted as a miss."""
+    stat = SyntheticCatalogue(1, 20).stat(0)
+    cache = ParseCache(str(tmpdir))
+    key = cache.key(b"0", stat.item_name)
+    cache.put(key, stat)
+    for data in (b"\x80\x04K\x01.", b'{"item_name":'):
+        with open(cache.path(key), "wb") as f:
+            f.write(data)
+        reopened = ParseCache(str(tmpdir))
+        assert reopened.get(key) is None and len(reopened) == 0
+        assert not os.listdir(str(tmpdir))
+        cache.put(key, stat)
+    assert to_json(ParseCache(str(tmpdir)).get(key)) == to_json(stat)
@@ -1,6 +1,12 @@
 """Test prime module inside market package."""
+import os
 from unittest.mock import Mock
 
+from warframe_metrics.market.prime import best_prime_complex
+from warframe_metrics.market.prime import PrimeRanking
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
 
 def test_prime_collect(requests_mock: Mock) -> None:
     """Test prime data collection."""
@@ -10,3 +16,40 @@ def test_prime_collect(requests_mock: Mock) -> None:
 def test_prime_data_ranking() -> None:
     """Test prime data ranking."""
     pass
+
+
+def test_incremental_ranking(tmpdir: str) -> None:
+    """Test the incremental ranking follows full rankings as items change."""
+    catalogue = SyntheticCatalogue(40, 60)
+    vault_csv = catalogue.vault_csv(os.path.join(str(tmpdir), "vault.csv"))
+    primes = [
+        (i, item)
+        for i, item in enumerate(catalogue.short_items())
+        if "Prime" in item.item_name
+    ]
+    stats = [catalogue.stat(i) for i, _ in primes]
+    prime_data = ItemStats([item for _, item in primes], stats)
+    ranking = PrimeRanking(vault_csv)
+    assert ranking.update(prime_data) == len(ranking) > 0
+    expected = best_prime_complex(vault_csv, prime_data)
+    assert ranking.ranking()["Item Name"].to_list() == expected["Item Name"].to_list()
+    changed = [stats[1], stats[4]]
+    for stat in changed:
+        stat.live_stat_sell.volumes = [v * 3 for v in stat.live_stat_sell.volumes]
+    assert ranking.update(prime_data, [s.item_name for s in changed]) == 2
+    expected = best_prime_complex(vault_csv, prime_data)
+    actual = ranking.ranking()
+    assert actual["Item Name"].to_list() == expected["Item Name"].to_list()
+    assert abs(actual["Metric"].values - expected["Metric"].values).max() < 1e-9
+    assert ranking.max("Volume Ratio") == max(
+        r["Volume Ratio"] for r in ranking.rows.values()
+    )
+    size = len(ranking)
+    removed = primes[0][1].item_name
+    assert ranking.update(ItemStats([], []), [removed]) == 0
+    assert len(ranking) == size - 1
+    remaining = ItemStats([item for _, item in primes[2:]], stats[2:])
+    assert ranking.update(remaining) == len(ranking)
+    expected = best_prime_complex(vault_csv, remaining)
+    assert ranking.ranking()["Item Name"].to_list() == expected["Item Name"].to_list()
+    assert ranking.update(ItemStats([], [])) == 0 and len(ranking) == 0
@@ -0,0 +1,66 @@
+"""Tests server module inside market package."""
+import copy
+import os
+
+import requests
+
+from warframe_metrics.market.server import QueryServer
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_query_server(tmpdir: str) -> None:
+    """Test responses are precomputed, revalidated and updated on publish."""
+    catalogue = SyntheticCatalogue(30, 60)
+    vault_csv = catalogue.vault_csv(os.path.join(str(tmpdir), "vault.csv"))
+    primes = [
+        (i, item)
+        for i, item in enumerate(catalogue.short_items())
+        if "Prime" in item.item_name
+    ]
+    items = [item for _, item in primes]
+    stats = [catalogue.stat(i) for i, _ in primes]
+    item_stats = ItemStats(items, stats)
+    with QueryServer(item_stats, vault_csv=vault_csv) as server:
+        listed = requests.get(server.url + "/items", timeout=5)
+        assert [i["id"] for i in listed.json()] == list(item_stats.items)
+        series = requests.get(server.url + "/items/" + items[0].url_name, timeout=5)
+        other = requests.get(server.url + "/items/" + items[1].url_name, timeout=5)
+        assert series.json()["item"]["item_name"] == items[0].item_name
+        assert len(series.json()["statistics"]["dates"]) == 60
+        ranking = requests.get(server.url + "/rankings/warframe", timeout=5)
+        assert ranking.status_code == 200 and ranking.json()["items"]
+        revalidated = requests.get(
+            server.url + "/rankings/warframe",
+            headers={"If-None-Match": ranking.headers["ETag"]},
+            timeout=5,
+        )
+        assert revalidated.status_code == 304
+        assert requests.get(server.url + "/items/unknown", timeout=5).status_code == 404
+        newer = copy.deepcopy(item_stats.get_stats(items[0].id))
+        newer.avg_prices = [p + 1.0 for p in newer.avg_prices]
+        item_stats.merge(ItemStats([copy.deepcopy(items[0])], [newer]))
+        assert server.publish(item_stats) == 1
+        updated = requests.get(
+            server.url + "/items/" + items[0].url_name,
+            headers={"If-None-Match": series.headers["ETag"]},
+            timeout=5,
+        )
+        assert updated.status_code == 200
+        assert updated.json()["statistics"]["avg_prices"] == newer.avg_prices
+        unchanged = requests.get(
+            server.url + "/items/" + items[1].url_name,
+            headers={"If-None-Match": other.headers["ETag"]},
+            timeout=5,
+        )
+        assert unchanged.status_code == 304
+        assert server.counts["not_modified"] == 2
+        assert server.publish(from_json(ItemStats, to_json(item_stats))) == 0
+        reloaded = requests.get(
+            server.url + "/items/" + items[1].url_name,
+            headers={"If-None-Match": other.headers["ETag"]},
+            timeout=5,
+        )
+        assert reloaded.status_code == 304
@@ -0,0 +1,68 @@
+"""Tests shard module inside utils package."""
+import os
+
+import pytest
+
+from warframe_metrics.main import main
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.schema import from_json
+from warframe_metrics.utils.schema import ItemStats
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.shard import collect_sharded
+from warframe_metrics.utils.shard import combine_snapshots
+from warframe_metrics.utils.shard import parse_shard
+from warframe_metrics.utils.shard import shard_of
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_shard_of() -> None:
+    """Test shards are deterministic and cover every item once."""
+    names = SyntheticCatalogue(200, 1).url_names()
+    shards = [shard_of(n, 4) for n in names]
+    assert shards == [shard_of(n, 4) for n in names]
+    assert all(s in range(4) for s in shards)
+    assert all(shards.count(s) > 20 for s in range(4))
+    assert parse_shard("2/8") == (2, 8)
+    for bad in ["8/8", "1", "a/2", "0/0"]:
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_sharded_collect_and_combine(tmp_path: str) -> None:
+    """Test partial snapshots combine into the full collection."""
+    catalogue = SyntheticCatalogue(12, 5)
+    paths = [os.path.join(str(tmp_path), "part%d.json" % i) for i in range(3)]
+    combined = os.path.join(str(tmp_path), "combined.json")
+    with LocalMarketServer(catalogue) as server:
+        args = ["--api-url", server.url, "--timeout", "0"]
+        for i, path in enumerate(paths):
+            assert main(["collect", "--shard", "%d/3" % i, "-o", path] + args) == 0
+        with_pool = collect_sharded(
+            2, os.path.join(str(tmp_path), "pool"), api_url=server.url, timeout=0
+        )
+    assert main(["combine", "-o", combined] + paths) == 0
+    with open(combined) as f:
+        item_stats = from_json(ItemStats, f.read())
+    assert sorted(item_stats.items) == sorted(i.id for i in catalogue.short_items())
+    assert sorted(with_pool.items) == sorted(item_stats.items)
+    sizes = []
+    for path in paths:
+        with open(path) as f:
+            sizes.append(len(from_json(ItemStats, f.read()).items))
+    assert sum(sizes) == 12
+
+
+def test_combine_indexed_partials(tmp_path: str) -> None:
+    """Test indexed partial snapshots combine like json ones."""
+    catalogue = SyntheticCatalogue(12, 5)
+    paths = [os.path.join(str(tmp_path), "part%d.wfms" % i) for i in range(3)]
+    combined = os.path.join(str(tmp_path), "combined.json")
+    with LocalMarketServer(catalogue) as server:
+        args = ["--api-url", server.url, "--timeout", "0", "--indexed"]
+        for i, path in enumerate(paths):
+            assert main(["collect", "--shard", "%d/3" % i, "-o", path] + args) == 0
+    assert main(["combine", "-o", combined] + paths) == 0
+    with open(combined) as f:
+        item_stats = from_json(ItemStats, f.read())
+    assert sorted(item_stats.items) == sorted(i.id for i in catalogue.short_items())
+    assert to_json(combine_snapshots(paths)) == to_json(item_stats)
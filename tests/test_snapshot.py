@@ -0,0 +1,128 @@
+"""Tests snapshot module inside utils package."""
+import copy
+import os
+import time
+
+import pytest
+
+from warframe_metrics.main import main
+from warframe_metrics.utils import collect_data
+from warframe_metrics.utils.collect_data import collect_platforms
+from warframe_metrics.utils.collect_data import market_data
+from warframe_metrics.utils.fetch import AdaptiveThrottle
+from warframe_metrics.utils.fetch import Fetcher
+from warframe_metrics.utils.local_server import LocalMarketServer
+from warframe_metrics.utils.memory import MemoryBudget
+from warframe_metrics.utils.schema import to_json
+from warframe_metrics.utils.snapshot import LazyItemStats
+from warframe_metrics.utils.snapshot import open_snapshot
+from warframe_metrics.utils.snapshot import SnapshotWriter
+from warframe_metrics.utils.snapshot import write_indexed_snapshot
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_lazy_item_stats(tmpdir: str) -> None:
+    """Test statistics are decoded on access only and kept in an LRU."""
+    item_stats = SyntheticCatalogue(8, 20).item_stats()
+    path = os.path.join(str(tmpdir), "snapshot.wfms")
+    write_indexed_snapshot(item_stats, path)
+    lazy = open_snapshot(path, cache_size=2)
+    assert isinstance(lazy, LazyItemStats)
+    assert list(lazy.items) == list(item_stats.items)
+    assert lazy.cache_info() == (0, 2)
+    ids = list(item_stats.items)
+    name = item_stats.get_item_by_id(ids[3]).item_name
+    stat = lazy.get_stats(lazy.get_item(name).id)
+    assert to_json(stat) == to_json(item_stats.get_stats(ids[3]))
+    assert lazy.get_stats(ids[3]) is stat
+    lazy.get_stats(ids[0])
+    lazy.get_stats(ids[1])
+    assert lazy.cache_info() == (2, 2)
+    assert lazy.get_stats(ids[3]) is not stat
+    assert to_json(lazy) == to_json(item_stats)
+
+
+def test_lazy_item_stats_merge(tmpdir: str) -> None:
+    """Test merged items are pinned so that their changes are kept."""
+    item_stats = SyntheticCatalogue(4, 20).item_stats()
+    path = os.path.join(str(tmpdir), "snapshot.wfms")
+    write_indexed_snapshot(item_stats, path)
+    newer = SyntheticCatalogue(6, 25, seed=1).item_stats()
+    expected = copy.deepcopy(item_stats)
+    expected.merge(copy.deepcopy(newer))
+    lazy = LazyItemStats(path, cache_size=1)
+    lazy.merge(newer)
+    for id in list(lazy.items)[:3]:
+        lazy.get_stats(id)
+    assert to_json(lazy) == to_json(expected)
+    output = os.path.join(str(tmpdir), "merged.json")
+    assert main(["index", path, "-o", path]) == 0
+    assert main(["merge", path, path, "-o", output]) == 0
+    control = copy.deepcopy(item_stats)
+    control.merge(copy.deepcopy(item_stats))
+    assert to_json(open_snapshot(output)) == to_json(control)
+
+
+def test_collect_to_store(tmpdir: str) -> None:
+    """Test collections write items to an indexed snapshot as they go."""
+    catalogue = SyntheticCatalogue(10, 20)
+    store = os.path.join(str(tmpdir), "store.wfms")
+    output = os.path.join(str(tmpdir), "primes.wfms")
+    with LocalMarketServer(catalogue) as server:
+        full = market_data(timeout=0, api_url=server.url)
+        data = market_data(timeout=0, api_url=server.url, store=store)
+        args = ["--api-url", server.url, "--timeout", "0", "-o", output]
+        assert main(["collect", "--prime", "--indexed"] + args) == 0
+        platforms = ["pc", "xbox"]
+        stores = {p: os.path.join(str(tmpdir), p + ".wfms") for p in platforms}
+        expected = collect_platforms(platforms, api_url=server.url)
+        results = collect_platforms(platforms, api_url=server.url, stores=stores)
+        args += ["--platform", "pc", "--platform", "xbox"]
+        assert main(["collect", "--prime", "--indexed"] + args) == 0
+        budget = MemoryBudget(1, str(tmpdir))
+        with pytest.raises(ValueError):
+            market_data(api_url=server.url, memory_budget=budget, store=store)
+    assert isinstance(data, LazyItemStats) and not data.item_stats
+    assert data.cache_info()[0] == 0
+    assert to_json(data) == to_json(full)
+    assert not os.path.exists(store + ".tmp")
+    primes = open_snapshot(output)
+    assert isinstance(primes, LazyItemStats)
+    assert all("Prime" in name for name in primes.name_items)
+    for platform in platforms:
+        assert isinstance(results[platform], LazyItemStats)
+        assert to_json(results[platform]) == to_json(expected[platform])
+        path = os.path.join(str(tmpdir), "primes.%s.wfms" % platform)
+        assert isinstance(open_snapshot(path), LazyItemStats)
+
+
+def test_collect_platforms_window(tmpdir: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test at most twice the workers results wait to be written to stores."""
+    fetched = []
+    written = []
+    outstanding = []
+    fetch_stat = collect_data.fetch_stat
+    add = SnapshotWriter.add
+
+    def counted_fetch(*args: object) -> object:
+        fetched.append(None)
+        outstanding.append(len(fetched) - len(written))
+        if len(fetched) == 1:
+            time.sleep(0.5)
+        return fetch_stat(*args)
+
+    def counted_add(self: SnapshotWriter, *args: object) -> None:
+        written.append(None)
+        add(self, *args)
+
+    monkeypatch.setattr(collect_data, "fetch_stat", counted_fetch)
+    monkeypatch.setattr(SnapshotWriter, "add", counted_add)
+    fetcher = Fetcher(AdaptiveThrottle(rate=1000.0), max_retries=0)
+    platforms = ["pc", "xbox"]
+    stores = {p: os.path.join(str(tmpdir), p + ".wfms") for p in platforms}
+    with LocalMarketServer(SyntheticCatalogue(20, 10)) as server:
+        results = collect_platforms(
+            platforms, api_url=server.url, fetcher=fetcher, workers=2, stores=stores
+        )
+    assert len(written) == 40 and all(len(results[p].items) == 20 for p in platforms)
+    assert max(outstanding) <= 4
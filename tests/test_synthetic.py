@@ -0,0 +1,45 @@
+"""Tests synthetic module inside utils package."""
+from warframe_metrics.utils.collect_data import collect_data
+from warframe_metrics.utils.collect_data import to_class
+from warframe_metrics.utils.collect_data import to_stats
+from warframe_metrics.utils.schema import LiveStats
+from warframe_metrics.utils.schema import ShortItem
+from warframe_metrics.utils.schema import Stats
+from warframe_metrics.utils.synthetic import SyntheticCatalogue
+
+
+def test_deterministic() -> None:
+    """Test catalogues with the same arguments generate the same data."""
+    c1 = SyntheticCatalogue(20, 30, seed=3)
+    c2 = SyntheticCatalogue(20, 30, seed=3)
+    c3 = SyntheticCatalogue(20, 30, seed=4)
+    name = c1.url_names()[5]
+    assert c1.items_payload() == c2.items_payload()
+    assert c1.stats_payload(name) == c2.stats_payload(name)
+    assert c1.stats_payload(name) != c3.stats_payload(name)
+
+
+def test_payload_layout() -> None:
+    """Test synthetic payloads load like the warframe.market api responses."""
+    catalogue = SyntheticCatalogue(20, 30)
+    items = to_class(
+        ShortItem, collect_data(catalogue.items_payload(), ["payload", "items"])
+    )
+    assert items == catalogue.short_items()
+    assert len({i.item_name for i in items}) == 20
+    for index in range(20):
+        payload = catalogue.stats_payload(catalogue.url_name(index))
+        closed = collect_data(payload, ["payload", "statistics_closed", "90days"])
+        live = collect_data(payload, ["payload", "statistics_live", "48hours"])
+        stat = to_stats(
+            to_class(Stats, closed), to_class(LiveStats, live), items[index].item_name
+        )
+        if "Mod" in items[index].item_name:
+            assert len(stat.dates) == 60
+            assert set(stat.mod_ranks) == {0, 10}
+        else:
+            assert len(stat.dates) == 30
+        assert stat.dates == sorted(stat.dates)
+        assert len(stat.live_stat_buy.dates) == 48
+        assert len(stat.live_stat_sell.dates) == 48
+        assert to_class(Stats, closed) == catalogue.closed_stats(index)